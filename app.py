@@ -12,12 +12,13 @@
 """
 
 import sys
+import time
+
+START = time.perf_counter()  # 启动时间从这里算, 见 app_test/startup_test.py
 
-from PySide2.QtCore import Signal, QObject
 from PySide2.QtGui import QCloseEvent
-from PySide2.QtWidgets import QApplication
 
-from ui_component.ui_common.my_text_browser import UiMessage
+from ui_component.ui_common.my_text_browser import LogSink
 from ui_component.ui_main.ui_main import Application, Main_Ui
 
 import warnings
@@ -25,46 +26,17 @@ import warnings
 warnings.filterwarnings("ignore")
 
 
-class Stream(QObject):
-    conn = True
-    newText = Signal(str)
-
-    def write(self, text):
-        if not self.conn:
-            return
-        self.newText.emit(str(text))
-        # 实时刷新界面
-        QApplication.processEvents()
-
-
 class main_ui(Main_Ui):
 
     def __init__(self, parent=None, license_control=False):
         super(main_ui, self).__init__(parent=parent, license_control=license_control)
         self.setWindowTitle("STDF Data Analysis System")
-        self.sd = Stream()
-        self.se = Stream()
-        self.sd.newText.connect(self.outputWritten)
-        self.se.newText.connect(self.errorWritten)
-        sys.stdout = self.sd
-        sys.stderr = self.se
-
-    def outputWritten(self, text: str):
-        """
-        根据规则来打印合适颜色的信息
-        :param text:
-        :return:
-        """
-        self.text_browser.split_append(text)
-
-    def errorWritten(self, text: str):
-        self.text_browser.m_append(
-            UiMessage.error(text)
-        )
+        " print 先放进缓冲, 定时写到 text_browser, stderr 是红色 "
+        self.log_sink = LogSink(self.text_browser, self)
+        self.log_sink.install()
 
     def closeEvent(self, a0: QCloseEvent) -> None:
-        sys.stdout.conn = False
-        sys.stderr.conn = False
+        self.log_sink.uninstall()
         sys.exit(0)
 
 
@@ -85,6 +57,7 @@ if __name__ == '__main__':
         win = main_ui(license_control=False)
         app.setWindowIcon(win.icon)
         win.show()
+        print("启动用时: {}s".format(round(time.perf_counter() - START, 2)))
         sys.exit(app.exec_())
     except Exception as err:
         sys.stdout = None
@@ -10,11 +10,23 @@ a = Analysis(
     binaries=[],
     datas=[
     ('parser_core\\\\dll_parser\\\\stdf_ctype.dll', '.'),
-    ('chart_core\\\\chart_pyqtgraph\\\\core\\\\visual\\\\visual.cp37-win_amd64.pyd', '.'),
     ('colors\\CET-C6.csv', '.'),
     ('colors\\CET-D8.csv', '.'),
     ],
-    hiddenimports=[],
+    # common/lazy_import.py 中延迟import的模块, PyInstaller 分析不到
+    hiddenimports=[
+    'chart_core.chart_jmp.jmp_box',
+    'chart_core.chart_jmp.jmp_factory',
+    'chart_core.chart_jmp.jmp_file',
+    'chart_core.chart_jmp.jmp_plot',
+    'chart_core.chart_jmp.jmp_script_factory',
+    'chart_core.chart_jmp_factory.class_jmp_factory',
+    'common.export_interface.data_export',
+    'ui_component.ui_main.mdi_data_concat',
+    'ui_component.ui_main.ui_jmp_select',
+    'ui_component.ui_main.mapping_select',
+    'ui_component.ui_analysis_stdf.ui_stdf',
+    ],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -0,0 +1,89 @@
+"""
+-*- coding: utf-8 -*-
+@Author  : Link
+@Time    : 2023/2/24 22:10
+@Site    :
+@File    : batch_test.py
+@Software: PyCharm
+@Remark  : 命令行批量分析(stdf_analysis), 只测不需要dll的部分
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from app_test.test_utils.wrapper_utils import Tester
+from common.app_variable import PartFlags
+from common.li import Li
+from stdf_analysis import BatchAnalysis, ExitCode
+
+
+class BatchAnalysisCase(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.folder.name, "L1"))
+        for name in ("L1/b.stdf", "L1/a.std", "L1/a.csv", "c.std_temp"):
+            with open(os.path.join(self.folder.name, name), "wb") as f:
+                f.write(b"0")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    @Tester()
+    def test_collect_files(self):
+        single = os.path.join(self.folder.name, "L1", "a.std")
+        paths = BatchAnalysis.collect_files([self.folder.name, single, os.path.join(self.folder.name, "none")])
+        names = [os.path.relpath(each, self.folder.name).replace(os.sep, "/") for each in paths]
+        self.assertEqual(names, ["c.std_temp", "L1/a.std", "L1/b.stdf"])
+
+    @Tester()
+    def test_arguments(self):
+        args = BatchAnalysis.arg_parser().parse_args([self.folder.name, "--part-flag", "first", "--report"])
+        self.assertEqual(PartFlags.PART_FLAGS.index(args.part_flag), PartFlags.FIRST)
+        self.assertEqual((args.format, args.report), ("CSV", []))
+        with self.assertRaises(SystemExit) as cm:
+            BatchAnalysis.run([self.folder.name, "--format", "xls"])
+        self.assertEqual(cm.exception.code, ExitCode.USAGE)
+        args = BatchAnalysis.arg_parser().parse_args([self.folder.name, "--merge-key", "test_num"])
+        self.assertEqual(args.merge_key, "TEST_NUM")
+        self.assertEqual(BatchAnalysis.arg_parser().parse_args([self.folder.name]).report, ["limit", "compare"])
+        args = BatchAnalysis.arg_parser().parse_args([self.folder.name, "--report", "limit-csv", "limit-json"])
+        self.assertEqual(args.report, ["limit-csv", "limit-json"])
+        self.assertFalse(args.stdf)
+        self.assertTrue(BatchAnalysis.arg_parser().parse_args([self.folder.name, "--stdf"]).stdf)
+        with self.assertRaises(SystemExit) as cm:
+            BatchAnalysis.run([self.folder.name, "--merge-key", "NAME"])
+        self.assertEqual(cm.exception.code, ExitCode.USAGE)
+
+    @Tester()
+    def test_no_data(self):
+        with tempfile.TemporaryDirectory() as folder:
+            self.assertEqual(BatchAnalysis.run([folder]), ExitCode.NO_DATA)
+
+
+class LiEventCase(unittest.TestCase):
+
+    @Tester()
+    def test_emit(self):
+        li, other, messages = Li(), Li(), []
+        li.QStatusMessage.connect(messages.append)
+        li.QStatusMessage.connect(messages.append)
+        self.assertEqual(li.save_stdf("none.stdf"), 0)
+        other.QStatusMessage.emit("other")
+        self.assertEqual(messages, ["请先将数据载入到数据空间中!"])
+        li.QStatusMessage.disconnect(messages.append)
+        li.QStatusMessage.emit("none")
+        self.assertEqual(len(messages), 1)
+
+    @Tester()
+    def test_without_qt(self):
+        code = "import sys, common.li; print(any(m.startswith(('PySide2', 'ui_component')) for m in sys.modules))"
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.assertEqual(out.stdout.strip(), "False", out.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+"""
+-*- coding: utf-8 -*-
+@Author  : Link
+@Time    : 2023/2/20 21:10
+@Site    :
+@File    : catalog_test.py
+@Software: PyCharm
+@Remark  : HDF5缓存目录(SummaryCatalog), 临时的db和假的HDF5文件
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from app_test.test_utils.wrapper_utils import Tester
+from common.app_variable import PartFlags, ReadFail, FailFlag
+from common.cal_interface.cross_lot import CrossLotQuery
+from common.sql_interface.pandas_sql import SqlLite, SqlEngine
+from common.sql_interface.summary_catalog import SummaryCatalog
+
+
+class SummaryCatalogCase(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.folder.name, "stdf_info.db")
+        self.prr_df = pd.DataFrame({
+            "DIE_ID": [1, 2, 3, 4],
+            "X_COORD": [0, 1, 0, 2],
+            "Y_COORD": [0, 0, 0, 0],
+            "PART_FLG": [0, 0, 2, 0],
+            "FAIL_FLAG": [FailFlag.FAIL, FailFlag.PASS, FailFlag.PASS, FailFlag.FAIL],
+        })
+        self.infos = []
+        for index, (lot_id, start_t) in enumerate((("L2", 200), ("L1", 100))):
+            hdf5_path = os.path.join(self.folder.name, "{}.h5".format(lot_id))
+            with open(hdf5_path, "wb") as f:
+                f.write(b"0" * (index + 1))
+            info = {
+                "FILE_PATH": lot_id + ".stdf", "FILE_NAME": lot_id + ".stdf", "LOT_ID": lot_id,
+                "PART_TYP": "P1", "START_T": start_t, "SITE_CNT": 4, "HDF5_PATH": hdf5_path,
+            }
+            SummaryCatalog.register(info, self.prr_df, self.db_path)
+            self.infos.append(info)
+
+    def tearDown(self):
+        SqlLite.close(self.db_path)
+        self.folder.cleanup()
+
+    @Tester()
+    def test_query(self):
+        df = SummaryCatalog.query(db_path=self.db_path)
+        self.assertEqual(list(df.LOT_ID), ["L1", "L2"])
+        self.assertEqual(list(df.QTY), [4, 4])
+        self.assertEqual(list(df.YIELD), ["50.0%", "50.0%"])
+        df = SummaryCatalog.query(db_path=self.db_path, part_flag=PartFlags.XY_COORD, LOT_ID=["L2"])
+        self.assertEqual((len(df), int(df.QTY[0]), int(df.PASS[0])), (1, 3, 2))
+        df = SummaryCatalog.query(db_path=self.db_path, read_fail=ReadFail.N, start_t=150)
+        self.assertEqual((list(df.LOT_ID), list(df.QTY)), (["L2"], [2]))
+        with self.assertRaises(KeyError):
+            SummaryCatalog.query(db_path=self.db_path, NOT_A_COLUMN=1)
+
+    @Tester()
+    def test_lookup(self):
+        hdf5_path = self.infos[0]["HDF5_PATH"]
+        row = SummaryCatalog.lookup(hdf5_path, PartFlags.FIRST, ReadFail.Y, self.db_path)
+        self.assertEqual((row["LOT_ID"], row["QTY"], row["PASS"], row["YIELD"]), ("L2", 3, 1, "33.33%"))
+        self.assertNotIn("FILE_MTIME", row)
+        # HDF5重新生成后指纹不一样
+        with open(hdf5_path, "ab") as f:
+            f.write(b"1")
+        self.assertIsNone(SummaryCatalog.lookup(hdf5_path, PartFlags.FIRST, ReadFail.Y, self.db_path))
+
+    @Tester()
+    def test_prune(self):
+        os.remove(self.infos[1]["HDF5_PATH"])
+        self.assertEqual(SummaryCatalog.prune(self.db_path), 1)
+        df = SummaryCatalog.query(db_path=self.db_path)
+        self.assertEqual(list(df.LOT_ID), ["L2"])
+
+
+class CrossLotQueryCase(unittest.TestCase):
+    """
+    测试项 10:A 有Limit, 11:B 全部失效; DIE 3 是复测
+    """
+    prr_df = pd.DataFrame({
+        "PART_ID": [1, 2, 3], "DIE_ID": [1, 2, 3], "X_COORD": [0, 1, 0], "Y_COORD": [0, 0, 0],
+        "PART_FLG": [0, 0, 2], "FAIL_FLAG": [FailFlag.FAIL, FailFlag.PASS, FailFlag.PASS],
+    })
+    dtp_df = pd.DataFrame({
+        "PART_ID": [1, 2, 3, 1, 2, 3],
+        "TEST_ID": [0, 0, 0, 1, 1, 1],
+        "RESULT": [9.0, 1.0, 2.0, 5.0, 6.0, 7.0],
+        "TEST_FLG": [128, 0, 0, 128, 128, 128],
+    })
+    ptmd_df = pd.DataFrame({
+        "TEST_ID": [0, 1, 2], "DATAT_TYPE": "PTR", "TEST_NUM": [10, 11, 12], "TEST_TXT": ["A", "B", "C"],
+        "TEXT": ["10:A", "11:B", "12:C"], "UNITS": "V", "LO_LIMIT": [0.0, 0, 0], "HI_LIMIT": [3.0, 1, 1],
+    })
+
+    @Tester()
+    def test_stats(self):
+        ptmd_df = CrossLotQuery.select_tests(self.ptmd_df, ["10:A", "B"])
+        df = CrossLotQuery.test_stats(self.prr_df, self.dtp_df, ptmd_df)
+        self.assertEqual(list(df.TEXT), ["10:A", "11:B"])
+        self.assertEqual((list(df.QTY), list(df.REJECT_QTY)), ([3, 3], [1, 3]))
+        self.assertEqual(list(df.AVG), [1.5, 6.0])
+        self.assertAlmostEqual(df.CPK[0], 1.5 / (3 * np.std([1.0, 2.0], ddof=1)))
+        df = CrossLotQuery.test_stats(self.prr_df, self.dtp_df, ptmd_df, PartFlags.FIRST)
+        self.assertEqual((list(df.QTY), list(df.MAX)), ([2, 2], [1.0, 6.0]))
+
+    @Tester()
+    def test_files(self):
+        with tempfile.TemporaryDirectory() as folder:
+            db_path = os.path.join(folder, "stdf_info.db")
+            cache_path = os.path.join(folder, "STDF_CACHE")
+            os.makedirs(os.path.join(cache_path, "L1"))
+            for name, start_t in (("STDF_CACHE/L1/a.h5", 100), ("STDF_CACHE/L1/b.h5", 200), ("other.h5", 300)):
+                hdf5_path = os.path.join(folder, name)
+                with open(hdf5_path, "wb") as f:
+                    f.write(b"0")
+                info = {"LOT_ID": "L1", "PART_TYP": "P1", "START_T": start_t, "HDF5_PATH": hdf5_path}
+                SummaryCatalog.register(info, self.prr_df, db_path)
+            files = CrossLotQuery.files(start_t=150, cache_path=cache_path, db_path=db_path, PART_TYP="P1")
+            self.assertEqual([os.path.basename(each) for each in files.HDF5_PATH], ["b.h5"])
+            # 不是HDF5的文件读取失败, 跳过
+            df = CrossLotQuery.run(["10:A"], workers=1, cache_path=cache_path, db_path=db_path)
+            self.assertTrue(df.empty)
+            self.assertEqual(list(df.columns[:2]), ["HDF5_PATH", "LOT_ID"])
+            result = CrossLotQuery.merge(files, {files.HDF5_PATH[0]: CrossLotQuery.test_stats(
+                self.prr_df, self.dtp_df, self.ptmd_df)})
+            self.assertEqual((len(result), list(result.START_T.unique())), (3, [200]))
+            SqlLite.close(db_path)
+
+
+class SqlLiteCase(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.folder.name, "test.db")
+
+    def tearDown(self):
+        SqlLite.close(self.db_path)
+        self.folder.cleanup()
+
+    @Tester()
+    def test_insert_many(self):
+        SqlLite.connection(self.db_path).execute("CREATE TABLE t (K INTEGER PRIMARY KEY, V TEXT, N INTEGER)")
+        SqlLite.insert_many("t", ["K", "V", "N"], ((i, "a", i) for i in range(100)), db_path=self.db_path)
+        SqlLite.insert_many("t", ["K", "V"], [(1, "b"), (200, "c")], upsert=True, conflict=["K"],
+                            db_path=self.db_path)
+        sql = SqlLite(self.db_path)
+        self.assertEqual(sql.get_one("select count(*) n from t")["n"], 101)
+        # ON CONFLICT 只更新给出的列
+        self.assertEqual(sql.select_one_or_none("t", None, "V", "N", K=1), {"V": "b", "N": 1})
+        self.assertTrue(sql.update("t", {"K": 2}, V="d"))
+        self.assertEqual(sql.select("t", "order by K", "K", V="d"), [{"K": 2}])
+
+    @Tester()
+    def test_transaction(self):
+        SqlLite.connection(self.db_path).execute("CREATE TABLE t (K INTEGER PRIMARY KEY)")
+        with self.assertRaises(sqlite3.IntegrityError):
+            SqlLite.insert_many("t", ["K"], [(1,), (2,), (1,)], db_path=self.db_path)
+        self.assertEqual(SqlLite(self.db_path).get_all("select K from t"), [])
+
+    @Tester()
+    def test_engine(self):
+        df = pd.DataFrame({"A": np.arange(5), "B": [0.5, np.nan, 1, 2, 3], "C": list("abcde")})
+        engine = SqlEngine(self.db_path)
+        self.assertEqual(engine.insert_into_sql_by_table_name(df, "DATA"), 5)
+        engine.insert_into_sql_by_table_name(df.iloc[:2], "DATA")
+        result = pd.read_sql_query("select * from data", SqlLite.connection(self.db_path))
+        self.assertEqual(len(result), 7)
+        self.assertEqual(int(result.B.isna().sum()), 2)
+        self.assertEqual(list(result.C[:5]), list("abcde"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+"""
+-*- coding: utf-8 -*-
+@Author  : Link
+@Time    : 2023/2/12 11:02
+@Site    :
+@File    : chart_data_test.py
+@Software: PyCharm
+@Remark  : 绘图前的数据整理, 不需要HDF5数据和UI
+"""
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from app_test.test_utils.wrapper_utils import Tester
+from chart_core.chart_pyqtgraph.core.chart_data import ChartData
+from chart_core.chart_pyqtgraph.core.wafer_map import WaferRaster, MapDuplicate, RasterCache
+from common.cal_interface.bin_utils import BinCount
+from common.cal_interface.pandas_utils import PandasStdfUtils
+
+
+class WaferRasterCase(unittest.TestCase):
+    """
+    坐标(0, 0)上有两颗复测数据, 第一颗FAIL; 坐标(1, 1)第二次测试没有数据
+    """
+    df = pd.DataFrame({
+        "X_COORD": np.array([0, 0, 1, 1, 2], dtype=np.int16),
+        "Y_COORD": np.array([0, 0, 1, 1, 0], dtype=np.int16),
+        "FAIL_FLAG": [0, 1, 1, 1, 1],
+        "GROUP": ["B", "B", "A", "A", "B"],
+        1: [1.0, 2.0, 3.0, np.nan, 5.0],
+    })
+
+    def rasterize(self, policy: str):
+        return WaferRaster.rasterize_df(self.df, 1, WaferRaster.coord_range(self.df), policy=policy)
+
+    @Tester()
+    def test_group_stack(self):
+        keys, data = self.rasterize(MapDuplicate.LAST)
+        self.assertEqual(keys, ["A", "B"])
+        self.assertEqual(data.shape, (2, 3, 2))
+        self.assertEqual(data[0, 1, 1], 3.0)
+        self.assertEqual(data[1, 2, 0], 5.0)
+        self.assertTrue(np.isnan(data[0, 0, 0]))
+
+    @Tester()
+    def test_duplicate_policy(self):
+        self.assertEqual(self.rasterize(MapDuplicate.LAST)[1][1, 0, 0], 2.0)
+        self.assertEqual(self.rasterize(MapDuplicate.FIRST)[1][1, 0, 0], 1.0)
+        self.assertEqual(self.rasterize(MapDuplicate.MEAN)[1][1, 0, 0], 1.5)
+        self.assertEqual(self.rasterize(MapDuplicate.WORST)[1][1, 0, 0], 1.0)
+
+    @Tester()
+    def test_raster_cache(self):
+        cache = RasterCache(max_size=1)
+        cache.set(1, self.df, "raster")
+        self.assertEqual(cache.get(1, self.df), "raster")
+        self.assertIsNone(cache.get(1, self.df.copy()))
+        cache.set(1, self.df, "raster")
+        cache.set(2, self.df, "raster")
+        self.assertIsNone(cache.get(1, self.df))
+
+    @Tester()
+    def test_bin_raster(self):
+        df = self.df.assign(SOFT_BIN=[7, 1, 1, 1, 3])
+        keys, bins, data = WaferRaster.rasterize_bin_df(
+            df, "SOFT_BIN", WaferRaster.coord_range(df), policy=MapDuplicate.WORST
+        )
+        self.assertEqual(list(bins), [1, 3, 7])
+        self.assertEqual(data.dtype, np.uint16)
+        self.assertEqual(data[1, 0, 0], 3)  # FAIL的BIN7
+        self.assertEqual(data[1, 2, 0], 2)
+        self.assertEqual(data[0, 0, 0], 0)
+
+
+class BinCountCase(unittest.TestCase):
+    df = pd.DataFrame({
+        "HARD_BIN": [1, 1, 2, 3, 3, 3],
+        "FAIL_FLAG": [1, 1, 0, 0, 0, 0],
+        "GROUP": ["A", "B", "A", "A", "B", "B"],
+        "SITE_NUM": ["S001", "S002", "S001", "S001", "S002", "S001"],
+    })
+
+    @Tester()
+    def test_count_same_as_groupby(self):
+        count = BinCount.count(self.df, "HARD_BIN", by=["GROUP", "SITE_NUM"])
+        expect = self.df.groupby(["GROUP", "SITE_NUM", "HARD_BIN", "FAIL_FLAG"]).size()
+        self.assertEqual(count["COUNT"].tolist(), expect.tolist())
+        self.assertEqual(count["HARD_BIN"].tolist(), expect.index.get_level_values("HARD_BIN").tolist())
+
+    @Tester()
+    def test_count_sparse(self):
+        """ 各列种类数的乘积远大于实际的组合, 乘积超过int64也能统计 """
+        size = 200_000
+        df = pd.DataFrame({
+            "GROUP": np.arange(size) % 50_000,
+            "DA_GROUP": np.arange(size) % 40_000,
+            "SITE_NUM": np.arange(size) % 30_000,
+            "SOFT_BIN": np.arange(size) % 20_000,
+            "FAIL_FLAG": np.arange(size) % 2,
+        })
+        count = BinCount.count(df, "SOFT_BIN")
+        expect = df.groupby(list(BinCount.DEFAULT_BY) + ["SOFT_BIN", "FAIL_FLAG"]).size()
+        self.assertEqual(count["COUNT"].tolist(), expect.tolist())
+        self.assertEqual(count["SITE_NUM"].tolist(), expect.index.get_level_values("SITE_NUM").tolist())
+
+    @Tester()
+    def test_pareto(self):
+        pareto = BinCount.pareto(self.df, "HARD_BIN", by=["GROUP"])
+        self.assertEqual(pareto.index.tolist(), [3, 2])
+        self.assertEqual(pareto.loc[3, "B"], 2)
+        self.assertAlmostEqual(pareto["CUM_PERCENT"].iloc[-1], 4 / 6)
+
+    @Tester()
+    def test_gen_hbr(self):
+        hbr = PandasStdfUtils.df_generator_hbr(self.df, 1, 0xff, {3: "OS"})
+        self.assertEqual([each["HBIN_NUM"] for each in hbr], [1, 2, 3])
+        self.assertEqual([each["HBIN_CNT"] for each in hbr], [2, 1, 3])
+        self.assertEqual(hbr[0]["HBIN_PF"], "P")
+        self.assertEqual(hbr[2]["HBIN_NAM"], "OS")
+
+
+class ChartDataCase(unittest.TestCase):
+    group_df = {
+        "A@*": pd.DataFrame({"PART_ID": [1, 2, 3, 4], 1: [0.1, 0.2, np.nan, 0.9]}),
+        "B@*": pd.DataFrame({"PART_ID": [], 1: []}),
+    }
+
+    @Tester()
+    def test_group_histogram(self):
+        bins = np.linspace(0, 1, 3)
+        result = ChartData.group_histogram(self.group_df, 1, bins)
+        self.assertEqual(result["A@*"].tolist(), [2, 1])
+        self.assertEqual(result["B@*"].tolist(), [0, 0])
+
+    @Tester()
+    def test_histogram_edge(self):
+        """ 边界上的值和 value_counts(bins=...) 一样算到左边一格 """
+        bins = np.linspace(0, 1, 5)
+        values = np.array([0, 0.25, 0.5, 0.5, 0.75, 1, 0.3, -0.1, 1.1, np.nan])
+        expect = pd.Series(values).value_counts(bins=bins, sort=False).to_numpy()
+        self.assertEqual(ChartData.histogram(values, bins).tolist(), expect.tolist())
+        self.assertEqual(ChartData.histogram(values, bins).tolist(), [2, 3, 1, 1])
+
+    @Tester()
+    def test_group_points(self):
+        result = ChartData.group_points(self.group_df, 1, step=2)
+        self.assertEqual(result["A@*"][0].tolist(), [1, 3])
+        self.assertEqual(len(result["B@*"][0]), 0)
@@ -0,0 +1,278 @@
+"""
+-*- coding: utf-8 -*-
+@Author  : Link
+@Time    : 2023/2/14 21:40
+@Site    :
+@File    : export_test.py
+@Software: PyCharm
+@Remark  : 数据导出, 结果要能被 pd.read_csv 原样读回
+"""
+import os
+import struct
+import tempfile
+import time
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from app_test.test_utils.wrapper_utils import Tester
+from app_test.test_utils.log_utils import Print
+from common.export_interface.csv_export import CsvExport
+from common.export_interface.data_export import DataExport, ExportFormat
+from common.app_variable import DataModule, GlobalVariable
+from common.export_interface.export_cache import ExportCache
+from common.stdf_interface.stdf_bulk_write import StdfBulkWrite
+from common.stdf_interface.stdf_def_interface import Mir
+
+
+class CsvExportCase(unittest.TestCase):
+    df = pd.DataFrame({
+        "SOFT_BIN": np.array([1, -3, 1200, 0], dtype=np.int64),
+        "GROUP": ["LOT,A", 'B"1', None, "中文"],
+        "F32": np.array([-1.9999999, 0.125, np.nan, -0.0000001], dtype=np.float32),
+        "SMALL": [1.2e-12, np.nan, -3.4e-9, 0.0],
+    })
+
+    def path(self, name: str) -> str:
+        return os.path.join(tempfile.gettempdir(), name)
+
+    @Tester()
+    def test_float_format(self):
+        def text(values, precision):
+            codes = CsvExport.float_codes(np.array(values), precision)
+            return ["".join(chr(each) for each in row if each) for row in codes]
+
+        self.assertEqual(text([-1.9999999, 0.125, np.nan, 12.5, -3], 3), ["-2", "0.125", "", "12.5", "-3"])
+        # 有效数字不够的列不用定点格式
+        self.assertEqual(text([1e-7, 1.5], 3), ["1e-07", "1.5"])
+        # 和 to_csv 一样, 只有NAN为空
+        self.assertEqual(text([np.inf, -np.inf, np.nan, 0], 3), ["inf", "-inf", "", "0"])
+        self.assertEqual(text([1e-7, -np.inf, np.nan], 3), ["1e-07", "-inf", ""])
+
+    @Tester()
+    def test_nullable_int(self):
+        df = pd.DataFrame({
+            "A": pd.array([1, None, -3], dtype="Int64"),
+            "B": pd.array([None, None, None], dtype="UInt64"),
+            "C": [1.5, np.inf, -np.inf],
+        })
+        fast_path, pandas_path = self.path("csv_export_na_fast.csv"), self.path("csv_export_na_pandas.csv")
+        CsvExport.write(df, fast_path, precision=6)
+        df.to_csv(pandas_path, encoding="utf_8_sig", index=False)
+        with open(fast_path, "rb") as fast, open(pandas_path, "rb") as pandas:
+            self.assertEqual(fast.read(), pandas.read())
+
+    @Tester()
+    def test_read_back(self):
+        file_path = self.path("csv_export_test.csv")
+        values = []
+        CsvExport.write(self.df, file_path, precision=6, chunk_size=3, progress=values.append)
+        self.assertEqual(values[-1], 100)
+        read = pd.read_csv(file_path, encoding="utf_8_sig")
+        self.assertEqual(list(read.columns), list(self.df.columns))
+        self.assertEqual(list(read.SOFT_BIN), [1, -3, 1200, 0])
+        self.assertEqual(read.GROUP[0], "LOT,A")
+        self.assertEqual(read.GROUP[1], 'B"1')
+        self.assertTrue(pd.isna(read.GROUP[2]))
+        self.assertTrue(np.allclose(read.F32, self.df.F32, rtol=1e-6, atol=0, equal_nan=True))
+        self.assertTrue(np.allclose(read.SMALL, self.df.SMALL, rtol=1e-9, atol=0, equal_nan=True))
+
+    @Tester()
+    def test_same_as_to_csv(self):
+        df = pd.DataFrame(np.random.randint(-1000, 1000, (50, 4)) / 8, columns=["A", "B", "C", "D"])
+        fast_path, pandas_path = self.path("csv_export_fast.csv"), self.path("csv_export_pandas.csv")
+        CsvExport.write(df, fast_path, precision=6)
+        df.to_csv(pandas_path, encoding="utf_8_sig", index=False)
+        fast, pandas = pd.read_csv(fast_path, encoding="utf_8_sig"), pd.read_csv(pandas_path, encoding="utf_8_sig")
+        self.assertTrue(fast.equals(pandas))
+
+
+class DataExportCase(unittest.TestCase):
+    df = pd.DataFrame({
+        "GROUP": ["A", "B", "A"],
+        "SOFT_BIN": [1, 7, 1],
+        1: np.array([0.5, np.nan, 2.25], dtype=np.float32),
+    })
+
+    @Tester()
+    def test_format_fallback(self):
+        file_path = os.path.join(tempfile.gettempdir(), "data_export_test.csv")
+        export_format = DataExport.usable_format(ExportFormat.PARQUET)
+        file_path = DataExport.write(self.df, file_path, ExportFormat.PARQUET)
+        self.assertTrue(file_path.endswith(ExportFormat.SUFFIX[export_format]))
+        if export_format == ExportFormat.PARQUET:
+            read = pd.read_parquet(file_path)
+            self.assertEqual(read["1"].dtype, np.float32)
+            self.assertEqual(read.GROUP.dtype.name, "category")
+        else:
+            read = pd.read_csv(file_path, encoding="utf_8_sig")
+        self.assertEqual(list(read.SOFT_BIN.astype(int)), [1, 7, 1])
+
+    @unittest.skipUnless(DataExport.available(ExportFormat.PARQUET), "需要pyarrow")
+    @Tester(exec_time=True)
+    def test_benchmark(self):
+        """ 10万颗 x 500项, 导出和读回的时间 """
+        df = pd.DataFrame(np.random.randn(100_000, 500).astype(np.float32))
+        df.insert(0, "GROUP", np.random.choice(["LOT1", "LOT2", "LOT3"], len(df)))
+        df.insert(1, "SOFT_BIN", np.random.randint(1, 30, len(df)))
+        for export_format in ExportFormat.FORMATS:
+            start = time.perf_counter()
+            file_path = DataExport.write(df, os.path.join(tempfile.gettempdir(), "benchmark.csv"), export_format)
+            export_time = time.perf_counter() - start
+            start = time.perf_counter()
+            if export_format == ExportFormat.PARQUET:
+                pd.read_parquet(file_path)
+            else:
+                pd.read_csv(file_path, encoding="utf_8_sig")
+            Print.info("{}: export {:.2f}s, open {:.2f}s, size {:.1f}MB".format(
+                export_format, export_time, time.perf_counter() - start, os.path.getsize(file_path) / 1e6
+            ))
+
+
+class ExportCacheCase(unittest.TestCase):
+    df = pd.DataFrame({"GROUP": ["A", "B"], "SOFT_BIN": [1, 7], 1: [0.5, 1.5]})
+
+    def setUp(self) -> None:
+        self.cache_path = tempfile.mkdtemp()
+
+    @Tester()
+    def test_key(self):
+        key = ExportCache.key(self.df, "CSV", 6)
+        self.assertEqual(key, ExportCache.key(self.df.copy(), "CSV", 6))
+        self.assertNotEqual(key, ExportCache.key(self.df, "CSV", 3))
+        self.assertNotEqual(key, ExportCache.key(self.df.iloc[:1], "CSV", 6))
+        self.assertNotEqual(key, ExportCache.key(self.df.rename(columns={1: 2}), "CSV", 6))
+
+    @Tester()
+    def test_cached_write(self):
+        first, hit = DataExport.cached_write(self.df, self.cache_path)
+        self.assertFalse(hit)
+        second, hit = DataExport.cached_write(self.df.copy(), self.cache_path)
+        self.assertTrue(hit)
+        self.assertEqual(first, second)
+        self.assertEqual(os.listdir(self.cache_path), [os.path.basename(first)])
+
+    @Tester()
+    def test_evict(self):
+        paths = []
+        for index in range(3):
+            path, _ = DataExport.cached_write(self.df.assign(SOFT_BIN=index), self.cache_path)
+            os.utime(path, (index, index))
+            paths.append(path)
+        size = os.path.getsize(paths[0])
+        DataExport.cached_write(self.df.assign(SOFT_BIN=3), self.cache_path, max_bytes=size * 2)
+        self.assertFalse(os.path.exists(paths[0]))
+        self.assertFalse(os.path.exists(paths[1]))
+        self.assertTrue(os.path.exists(paths[2]))
+
+
+class StdfBulkWriteCase(unittest.TestCase):
+    """
+    3颗DIE, 测试项 100:VDD(PTR), 200:FUNC(FTR); DIE 2 没有FUNC的数据
+    """
+
+    @staticmethod
+    def df_module() -> DataModule:
+        prr_df = pd.DataFrame({
+            "PART_ID": [1, 2, 3], "PART_TXT": ["", "", "x"], "HEAD_NUM": 1, "SITE_NUM": ["S000", "S001", "S000"],
+            "X_COORD": [0, 1, -2], "Y_COORD": [5, 5, 6], "HARD_BIN": [1, 2, 1], "SOFT_BIN": [1, 7, 1],
+            "PART_FLG": 0, "FAIL_FLAG": [1, 0, 1], "TEST_T": 100,
+        })
+        dtp_df = pd.DataFrame({
+            "PART_ID": [1, 2, 3, 1, 3],
+            "TEST_ID": [0, 0, 0, 1, 1],
+            "RESULT": [0.5, 1.5, 0.25, 0, 0],
+            "TEST_FLG": [0, 128, 0, 0, 0],
+            "PARM_FLG": [0, 0, 0, 0, 0],
+        })
+        ptmd_df = pd.DataFrame({each: [0, 0] for each in GlobalVariable.PTMD_HEAD})
+        ptmd_df["TEST_ID"] = [0, 1]
+        ptmd_df["DATAT_TYPE"] = ["PTR", "FTR"]
+        ptmd_df["TEST_NUM"] = [100, 200]
+        ptmd_df["TEST_TXT"] = ["VDD", "FUNC"]
+        ptmd_df["UNITS"] = ["V", ""]
+        ptmd_df[["C_RESFMT", "C_LLMFMT", "C_HLMFMT"]] = ""
+        ptmd_df["LO_LIMIT"] = [0.0, np.nan]
+        ptmd_df["HI_LIMIT"] = [1.0, np.nan]
+        ptmd_df[["LO_SPEC", "HI_SPEC"]] = np.nan
+        return DataModule(prr_df=prr_df, dtp_df=dtp_df, ptmd_df=ptmd_df)
+
+    @staticmethod
+    def read_records(path: str) -> list:
+        """ [(REC_TYP, REC_SUB, body)] """
+        with open(path, "rb") as f:
+            data = f.read()
+        records, offset = [], 0
+        while offset < len(data):
+            rec_len, rec_typ, rec_sub = struct.unpack_from("<HBB", data, offset)
+            records.append((rec_typ, rec_sub, data[offset + 4: offset + 4 + rec_len]))
+            offset += 4 + rec_len
+        return records
+
+    @Tester()
+    def test_write(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "out.stdf")
+            size = StdfBulkWrite.write(path, self.df_module(), Mir(LOT_ID="LOT1", START_T=10))
+            self.assertEqual(size, os.path.getsize(path))
+            records = self.read_records(path)
+        kinds = [(typ, sub) for typ, sub, _ in records]
+        self.assertEqual(kinds[:3], [(0, 10), (0, 20), (1, 10)])
+        self.assertEqual(kinds[3:13], [
+            (5, 10), (15, 10), (15, 20), (5, 20), (5, 10), (15, 10), (5, 20), (5, 10), (15, 10), (15, 20),
+        ])
+        self.assertEqual(kinds[-1], (1, 20))
+        self.assertEqual(kinds[14:-1], [(1, 40)] * 2 + [(1, 50)] * 2)
+        self.assertEqual(records[2][2][15:20], b"\x04LOT1")
+
+        ptr = [body for typ, sub, body in records if (typ, sub) == (15, 10)]
+        test_num, head, site, test_flg, parm_flg, result = struct.unpack_from("<IBBBBf", ptr[1])
+        self.assertEqual((test_num, site, test_flg, result), (100, 1, 128, 1.5))
+        # 第一条PTR带Limit, 之后的只有TEST_TXT
+        self.assertEqual(ptr[1][12:], b"\x03VDD\x00")
+        opt_flag, _, _, _, lo, hi = struct.unpack_from("<Bbbbff", ptr[0], 17)
+        self.assertEqual((opt_flag & 0xC0, lo, hi), (0, 0.0, 1.0))
+        ftr = [body for typ, sub, body in records if (typ, sub) == (15, 20)]
+        self.assertTrue(ftr[0].endswith(b"\x04FUNC\x00"))
+
+        prr = [body for typ, sub, body in records if (typ, sub) == (5, 20)]
+        site, part_flg, num_test, hard_bin, soft_bin, x, y = struct.unpack_from("<BBHHHhh", prr[1], 1)
+        self.assertEqual((site, part_flg, num_test, hard_bin, soft_bin, x), (1, 8, 1, 2, 7, 1))
+        self.assertEqual(prr[2][17:], b"\x013\x01x\x00")
+
+    @Tester()
+    def test_missing_coord(self):
+        """ 没有坐标的DIE写STDF的无效值 -32768, 不是(0, 0) """
+        df_module = self.df_module()
+        df_module.prr_df["X_COORD"] = [0, np.nan, -2]
+        df_module.prr_df["Y_COORD"] = [5, np.nan, 6]
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "out.stdf")
+            StdfBulkWrite.write(path, df_module, Mir(LOT_ID="LOT1", START_T=10))
+            records = self.read_records(path)
+        prr = [body for typ, sub, body in records if (typ, sub) == (5, 20)]
+        coords = [struct.unpack_from("<hh", each, 9) for each in prr]
+        self.assertEqual(coords, [(0, 5), (-32768, -32768), (-2, 6)])
+
+    @Tester()
+    def test_benchmark(self):
+        n_part, n_test = 5000, 200
+        module = self.df_module()
+        prr_df = pd.DataFrame({
+            "PART_ID": np.arange(n_part), "SITE_NUM": np.arange(n_part) % 4, "HARD_BIN": 1, "SOFT_BIN": 1,
+        })
+        dtp_df = pd.DataFrame({
+            "PART_ID": np.repeat(np.arange(n_part), n_test), "TEST_ID": np.tile(np.arange(n_test), n_part),
+            "RESULT": np.random.rand(n_part * n_test).astype(np.float32), "TEST_FLG": 0,
+        })
+        ptmd_df = pd.concat([module.ptmd_df.iloc[[0]]] * n_test, ignore_index=True)
+        ptmd_df["TEST_ID"] = ptmd_df["TEST_NUM"] = np.arange(n_test)
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "out.stdf")
+            start = time.perf_counter()
+            StdfBulkWrite.write(path, DataModule(prr_df=prr_df, dtp_df=dtp_df, ptmd_df=ptmd_df))
+            use_time = time.perf_counter() - start
+            Print.info("1M PTR stdf write: {}s, {}MB".format(round(use_time, 3), os.path.getsize(path) >> 20))
+            records = self.read_records(path)
+        self.assertEqual(sum(1 for typ, sub, _ in records if (typ, sub) == (15, 10)), n_part * n_test)
@@ -0,0 +1,63 @@
+"""
+-*- coding: utf-8 -*-
+@Author  : Link
+@Time    : 2023/2/26 17:00
+@Site    :
+@File    : log_test.py
+@Software: PyCharm
+@Remark  : print 的缓冲(LogBuffer), 界面部分见 LogSink
+"""
+import threading
+import unittest
+from contextlib import redirect_stdout
+
+from app_test.test_utils.wrapper_utils import Tester
+from common.log_buffer import LogBuffer
+
+
+class LogBufferCase(unittest.TestCase):
+
+    @Tester()
+    def test_drain(self):
+        buffer = LogBuffer()
+        with redirect_stdout(buffer.stdout):
+            print("00:===a")
+            print("b", "c")
+            print()
+        buffer.stderr.write("err\n")
+        buffer.stdout.write("no line end")
+        self.assertEqual(buffer.drain(), [
+            (False, "00:===a"), (False, "b c"), (True, "err"), (False, "no line end"),
+        ])
+        self.assertEqual(buffer.drain(), [])
+
+    @Tester()
+    def test_max_writes(self):
+        buffer = LogBuffer(max_size=4)
+        for index in range(6):
+            print(index, file=buffer.stdout)
+        # 满了丢掉最早的, 每个print是两次write
+        self.assertEqual(len(buffer), 4)
+        self.assertEqual(buffer.drain(max_writes=2), [(False, "4")])
+        self.assertEqual(buffer.drain(), [(False, "5")])
+
+    @Tester()
+    def test_threads(self):
+        buffer = LogBuffer()
+
+        def job(name):
+            for index in range(1000):
+                buffer.stdout.write("{}-{}\n".format(name, index))
+
+        threads = [threading.Thread(target=job, args=(each,)) for each in range(4)]
+        for each in threads:
+            each.start()
+        for each in threads:
+            each.join()
+        lines = [line for _, line in buffer.drain()]
+        self.assertEqual(len(lines), 4000)
+        self.assertEqual([line for line in lines if line.startswith("2-")][:3], ["2-0", "2-1", "2-2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
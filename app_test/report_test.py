@@ -0,0 +1,192 @@
+"""
+-*- coding: utf-8 -*-
+@Author  : Link
+@Time    : 2023/2/18 11:30
+@Site    :
+@File    : report_test.py
+@Software: PyCharm
+@Remark  : 报表的计算部分, 不需要Excel
+"""
+import json
+import os
+import tempfile
+import unittest
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+
+from app_test.test_utils.wrapper_utils import Tester
+from common.app_variable import DataModule, DatatType, FailFlag, GlobalVariable
+from common.cal_interface.data_merge import DataMerge
+from common.cal_interface.limit_diff import LimitDiff
+from common.cal_interface.lot_compare import LotCompare
+
+
+class LimitDiffCase(unittest.TestCase):
+    """
+    LOT的顺序按summary, 3 -> 1 -> 2; ID 2 没有测试项B
+    """
+    summary_df = pd.DataFrame({"ID": [3, 1, 2], "LOT_ID": ["L3", "L1", "L2"]})
+    limit_df = pd.DataFrame({
+        "ID": [3, 3, 1, 1, 2, 2],
+        "TEST_ID": [0, 1, 0, 1, 0, 0],
+        "TEXT": ["A", "B", "A", "B", "A", "A"],
+        "UNITS": "V",
+        "LO_LIMIT": [0, 1, 0, 2, 0.5, 9],
+        "HI_LIMIT": [1, 2, 1, 3, 1, 9],
+    })
+
+    @Tester()
+    def test_calculation(self):
+        diff = LimitDiff.calculation(self.summary_df, self.limit_df)
+        self.assertEqual(list(diff.tests.TEXT), ["A", "B"])
+        self.assertTrue(np.allclose(diff.lo_limit, [[0, 0, 0.5], [1, 2, np.nan]], equal_nan=True))
+        self.assertEqual(diff.lo_change.tolist(), [[False, False, True], [False, True, False]])
+        self.assertEqual(diff.hi_change.tolist(), [[False, False, False], [False, True, False]])
+        self.assertEqual(diff.first_change.tolist(), [2, 1])
+
+    @Tester()
+    def test_render(self):
+        diff = LimitDiff.calculation(self.summary_df, self.limit_df)
+        df = LimitDiff.to_frame(diff)
+        self.assertEqual(list(df.columns[3:6]), ["FIRST_CHANGE_ID", "3_LO_LIMIT", "3_HI_LIMIT"])
+        self.assertEqual(list(df.FIRST_CHANGE_ID), [2, 1])
+        data = LimitDiff.to_json(diff)
+        self.assertEqual(data["lots"], [3, 1, 2])
+        self.assertEqual(data["tests"][1]["LO_LIMIT"], [1.0, 2.0, None])
+        no_change = replace(diff, first_change=np.array([-1, -1]))
+        self.assertEqual(LimitDiff.to_json(no_change)["tests"], [])
+        self.assertEqual(len(LimitDiff.to_frame(no_change, only_change=True)), 0)
+
+    @Tester()
+    def test_save(self):
+        diff = LimitDiff.calculation(self.summary_df, self.limit_df)
+        with tempfile.TemporaryDirectory() as folder:
+            csv_path = LimitDiff.save(diff, os.path.join(folder, "limit.csv"))
+            read = pd.read_csv(csv_path, encoding="utf_8_sig")
+            with open(LimitDiff.save(diff, os.path.join(folder, "limit.json")), encoding="utf-8") as f:
+                data = json.load(f)
+        self.assertEqual(list(read.columns), list(LimitDiff.to_frame(diff).columns))
+        self.assertEqual(read["1_LO_LIMIT"].tolist(), [0, 2])
+        self.assertEqual(read["2_LO_LIMIT"][0], 0.5)
+        self.assertTrue(np.isnan(read["2_LO_LIMIT"][1]))
+        self.assertEqual(data, LimitDiff.to_json(diff, only_change=False))
+
+
+class LotCompareCase(unittest.TestCase):
+    """
+    ID 1/2 同一个LOT不同WAFER, ID 3 是另一个LOT; PART_TYP 都一样, 不参与分组
+    """
+    summary_df = pd.DataFrame({
+        "ID": [1, 2, 3],
+        "PART_TYP": ["P", "P", "P"],
+        "LOT_ID": ["L1", "L1", "L2"],
+        "WAFER_ID": ["W1", "W1", "W2"],
+    })
+
+    def df_module(self) -> DataModule:
+        rng = np.random.default_rng(1)
+        ptmd_df = pd.DataFrame({
+            "TEST_ID": [10, 11], "TEXT": ["A", "B"], "DATAT_TYPE": [DatatType.PTR, DatatType.FTR],
+            "LO_LIMIT": [0.0, 0.0], "HI_LIMIT": [10.0, 1.0],
+        })
+        die = np.arange(60)
+        prr_df = pd.DataFrame({"ID": np.repeat([1, 2, 3], 20), "FAIL_FLAG": np.where(die % 10 == 0, 0, 1)})
+        dtp_df = pd.DataFrame({
+            "TEST_ID": np.repeat([10, 11], 60),
+            "DIE_ID": np.tile(die, 2),
+            "ID": np.tile(prr_df.ID, 2),
+            "RESULT": np.concatenate([rng.normal(5, 1, 60), np.ones(60)]),
+            "FAIL_FLG": np.tile(prr_df.FAIL_FLAG, 2),
+        }).set_index(["TEST_ID", "DIE_ID"])
+        return DataModule(prr_df=prr_df, dtp_df=dtp_df, ptmd_df=ptmd_df)
+
+    @Tester()
+    def test_calculation(self):
+        df_module = self.df_module()
+        compare = LotCompare.calculation(self.summary_df, df_module)
+        self.assertEqual(compare.keys, ["LOT_ID", "WAFER_ID"])
+        self.assertEqual(list(compare.lots.LOT_ID), ["L1", "L2"])
+        self.assertEqual(list(compare.lots.QTY), [40, 20])
+        self.assertTrue(np.allclose(compare.lots.YIELD, [0.9, 0.9]))
+
+        dtp_df = df_module.dtp_df.loc[10]
+        pass_df = dtp_df[dtp_df.FAIL_FLG == FailFlag.PASS]
+        expect = pass_df.groupby(pass_df.ID.map({1: 0, 2: 0, 3: 1})).RESULT.agg(["mean", "std"])
+        self.assertTrue(np.allclose(compare.avg[0], expect["mean"]))
+        self.assertTrue(np.allclose(compare.std[0], expect["std"]))
+        cpk = np.minimum((10 - expect["mean"]) / (3 * expect["std"]), expect["mean"] / (3 * expect["std"]))
+        self.assertTrue(np.allclose(compare.cpk[0], cpk))
+        self.assertTrue(np.allclose(compare.reject_rate[0], [0.1, 0.1]))
+        self.assertTrue(np.isnan(compare.cpk[1]).all())  # FTR
+
+        df = LotCompare.to_frame(compare)
+        self.assertEqual(len(df), 4)
+        self.assertEqual(list(df.columns[:4]), ["LOT_ID", "WAFER_ID", "TEST_ID", "TEXT"])
+
+
+class DataMergeCase(unittest.TestCase):
+    """
+    文件1: 10:A@P1, 20:B; 文件2: 20:B2, 10:A@P2, 30:C
+    """
+
+    @staticmethod
+    def module(unit_id: int, texts: list) -> DataModule:
+        ptmd_df = pd.DataFrame({each: [0] * len(texts) for each in GlobalVariable.PTMD_HEAD})
+        ptmd_df["TEST_ID"] = range(len(texts))
+        ptmd_df["TEST_NUM"] = [int(each.split(":")[0]) for each in texts]
+        ptmd_df["TEST_TXT"] = [each.split(":")[1] for each in texts]
+        ptmd_df[["DATAT_TYPE", "UNITS", "C_RESFMT", "C_LLMFMT", "C_HLMFMT"]] = ""
+        ptmd_df.insert(0, "ID", unit_id)
+        ptmd_df["TEXT"] = texts
+        dtp_df = pd.DataFrame({
+            "ID": unit_id,
+            "PART_ID": np.tile([1, 2], len(texts)),
+            "TEST_ID": np.repeat(np.arange(len(texts)), 2).astype(np.uint32),
+            "RESULT": unit_id * 100 + np.repeat(np.arange(len(texts)), 2).astype(np.float32),
+        })
+        prr_df = pd.DataFrame({"ID": unit_id, "PART_ID": [1, 2]})
+        return DataModule(prr_df=prr_df, dtp_df=dtp_df, ptmd_df=ptmd_df)
+
+    def modules(self):
+        return [self.module(1, ["10:A@P1", "20:B"]), self.module(2, ["20:B2", "10:A@P2", "30:C"])]
+
+    @Tester()
+    def test_keys(self):
+        mapping = pd.DataFrame({"TEXT": ["20:B2"], "KEY": ["20:B"]})
+        for key, texts in (
+                (DataMerge.TEXT, ["10:A@P1", "20:B", "20:B2", "10:A@P2", "30:C"]),
+                (DataMerge.TEST_NUM, ["10:A@P2", "20:B2", "30:C"]),
+                (DataMerge.TEXT_93K, ["10:A@P2", "20:B", "20:B2", "30:C"]),
+                (DataMerge.MAPPING, ["10:A@P1", "20:B2", "10:A@P2", "30:C"]),
+        ):
+            module = DataMerge.merge(self.modules(), key, mapping)
+            self.assertEqual(list(module.ptmd_df.TEXT), texts, key)
+            self.assertEqual(list(module.ptmd_df.TEST_ID), list(range(1, len(texts) + 1)))
+            self.assertEqual(len(module.dtp_df), 10)
+            self.assertTrue(module.dtp_df.TEST_ID.is_monotonic_increasing)
+
+    @Tester()
+    def test_dtp(self):
+        module = DataMerge.merge(self.modules(), DataMerge.TEST_NUM)
+        result = module.dtp_df.groupby("TEST_ID").RESULT.apply(list).to_dict()
+        # TEST_NUM 10: 文件1的TEST_ID 0, 文件2的TEST_ID 1
+        self.assertEqual(result[1], [100, 100, 201, 201])
+        self.assertEqual(result[3], [202, 202])
+        self.assertEqual(len(module.prr_df), 4)
+        dictionary = DataMerge.key_dictionary(pd.concat([each.ptmd_df for each in self.modules()]), DataMerge.TEXT_93K)
+        self.assertEqual(list(dictionary.KEY[:2]), ["10:A", "10:A"])
+        with self.assertRaises(ValueError):
+            DataMerge.merge(self.modules(), "NOT_A_KEY")
+
+    @Tester()
+    def test_key_collision(self):
+        """ 同一个文件中两个 TEST_NUM=0 的FTR, 不能合并成一个测试项 """
+        modules = [self.module(1, ["0:F1", "0:F2", "20:B"]), self.module(2, ["0:F1", "0:F2", "20:B2"])]
+        module = DataMerge.merge(modules, DataMerge.TEST_NUM)
+        self.assertEqual(list(module.ptmd_df.TEXT), ["0:F1", "0:F2", "20:B2"])
+        self.assertTrue(module.dtp_df.set_index(["ID", "TEST_ID", "PART_ID"]).index.is_unique)
+        self.assertEqual(module.dtp_df.groupby("TEST_ID").RESULT.apply(list)[2], [101, 101, 201, 201])
+        dictionary = DataMerge.key_dictionary(pd.concat([each.ptmd_df for each in modules]), DataMerge.TEST_NUM)
+        self.assertEqual(sorted(set(dictionary.KEY)), ["0:F1", "0:F2", "20"])
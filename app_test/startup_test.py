@@ -0,0 +1,165 @@
+"""
+-*- coding: utf-8 -*-
+@Author  : Link
+@Time    : 2023/2/26 11:30
+@Site    :
+@File    : startup_test.py
+@Software: PyCharm
+@Remark  : 启动时间: 进程开始到第一个窗口显示, 用 -X importtime 统计import的时间
+           STDF_EAGER_IMPORT=1 时是延迟import之前的启动方式, 两个一起跑做对比
+"""
+import ast
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+import pandas as pd
+
+from app_test.test_utils.log_utils import Print
+from app_test.test_utils.wrapper_utils import Tester
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_SCRIPT = """
+import json, os, sys, time
+start = time.perf_counter()
+from app import main_ui
+from common.lazy_import import LazyImport
+from ui_component.ui_main.ui_main import Application
+app = Application(sys.argv)
+win = main_ui(license_control=False)
+win.show()
+app.processEvents()
+use_time = time.perf_counter() - start
+sys.stdout = sys.__stdout__
+print(json.dumps({"TIME": use_time, "LOADED": [each for each in LazyImport.MODULES if each in sys.modules]}))
+sys.stdout.flush()
+os._exit(0)
+"""
+
+
+class ImportTime:
+    """ 解析 -X importtime 的输出 """
+
+    @staticmethod
+    def parse(stderr: str) -> pd.DataFrame:
+        """
+        import time: self [us] | cumulative | imported package
+        import time:       120 |        450 | pandas
+        import time:        12 |         34 |   pandas.core  <- 缩进是层级
+        :return: [MODULE, SELF, CUMULATIVE, LEVEL], 时间是ms
+        """
+        rows = []
+        for line in stderr.splitlines():
+            if not line.startswith("import time:") or "imported package" in line:
+                continue
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            level = (len(name) - len(name.lstrip()) - 1) // 2
+            rows.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000, level))
+        return pd.DataFrame(rows, columns=["MODULE", "SELF", "CUMULATIVE", "LEVEL"])
+
+    @staticmethod
+    def total(df: pd.DataFrame) -> float:
+        """ 所有import的时间, ms """
+        return round(df[df.LEVEL == 0].CUMULATIVE.sum(), 1)
+
+    @staticmethod
+    def top(df: pd.DataFrame, num: int = 10) -> pd.DataFrame:
+        """ 最上层的import按累计时间排序 """
+        return df[df.LEVEL == 0].sort_values("CUMULATIVE", ascending=False).head(num)
+
+    @staticmethod
+    def missing_names(source: str) -> list:
+        """
+        source 中 from ... import 的项目模块, 要import的名字在模块中没有定义的, 不用import(不需要PySide2)
+        :return: [(模块, 名字)]
+        """
+        missing = []
+        for node in ast.walk(ast.parse(source)):
+            if not isinstance(node, ast.ImportFrom) or node.module is None:
+                continue
+            path = os.path.join(ROOT, *node.module.split(".")) + ".py"
+            if not os.path.isfile(path):
+                continue
+            with open(path, encoding="utf-8") as f:
+                tree = ast.parse(f.read())
+            defined = set()
+            for each in tree.body:
+                if isinstance(each, (ast.ClassDef, ast.FunctionDef)):
+                    defined.add(each.name)
+                elif isinstance(each, ast.Assign):
+                    defined.update(target.id for target in each.targets if isinstance(target, ast.Name))
+                elif isinstance(each, (ast.Import, ast.ImportFrom)):
+                    defined.update((alias.asname or alias.name).split(".")[0] for alias in each.names)
+            missing.extend((node.module, alias.name) for alias in node.names
+                           if alias.name != "*" and alias.name not in defined)
+        return missing
+
+    @staticmethod
+    def startup(eager: bool = False) -> dict:
+        """
+        子进程中启动到第一个窗口
+        :return: {TIME: 秒, LOADED: 启动时就import了的延迟模块, IMPORT: -X importtime 的 DataFrame}
+        """
+        env = dict(os.environ, QT_QPA_PLATFORM="offscreen", STDF_EAGER_IMPORT="1" if eager else "0")
+        out = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT],
+            capture_output=True, text=True, cwd=ROOT, env=env, timeout=300,
+        )
+        if out.returncode != 0:
+            raise RuntimeError(out.stderr[-2000:])
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        result["IMPORT"] = ImportTime.parse(out.stderr)
+        return result
+
+
+@unittest.skipIf(importlib.util.find_spec("PySide2") is None, "PySide2 not installed")
+class StartupCase(unittest.TestCase):
+
+    @Tester()
+    def test_startup(self):
+        lazy, eager = ImportTime.startup(), ImportTime.startup(eager=True)
+        Print.print_table([
+            {
+                "MODE": mode,
+                "FIRST_WINDOW(s)": round(each["TIME"], 3),
+                "IMPORT(ms)": ImportTime.total(each["IMPORT"]),
+                "MODULES": len(each["IMPORT"]),
+            }
+            for mode, each in (("LAZY", lazy), ("EAGER", eager))
+        ])
+        Print.print_table(ImportTime.top(lazy["IMPORT"]).to_dict(orient="records"))
+        self.assertEqual(lazy["LOADED"], [])
+        self.assertLess(len(lazy["IMPORT"]), len(eager["IMPORT"]))
+
+
+class ImportTimeCase(unittest.TestCase):
+
+    @Tester()
+    def test_parse(self):
+        stderr = "\n".join([
+            "import time: self [us] | cumulative | imported package",
+            "import time:       100 |        100 |   pandas.core",
+            "import time:       500 |        600 | pandas",
+            "import time:      1500 |       1500 | PySide2",
+            "other output",
+        ])
+        df = ImportTime.parse(stderr)
+        self.assertEqual(list(df.LEVEL), [1, 0, 0])
+        self.assertEqual(list(ImportTime.top(df).MODULE), ["PySide2", "pandas"])
+        self.assertAlmostEqual(ImportTime.total(df), 2.1)
+
+    @Tester()
+    def test_startup_names(self):
+        """ 没有PySide2时 StartupCase 跳过, 至少检查启动时import的名字都还在 """
+        with open(os.path.join(ROOT, "app.py"), encoding="utf-8") as f:
+            self.assertEqual(ImportTime.missing_names(f.read()), [])
+        self.assertEqual(ImportTime.missing_names(STARTUP_SCRIPT), [])
+        self.assertEqual(ImportTime.missing_names("from common.trace import Nothing"), [("common.trace", "Nothing")])
+
+
+if __name__ == '__main__':
+    unittest.main()
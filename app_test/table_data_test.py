@@ -0,0 +1,205 @@
+"""
+-*- coding: utf-8 -*-
+@Author  : Link
+@Time    : 2023/2/19 11:00
+@Site    :
+@File    : table_data_test.py
+@Software: PyCharm
+@Remark  : 表格的数据部分, 不需要Qt
+"""
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from app_test.test_utils.wrapper_utils import Tester
+from common.app_variable import FailFlag
+from common.cal_interface.capability_table import CapabilityTable
+from common.cal_interface.die_match import DieMatch
+from common.cal_interface.process_table import ProcessTable
+from common.cal_interface.table_search import TableSearch
+
+
+class CapabilityTableCase(unittest.TestCase):
+    """
+    第三行是FTR, CPK是NAN
+    """
+    capability_key_list = [
+        {"TEST_ID": 2, "TEST_NUM": 100, "TEST_TXT": "VDD_Short", "LO_LIMIT": 0.1, "HI_LIMIT": 1.0, "CPK": 0.5,
+         "FAIL_QTY": 0, "REJECT_QTY": 3, "LO_LIMIT_TYPE": "GT", "HI_LIMIT_TYPE": "LT"},
+        {"TEST_ID": 0, "TEST_NUM": 20, "TEST_TXT": "IDD", "LO_LIMIT": 0.0, "HI_LIMIT": 2.0, "CPK": 3.0,
+         "FAIL_QTY": 5, "REJECT_QTY": 0, "LO_LIMIT_TYPE": "GE", "HI_LIMIT_TYPE": "LE"},
+        {"TEST_ID": 1, "TEST_NUM": 3, "TEST_TXT": "func_vdd", "LO_LIMIT": 0.0, "HI_LIMIT": 1.0, "CPK": np.nan,
+         "FAIL_QTY": 5, "REJECT_QTY": 5, "LO_LIMIT_TYPE": "GT", "HI_LIMIT_TYPE": "LT"},
+    ]
+
+    @Tester()
+    def test_sort_order(self):
+        df = CapabilityTable.to_frame(self.capability_key_list)
+        self.assertEqual(CapabilityTable.sort_order(df.TEST_ID).tolist(), [1, 2, 0])
+        # NAN在最后, 相同的值保持原来的先后
+        self.assertEqual(CapabilityTable.sort_order(df.CPK, ascending=False).tolist(), [1, 0, 2])
+        self.assertEqual(CapabilityTable.sort_order(df.FAIL_QTY, ascending=False).tolist(), [1, 2, 0])
+        self.assertEqual(CapabilityTable.sort_order(df.TEST_TXT).tolist(), [1, 0, 2])
+
+    @Tester()
+    def test_clamp_mask(self):
+        df = CapabilityTable.to_frame(self.capability_key_list)
+        masks = CapabilityTable.clamp_mask(df, 0, 1, 0, 0)
+        self.assertEqual(masks[CapabilityTable.CPK].tolist(), [True, False, False])
+        self.assertEqual(masks[CapabilityTable.TOP_FAIL].tolist(), [False, True, True])
+        self.assertEqual(masks[CapabilityTable.REJECT].tolist(), [True, False, True])
+        order = CapabilityTable.sort_order(df.TEST_ID)
+        self.assertEqual(CapabilityTable.mask_points(masks[CapabilityTable.REJECT], order).tolist(), [2, 1])
+
+    @Tester()
+    def test_limit_dict(self):
+        df = CapabilityTable.to_frame(self.capability_key_list)
+        limit = CapabilityTable.limit_dict(df, np.array([1]))
+        self.assertEqual(limit, {0: (0.0, 2.0, "GE", "LE")})
+        self.assertEqual(len(CapabilityTable.limit_dict(df)), 3)
+
+
+
+class TableSearchCase(unittest.TestCase):
+    df = CapabilityTable.to_frame([
+        {"TEST_ID": 0, "TEST_NUM": 100, "TEST_TXT": "VDD_OS", "CPK": 0.8, "FAIL_RATE": "0.05%", "TEXT": "100:VDD_OS"},
+        {"TEST_ID": 1, "TEST_NUM": 200, "TEST_TXT": "IDD_Leak", "CPK": 2.1, "FAIL_RATE": "0.5%", "TEXT": "200:IDD_Leak"},
+        {"TEST_ID": 2, "TEST_NUM": 300, "TEST_TXT": "VDD_Leak", "CPK": np.nan, "FAIL_RATE": "1.2%",
+         "TEXT": "300:VDD_Leak"},
+    ])
+
+    @Tester()
+    def test_text(self):
+        index = TableSearch.build(self.df)
+        self.assertEqual(TableSearch.query(index, "leak").tolist(), [False, True, True])
+        self.assertEqual(TableSearch.query(index, "vdd_").tolist(), [True, False, True])
+        self.assertEqual(TableSearch.query(index, "v*k").tolist(), [False, False, True])
+        # 通配符不跨列
+        self.assertEqual(TableSearch.query(index, "os*200").tolist(), [False, False, False])
+        self.assertEqual(TableSearch.query(index, r"re:^\d00$").tolist(), [True, True, True])
+        self.assertEqual(TableSearch.query(index, "").tolist(), [True, True, True])
+        with self.assertRaises(ValueError):
+            TableSearch.query(index, "re:(")
+
+    @Tester()
+    def test_number(self):
+        index = TableSearch.build(self.df)
+        self.assertEqual(TableSearch.query(index, "CPK<1.33").tolist(), [True, False, False])
+        self.assertEqual(TableSearch.query(index, "fail_rate >= 0.5%").tolist(), [False, True, True])
+        self.assertEqual(TableSearch.query(index, "FAIL_RATE>0.1% vdd").tolist(), [False, False, True])
+
+    @Tester()
+    def test_trigram_candidates(self):
+        """ 候选行一定包含所有真实匹配 """
+        index = TableSearch.build(self.df)
+        for text in ("dd_", "leak", "00:v", "xyz", "d"):
+            truth = [text in each for each in index.texts]
+            self.assertEqual(TableSearch.query(index, text).tolist(), truth)
+
+
+
+class ProcessTableCase(unittest.TestCase):
+    """
+    B@X 只有一颗PASS, STD是NAN; C@X 全部FAIL
+    """
+    jmp_df = pd.DataFrame({
+        "GROUP": ["A", "A", "A", "B", "B", "C"],
+        "DA_GROUP": "X",
+        "FAIL_FLAG": [FailFlag.PASS, FailFlag.PASS, FailFlag.FAIL, FailFlag.PASS, FailFlag.FAIL, FailFlag.FAIL],
+        "1:VDD": [1.0, 3.0, 9.0, 2.0, 5.0, 7.0],
+        "2:IDD": [0.5, 0.5, 0.1, 0.2, 0.3, 0.4],
+    })
+    calculation = {
+        "1:VDD": {"TEST_ID": 1, "DATAT_TYPE": "P", "UNITS": "V", "LO_LIMIT": 0.0, "HI_LIMIT": 4.0,
+                  "LO_LIMIT_TYPE": "GT", "HI_LIMIT_TYPE": "LT"},
+        "2:IDD": {"TEST_ID": 2, "DATAT_TYPE": "P", "UNITS": "A", "LO_LIMIT": 0.0, "HI_LIMIT": 1.0,
+                  "LO_LIMIT_TYPE": "GT", "HI_LIMIT_TYPE": "LT"},
+    }
+
+    @Tester()
+    def test_yield_table(self):
+        df = ProcessTable.yield_table(self.jmp_df)
+        self.assertEqual(df.Item.tolist(), ["A@X", "B@X", "C@X"])
+        self.assertEqual(df.Pass.tolist(), [2, 1, 0])
+        self.assertEqual(df.Fail.tolist(), [1, 1, 1])
+        self.assertEqual(df.Yield.tolist(), ["66.667%", "50.0%", "0.0%"])
+
+    @Tester()
+    def test_data_table(self):
+        df = ProcessTable.data_table(self.jmp_df, self.calculation, ["MEAN", "CPK"])
+        self.assertEqual(list(df.columns[8:]), ["A@X_AVG", "A@X_CPK", "B@X_AVG", "B@X_CPK", "C@X_AVG", "C@X_CPK"])
+        self.assertEqual(df.TEXT.tolist(), ["1:VDD", "2:IDD"])
+        self.assertEqual(df["A@X_AVG"].tolist(), [2.0, 0.5])
+        # (4 - 2) / (3 * std([1, 3]))
+        self.assertAlmostEqual(df["A@X_CPK"][0], 2 / (3 * np.sqrt(2)))
+        # std为0时CPK是0
+        self.assertEqual(df["A@X_CPK"][1], 0)
+        self.assertTrue(np.isnan(df["B@X_CPK"][0]))
+        self.assertTrue(df[["C@X_AVG", "C@X_CPK"]].isna().all().all())
+
+    @Tester()
+    def test_data_same_as_loop(self):
+        """ 和逐个分组计算的结果一样 """
+        df = ProcessTable.data_table(self.jmp_df, self.calculation, ["MEAN", "STD"])
+        for (group, da_group), each_df in self.jmp_df.groupby(["GROUP", "DA_GROUP"]):
+            pass_df = each_df[each_df.FAIL_FLAG == FailFlag.PASS][list(self.calculation)]
+            name = "{}@{}".format(group, da_group)
+            self.assertTrue(np.allclose(df[name + "_AVG"], pass_df.mean().round(5), equal_nan=True))
+            self.assertTrue(np.allclose(df[name + "_STD"], pass_df.std().round(5), equal_nan=True))
+
+    @Tester()
+    def test_value_table(self):
+        df = ProcessTable.value_table(self.jmp_df[self.jmp_df.GROUP == "A"], self.calculation)
+        self.assertEqual(list(df.columns[7:11]), ["AVG", "STD", "CPK", "QTY"])
+        self.assertEqual(df.AVG.tolist(), [2.0, 0.5])
+        self.assertEqual(df.QTY.tolist(), [3, 3])
+        self.assertEqual(df.CPK[1], 0)
+
+
+class DieMatchCase(unittest.TestCase):
+    """
+    (1, 1) 在CP1中复测过, 取最后一次; (3, 3) 只在CP2中
+    """
+    cp1 = pd.DataFrame({
+        "X_COORD": [1, 2, 1, 4], "Y_COORD": [1, 2, 1, 4],
+        "VDD": [9.0, 2.0, 1.0, 4.0], "IDD": [1.0, 2.0, 3.0, np.nan],
+    })
+    cp2 = pd.DataFrame({
+        "X_COORD": [4, 2, 1, 3], "Y_COORD": [4, 2, 1, 3],
+        "VDD": [4.4, 2.2, 1.1, 5.0], "IDD": [2.0, 4.0, 6.0, 1.0],
+    })
+    calculation = {
+        "VDD": {"TEST_ID": 0, "DATAT_TYPE": "P", "UNITS": "V", "LO_LIMIT": 0, "HI_LIMIT": 5},
+        "IDD": {"TEST_ID": 1, "DATAT_TYPE": "P", "UNITS": "A", "LO_LIMIT": 0, "HI_LIMIT": 5},
+    }
+
+    @Tester()
+    def test_match(self):
+        base_rows, other_rows = DieMatch.match(self.cp1, self.cp2)
+        pairs = sorted(zip(base_rows.tolist(), other_rows.tolist()))
+        self.assertEqual(pairs, [(1, 1), (2, 2), (3, 0)])
+
+    @Tester()
+    def test_compare(self):
+        df = DieMatch.compare(self.cp1, self.cp2, self.calculation)
+        vdd, idd = df.iloc[0], df.iloc[1]
+        self.assertEqual(vdd.QTY, 3)
+        self.assertAlmostEqual(vdd.DELTA_AVG, (0.1 + 0.2 + 0.4) / 3, places=5)
+        self.assertAlmostEqual(vdd.DELTA_MAX, 0.4)
+        self.assertAlmostEqual(vdd.RATIO_AVG, 1.1)
+        self.assertAlmostEqual(vdd.CORR, 1.0)
+        # (4, 4) 的IDD在CP1中没有值
+        self.assertEqual(idd.QTY, 2)
+        self.assertAlmostEqual(idd.BASE_AVG, 2.5)
+        self.assertAlmostEqual(idd.CORR, np.corrcoef([2, 3], [4, 6])[0, 1])
+
+    @Tester()
+    def test_die_delta(self):
+        df = DieMatch.die_delta(self.cp1, self.cp2, self.calculation)
+        self.assertEqual(len(df), 3)
+        self.assertEqual(list(df.columns), ["X_COORD", "Y_COORD", "VDD", "IDD"])
+
+
+if __name__ == '__main__':
+    unittest.main()
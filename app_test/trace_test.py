@@ -0,0 +1,116 @@
+"""
+-*- coding: utf-8 -*-
+@Author  : Link
+@Time    : 2023/2/26 22:10
+@Site    :
+@File    : trace_test.py
+@Software: PyCharm
+@Remark  : 耗时记录(Trace), 嵌套的span和Chrome Trace导出
+"""
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+import pandas as pd
+
+from app_test.test_utils.wrapper_utils import Tester
+from common.app_variable import DataModule
+from common.trace import Trace
+
+
+class Calculation:
+
+    @staticmethod
+    @Trace.span()
+    def inner(df: pd.DataFrame) -> pd.DataFrame:
+        return df[df.A > 1]
+
+    @staticmethod
+    @Trace.span("outer")
+    def outer(df: pd.DataFrame, fail: bool = False) -> DataModule:
+        with Trace.block("block", file="a.stdf") as span:
+            span.set(rows=len(df))
+        if fail:
+            raise ValueError("fail")
+        return DataModule(prr_df=df, dtp_df=Calculation.inner(df), ptmd_df=df)
+
+
+class TraceCase(unittest.TestCase):
+    df = pd.DataFrame({"A": [1, 2, 3]})
+
+    def setUp(self):
+        self.enabled = Trace.enabled
+        Trace.clear()
+
+    def tearDown(self):
+        Trace.enable(self.enabled)
+        Trace.clear()
+
+    @Tester()
+    def test_disabled(self):
+        Trace.enable(False)
+        self.assertEqual(len(Calculation.outer(self.df).dtp_df), 2)
+        with Trace.block("none") as span:
+            span.set(rows=1)
+        self.assertEqual(len(Trace.buffer), 0)
+        self.assertEqual(Calculation.inner.__name__, "inner")
+
+    @Tester()
+    def test_span(self):
+        Trace.enable(True)
+        Calculation.outer(self.df)
+        with self.assertRaises(ValueError):
+            Calculation.outer(self.df, fail=True)
+        df = Trace.events()
+        self.assertEqual(list(df.NAME), ["outer", "block", "Calculation.inner", "outer", "block"])
+        self.assertEqual(list(df.DEPTH), [0, 1, 1, 0, 1])
+        inner = df.ARGS[2]
+        self.assertEqual((inner["in_rows"], inner["out_rows"]), (3, 2))
+        self.assertGreater(inner["out_bytes"], 0)
+        self.assertEqual(df.ARGS[0]["out_rows"], 2)  # DataModule 是 dtp_df 的行数
+        self.assertEqual(df.ARGS[1], {"file": "a.stdf", "rows": 3})
+        self.assertEqual(df.ARGS[3]["error"], "ValueError")
+        self.assertTrue((df.DURATION >= 0).all())
+        summary = Trace.summary()
+        self.assertEqual(summary.set_index("NAME").COUNT.to_dict(), {"outer": 2, "block": 2, "Calculation.inner": 1})
+
+    @Tester()
+    def test_threads(self):
+        Trace.enable(True)
+        barrier = threading.Barrier(4)  # 都结束前线程id不会重复
+
+        def job():
+            Calculation.outer(self.df)
+            barrier.wait()
+
+        threads = [threading.Thread(target=job) for _ in range(4)]
+        for each in threads:
+            each.start()
+        for each in threads:
+            each.join()
+        df = Trace.events()
+        self.assertEqual(df.TID.nunique(), 4)
+        self.assertEqual(sorted(df.DEPTH.value_counts().to_dict().items()), [(0, 4), (1, 8)])
+
+    @Tester()
+    def test_chrome(self):
+        Trace.enable(True)
+        Calculation.outer(self.df)
+        with tempfile.TemporaryDirectory() as folder:
+            file_path = os.path.join(folder, "trace.json")
+            Trace.to_chrome(file_path)
+            with open(file_path, encoding="utf-8") as f:
+                trace = json.load(f)
+        events = trace["traceEvents"]
+        self.assertEqual(len(events), 3)
+        self.assertEqual({each["ph"] for each in events}, {"X"})
+        outer = [each for each in events if each["name"] == "outer"][0]
+        for each in events:
+            self.assertGreaterEqual(each["ts"], outer["ts"])
+            self.assertLessEqual(each["ts"] + each["dur"], outer["ts"] + outer["dur"] + 1E-3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -21,6 +21,30 @@ class JmpFile:
             f.write(jmp_script)
         win32api.ShellExecute(0, 'open', scrip_name, '', '', 1)
 
+    @staticmethod
+    def load_file(filepath: str):
+        """
+        按后缀选择打开方式, 数据文件由 DataExport 产生
+        :param filepath:
+        :return:
+        """
+        if filepath.endswith(".parquet"):
+            return JmpFile.load_parquet_file(filepath)
+        return JmpFile.load_csv_file(filepath)
+
+    @staticmethod
+    def load_parquet_file(filepath: str):
+        """
+        Parquet自带类型, 不需要Import Settings去扫描推断, 需要JMP18以上
+        :param filepath:
+        :return:
+        """
+        return """
+        Open( "{filepath}", Invisible );
+        Column("HARD_BIN") << Data Type(Character) << Set Modeling Type(Nominal);
+        Column("SOFT_BIN") << Data Type(Character) << Set Modeling Type(Nominal);
+        """.format(filepath=filepath)
+
     @staticmethod
     def load_csv_file(filepath: str):
         """
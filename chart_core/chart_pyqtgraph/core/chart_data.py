@@ -0,0 +1,64 @@
+"""
+-*- coding: utf-8 -*-
+@Author  : Link
+@Time    : 2023/2/13 20:10
+@Site    :
+@File    : chart_data.py
+@Software: PyCharm
+@Remark  : chart要用的派生数据(分布/散点抽样), 纯numpy, 可以在后台线程中计算
+"""
+
+from typing import Dict, Tuple, Hashable
+
+import numpy as np
+import pandas as pd
+
+
+class ChartData:
+    """
+    key: {group}@{da_group}, 和 ToChartCsv.group_df 保持一样
+    """
+
+    @staticmethod
+    def group_histogram(group_df: Dict[str, pd.DataFrame], key: Hashable,
+                        bins: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        :param group_df: ToChartCsv.group_df or group_chart_df
+        :param key: TEST_ID
+        :param bins: 分组边界
+        :return: 每个分组 len(bins) - 1 个数量
+        """
+        result = {}
+        for group, df in group_df.items():
+            if key not in df or len(df) == 0:
+                result[group] = np.zeros(len(bins) - 1, dtype=np.int64)
+                continue
+            result[group] = ChartData.histogram(df[key].to_numpy(dtype=np.float64), bins)
+        return result
+
+    @staticmethod
+    def histogram(values: np.ndarray, bins: np.ndarray) -> np.ndarray:
+        """
+        和以前的 value_counts(bins=bins) 一样: 右闭区间 (a, b], 第一个区间包含左边界, 范围外和NAN不计
+        np.histogram 是左闭的, 正好在边界上的值(ATE量化的结果/按Limit分的边界很常见)会算到上一格
+        """
+        bins = np.asarray(bins, dtype=np.float64)
+        values = values[(values >= bins[0]) & (values <= bins[-1])]
+        index = np.maximum(np.searchsorted(bins, values, side="left") - 1, 0)
+        return np.bincount(index, minlength=len(bins) - 1)[:len(bins) - 1]
+
+    @staticmethod
+    def group_points(group_df: Dict[str, pd.DataFrame], key: Hashable,
+                     step: int = 1) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """
+        散点图用, 每 step 颗取一颗
+        :return: 每个分组 (PART_ID, RESULT)
+        """
+        step = max(int(step), 1)
+        result = {}
+        for group, df in group_df.items():
+            if key not in df or len(df) == 0:
+                result[group] = (np.array([]), np.array([]))
+                continue
+            result[group] = (df.PART_ID.to_numpy()[::step], df[key].to_numpy()[::step])
+        return result
@@ -0,0 +1,256 @@
+"""
+-*- coding: utf-8 -*-
+@Author  : Link
+@Time    : 2023/2/13 20:40
+@Site    :
+@File    : chart_service.py
+@Software: PyCharm
+@Remark  : 一个Li一个ChartDataService, 所有chart共用数据缓存, 只重绘看得到的chart
+"""
+
+from collections import deque
+from threading import Lock
+from typing import List, Dict, Tuple, Hashable, Callable, Union
+
+import numpy as np
+import pandas as pd
+from PySide2.QtCore import QObject, QThread, Signal
+
+from chart_core.chart_pyqtgraph.core.chart_data import ChartData
+from chart_core.chart_pyqtgraph.core.wafer_map import WaferRaster, RasterCache
+from common.li import Li
+from ui_component.ui_common.qt_li import QtLi
+from ui_component.ui_app_variable import UiGlobalVariable
+
+
+class QthChartData(QThread):
+    """
+    后台计算chart的数据, 队列中的函数不能碰Qt的对象
+    任务: (owner, generation, job, callback), 同一个owner只保留最新的任务, 结果通过dataSignal送回GUI线程
+    """
+    dataSignal = Signal(object)
+
+    def __init__(self, parent=None):
+        super(QthChartData, self).__init__(parent)
+        self.jobs = deque()
+        self.lock = Lock()
+        self.finished.connect(self.restart)
+
+    def put(self, owner, generation: int, job: Callable, callback: Union[Callable, None] = None):
+        with self.lock:
+            if owner is not None:
+                # 还没开始的旧任务直接丢掉, 快速缩放时不会堆积
+                self.jobs = deque(each for each in self.jobs if each[0] is not owner)
+            self.jobs.append((owner, generation, job, callback))
+        if not self.isRunning():
+            self.start()
+
+    def restart(self):
+        """ run退出和put之间加进来的job """
+        if self.jobs and not self.isRunning():
+            self.start()
+
+    def run(self) -> None:
+        while True:
+            with self.lock:
+                if not self.jobs:
+                    break
+                owner, generation, job, callback = self.jobs.popleft()
+            try:
+                result = job()
+            except Exception as err:
+                print("QthChartData: " + repr(err))
+                continue
+            if callback is not None:
+                self.dataSignal.emit((owner, generation, callback, result))
+
+
+class ChartDataService(QObject):
+    """
+    1. 代替每个chart各自去连接 li.QChartSelect/QChartRefresh, 由这里统一分发
+    2. 看不到的chart(滚动区域外的)只标记dirty, 滚动到可见时再重绘, 并在后台先把数据算好
+    3. 派生数据(分布/散点抽样/栅格)都放在同一个有上限的缓存中, 同一个TEST_ID的多个chart共用
+    4. 重绘时先在后台跑 data_job 把数据放进缓存, 再回到GUI线程 set_front_chart
+       每个chart有generation, 新的请求会让旧的结果作废
+    chart 需要有: set_front_chart, action_signal_binding, generation, 可选的 data_job
+    """
+    li: Li = None
+
+    def __init__(self, li: Li):
+        super(ChartDataService, self).__init__()
+        self.li = li
+        self.cache = RasterCache(max_size=UiGlobalVariable.GraphDataCacheSize)
+        self.charts = []
+        self.dirty = []
+        self.worker = QthChartData(self)
+        self.worker.dataSignal.connect(self.on_data)
+        li_signal = QtLi.of(li)
+        li_signal.QChartSelect.connect(self.li_chart_signal)
+        li_signal.QChartRefresh.connect(self.li_chart_signal)
+
+    @staticmethod
+    def of(li: Li) -> "ChartDataService":
+        if li.chart_service is None:
+            li.chart_service = ChartDataService(li)
+        return li.chart_service
+
+    def subscribe(self, chart):
+        if chart not in self.charts:
+            self.charts.append(chart)
+
+    def unsubscribe(self, chart):
+        if chart in self.charts:
+            self.charts.remove(chart)
+        if chart in self.dirty:
+            self.dirty.remove(chart)
+
+    def mark_dirty(self, chart):
+        """ 新建的chart先不画, 等看得到的时候再画 """
+        self.subscribe(chart)
+        if chart not in self.dirty:
+            self.dirty.append(chart)
+
+    @staticmethod
+    def is_visible(chart) -> bool:
+        return chart.isVisible() and not chart.visibleRegion().isEmpty()
+
+    def li_chart_signal(self):
+        for chart in list(self.charts):
+            try:
+                if not chart.action_signal_binding.isChecked():
+                    continue
+            except RuntimeError:  # C++对象已经被删除
+                self.unsubscribe(chart)
+                continue
+            self.mark_dirty(chart)
+        self.flush()
+        self.prefetch()
+
+    def flush(self):
+        """
+        重绘看得到的dirty chart, 滚动或是显示的时候调用
+        """
+        for chart in list(self.dirty):
+            try:
+                if not self.is_visible(chart):
+                    continue
+            except RuntimeError:
+                self.unsubscribe(chart)
+                continue
+            self.dirty.remove(chart)
+            self.request(chart)
+
+    def prefetch(self):
+        """
+        看不到的chart先在后台把数据算好, 滚动到的时候直接取缓存
+        """
+        for chart in self.dirty:
+            data_job = getattr(chart, "data_job", None)
+            if data_job is None:
+                continue
+            job = data_job()
+            if job is not None:
+                self.worker.put(chart, chart.generation, job)
+
+    def submit(self, chart, job: Callable, callback: Callable):
+        """
+        job 在后台线程运行, callback(result) 回到GUI线程运行, 期间有新的submit则结果作废
+        """
+        chart.generation += 1
+        self.worker.put(chart, chart.generation, job, callback)
+
+    def request(self, chart):
+        """
+        重绘chart, 有 data_job 的先在后台算好数据
+        """
+        data_job = getattr(chart, "data_job", None)
+        job = data_job() if data_job is not None else None
+        if job is None:
+            chart.generation += 1
+            chart.set_front_chart()
+            return
+        self.submit(chart, job, lambda _: chart.set_front_chart())
+
+    def on_data(self, task: tuple):
+        chart, generation, callback, result = task
+        if chart is not None and chart.generation != generation:
+            return  # 过期的结果
+        try:
+            callback(result)
+        except RuntimeError:  # chart已经被删除
+            self.unsubscribe(chart)
+
+    # ================================================================= 派生数据
+
+    def source(self, front: bool) -> Tuple[Union[pd.DataFrame, None], Dict[str, pd.DataFrame]]:
+        """
+        :param front: True 为选取的数据(chart_df), 没有选取时为空
+        :return: 用于校验缓存的df, 分组后的数据
+        """
+        data = self.li.to_chart_csv_data
+        if data is None:
+            return None, {}
+        if front:
+            return data.chart_df, data.group_chart_df or {}
+        return data.df, data.group_df or {}
+
+    def group_histogram(self, key: Hashable, bins: np.ndarray, front: bool = False) -> Dict[str, np.ndarray]:
+        df, group_df = self.source(front)
+        if df is None:
+            return {}
+        cache_key = ("HIST", key, front, float(bins[0]), float(bins[-1]), len(bins))
+        result = self.cache.get(cache_key, df)
+        if result is None:
+            result = ChartData.group_histogram(group_df, key, bins)
+            self.cache.set(cache_key, df, result)
+        return result
+
+    def group_points(self, key: Hashable, step: int = 1,
+                     front: bool = False) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        df, group_df = self.source(front)
+        if df is None:
+            return {}
+        cache_key = ("POINTS", key, front, step)
+        result = self.cache.get(cache_key, df)
+        if result is None:
+            result = ChartData.group_points(group_df, key, step)
+            self.cache.set(cache_key, df, result)
+        return result
+
+    def raster_key(self, kind: str, key: Hashable, data_df: pd.DataFrame, coord: Tuple[int, int, int, int]):
+        return (
+            kind,
+            key,
+            tuple(self.li.group_params or ()),
+            tuple(self.li.da_group_params or ()),
+            data_df is self.li.to_chart_csv_data.df,
+            UiGlobalVariable.GraphMapDuplicate,
+            coord,
+        )
+
+    def raster(self, key: int, data_df: pd.DataFrame, coord: Tuple[int, int, int, int]) -> Tuple[List[str], np.ndarray]:
+        """
+        :return: GROUP名, [group, x, y]
+        """
+        cache_key = self.raster_key("RASTER", key, data_df, coord)
+        result = self.cache.get(cache_key, data_df)
+        if result is None:
+            result = WaferRaster.rasterize_df(
+                data_df, key, coord, group_by="GROUP", policy=UiGlobalVariable.GraphMapDuplicate
+            )
+            self.cache.set(cache_key, data_df, result)
+        return result
+
+    def bin_raster(self, bin_head: str, data_df: pd.DataFrame,
+                   coord: Tuple[int, int, int, int]) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        :return: GROUP名, BIN, [group, x, y]
+        """
+        cache_key = self.raster_key("BIN_RASTER", bin_head, data_df, coord)
+        result = self.cache.get(cache_key, data_df)
+        if result is None:
+            result = WaferRaster.rasterize_bin_df(
+                data_df, bin_head, coord, group_by="GROUP", policy=UiGlobalVariable.GraphMapDuplicate
+            )
+            self.cache.set(cache_key, data_df, result)
+        return result
@@ -14,6 +14,7 @@ from enum import Enum
 import numpy as np
 from pyqtgraph import PlotWidget, InfiniteLine
 
+from chart_core.chart_pyqtgraph.core.chart_service import ChartDataService
 from common.li import Li
 from ui_component.ui_app_variable import UiGlobalVariable
 
@@ -70,6 +71,7 @@ class BasePlot:
     pw: PlotWidget = None
     rota: int = None
     li: Li = None
+    service: ChartDataService = None
     p_range: RangeData = None
     line_init: bool = False
 
@@ -241,13 +243,16 @@ class BasePlot:
     def set_front_chart(self):
         pass
 
+    def set_select_data(self, data):
+        """
+        select_range 在后台筛选并拆分完数据后, 回到GUI线程更新 chart_df
+        :param data: (chart_df, group_chart_df) or None
+        """
+        if data is None:
+            return
+        self.li.set_chart_data(*data)
+
     def __del__(self):
         print("chart delete")
-        try:
-            self.li.QChartSelect.disconnect(self.set_front_chart)
-        except RuntimeError:
-            pass
-        try:
-            self.li.QChartRefresh.disconnect(self.set_front_chart)
-        except RuntimeError:
-            pass
+        if self.service is not None:
+            self.service.unsubscribe(self)
@@ -0,0 +1,213 @@
+"""
+-*- coding: utf-8 -*-
+@Author  : Link
+@Time    : 2023/2/12 10:20
+@Site    :
+@File    : wafer_map.py
+@Software: PyCharm
+@Remark  : 纯numpy的wafer map栅格化, 取代 visual.pyx 中的 coord_to_np, 不再需要编译
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Tuple, Hashable, Union, List
+
+import numpy as np
+import pandas as pd
+
+from common.app_variable import FailFlag
+
+
+class MapDuplicate:
+    """
+    同一个坐标上有多颗数据(复测)时的取值方式
+    """
+    LAST = "LAST"
+    FIRST = "FIRST"
+    MEAN = "MEAN"
+    WORST = "WORST"  # 优先取FAIL的那次测试, 没有FAIL就取最后一次
+    POLICIES = (LAST, FIRST, MEAN, WORST)
+
+
+class WaferRaster:
+    """
+    所有GROUP一次性栅格化到一个 [group, x, y] 的三维数组中
+    坐标在进来之前需要先减去 x_min/y_min
+    """
+
+    @staticmethod
+    def coord_range(df: pd.DataFrame) -> Tuple[int, int, int, int]:
+        """
+        :return: x_min, y_min, x_size, y_size
+        """
+        x_min, x_max = int(df.X_COORD.min()), int(df.X_COORD.max())
+        y_min, y_max = int(df.Y_COORD.min()), int(df.Y_COORD.max())
+        return x_min, y_min, x_max - x_min + 1, y_max - y_min + 1
+
+    @staticmethod
+    def pick_index(flat: np.ndarray, policy: str = MapDuplicate.LAST,
+                   fail: Union[np.ndarray, None] = None) -> np.ndarray:
+        """
+        每个栅格只保留一条数据, 返回保留数据的下标
+        :param flat: 展开后的栅格位置
+        :param policy: MapDuplicate, MEAN不在这里处理
+        :param fail: FAIL_FLAG, 只有WORST会用到
+        :return:
+        """
+        if policy == MapDuplicate.FIRST:
+            _, index = np.unique(flat, return_index=True)
+            return index
+        if policy == MapDuplicate.WORST and fail is not None:
+            # lexsort 以最后一个key为主: 坐标 -> 是否FAIL -> 出现顺序, 取每个坐标的最后一条
+            order = np.arange(len(flat))
+            sort = np.lexsort((order, fail == FailFlag.FAIL, flat))
+        else:
+            sort = np.argsort(flat, kind="stable")
+        sorted_flat = flat[sort]
+        last = np.append(sorted_flat[1:] != sorted_flat[:-1], True)
+        return sort[last]
+
+    @staticmethod
+    def rasterize(x: np.ndarray, y: np.ndarray, values: np.ndarray, groups: np.ndarray, group_count: int,
+                  shape: Tuple[int, int], policy: str = MapDuplicate.LAST, fail: Union[np.ndarray, None] = None,
+                  fill=np.nan, dtype=np.float64) -> np.ndarray:
+        """
+        :param x: 减去x_min后的坐标
+        :param y: 减去y_min后的坐标
+        :param values: 需要放到栅格中的值, NAN(没有测到这个项目)会被跳过
+        :param groups: 每颗数据所属的GROUP编码, 0 ~ group_count-1
+        :param group_count:
+        :param shape: (x_size, y_size)
+        :param policy: MapDuplicate
+        :param fail: FAIL_FLAG, 用于WORST
+        :param fill: 没有数据的栅格的值
+        :param dtype:
+        :return: [group_count, x_size, y_size]
+        """
+        x_size, y_size = shape
+        size = group_count * x_size * y_size
+        data = np.full(size, fill, dtype=dtype)
+        x = np.asarray(x, dtype=np.int64)
+        y = np.asarray(y, dtype=np.int64)
+        groups = np.asarray(groups, dtype=np.int64)
+        values = np.asarray(values)
+
+        valid = (x >= 0) & (x < x_size) & (y >= 0) & (y < y_size) & (groups >= 0)
+        if values.dtype.kind == "f":
+            valid &= ~np.isnan(values)
+        flat = ((groups * x_size + x) * y_size + y)[valid]
+        values = values[valid]
+        if len(flat) == 0:
+            return data.reshape(group_count, x_size, y_size)
+
+        if policy == MapDuplicate.MEAN:
+            total = np.bincount(flat, weights=values, minlength=size)
+            count = np.bincount(flat, minlength=size)
+            hit = count > 0
+            data[hit] = total[hit] / count[hit]
+        else:
+            if fail is not None:
+                fail = np.asarray(fail)[valid]
+            index = WaferRaster.pick_index(flat, policy, fail)
+            data[flat[index]] = values[index]
+        return data.reshape(group_count, x_size, y_size)
+
+    @staticmethod
+    def rasterize_df(df: pd.DataFrame, column: Hashable, coord: Tuple[int, int, int, int],
+                     group_by: str = "GROUP", policy: str = MapDuplicate.LAST,
+                     fill=np.nan, dtype=np.float64) -> Tuple[List[str], np.ndarray]:
+        """
+        :param df: 需要有 X_COORD, Y_COORD, FAIL_FLAG, group_by 和 column
+        :param column: TEST_ID 或是 HARD_BIN/SOFT_BIN
+        :param coord: WaferRaster.coord_range 的结果, 同一个数据空间里面的Map要保持一样的大小
+        :param group_by:
+        :param policy:
+        :param fill:
+        :param dtype:
+        :return: 按顺序排列的GROUP名, [group, x, y]
+        """
+        x_min, y_min, x_size, y_size = coord
+        codes, keys = pd.factorize(df[group_by], sort=True)
+        fail = df["FAIL_FLAG"].to_numpy() if "FAIL_FLAG" in df else None
+        data = WaferRaster.rasterize(
+            df.X_COORD.to_numpy(dtype=np.int64) - x_min,
+            df.Y_COORD.to_numpy(dtype=np.int64) - y_min,
+            df[column].to_numpy(),
+            codes,
+            len(keys),
+            (x_size, y_size),
+            policy=policy,
+            fail=fail,
+            fill=fill,
+            dtype=dtype,
+        )
+        return [str(each) for each in keys], data
+
+    @staticmethod
+    def rasterize_bin_df(df: pd.DataFrame, bin_head: str, coord: Tuple[int, int, int, int],
+                         group_by: str = "GROUP", policy: str = MapDuplicate.LAST
+                         ) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Bin Map用, BIN先编码成 1 ~ len(bins), 0 是没有数据的栅格, 方便直接用LUT上色
+        BIN是类别数据, MEAN没有意义, 按LAST处理
+        :param df:
+        :param bin_head: HARD_BIN or SOFT_BIN
+        :param coord:
+        :param group_by:
+        :param policy:
+        :return: 按顺序排列的GROUP名, 排序后的BIN, [group, x, y] uint16
+        """
+        if policy == MapDuplicate.MEAN:
+            policy = MapDuplicate.LAST
+        x_min, y_min, x_size, y_size = coord
+        codes, keys = pd.factorize(df[group_by], sort=True)
+        bin_codes, bins = pd.factorize(df[bin_head], sort=True)
+        fail = df["FAIL_FLAG"].to_numpy() if "FAIL_FLAG" in df else None
+        data = WaferRaster.rasterize(
+            df.X_COORD.to_numpy(dtype=np.int64) - x_min,
+            df.Y_COORD.to_numpy(dtype=np.int64) - y_min,
+            np.where(bin_codes < 0, 0, bin_codes + 1).astype(np.uint16),
+            codes,
+            len(keys),
+            (x_size, y_size),
+            policy=policy,
+            fail=fail,
+            fill=0,
+            dtype=np.uint16,
+        )
+        return [str(each) for each in keys], np.asarray(bins), data
+
+
+class RasterCache:
+    """
+    缓存栅格化后的数据, key 一般是 (TEST_ID, 分组, 取值方式)
+    选取的数据(DataFrame)会一起存下来做校验, 数据变化后缓存自动失效, 也防止 id() 被复用
+    后台线程也会写入, 所以加锁
+    """
+
+    def __init__(self, max_size: int = 32):
+        self.max_size = max_size
+        self.cache = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key: Hashable, df: pd.DataFrame):
+        with self.lock:
+            entry = self.cache.get(key, None)
+            if entry is None:
+                return None
+            if entry[0] is not df:
+                del self.cache[key]
+                return None
+            self.cache.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Hashable, df: pd.DataFrame, value):
+        with self.lock:
+            self.cache[key] = (df, value)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
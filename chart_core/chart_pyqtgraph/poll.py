@@ -69,7 +69,7 @@ class ChartDockWindow(QMainWindow, Ui_MainWindow):
     def add_chart_dock(self, test_id_list: List[int], chart_type: ChartType):
         """
         TODO: Data Dock 待添加
-        :param test_id_list:
+        :param test_id_list: ChartType.BinMap/BinPareto 时为 ["HARD_BIN"] or ["SOFT_BIN"]
         :param chart_type:
         :return:
         """
@@ -90,6 +90,16 @@ class ChartDockWindow(QMainWindow, Ui_MainWindow):
             visual_map_chart.set_data(test_id_list, chart_type)
             dock = MyDock("参数性Map_{}".format(self.charts), size=(400, 400), closable=True)
             dock.addWidget(visual_map_chart)
+        if chart_type == ChartType.BinMap:
+            bin_map_chart = MultiChartWindow(self.li)
+            bin_map_chart.set_data(test_id_list, chart_type)
+            dock = MyDock("BinMap_{}".format(self.charts), size=(400, 400), closable=True)
+            dock.addWidget(bin_map_chart)
+        if chart_type == ChartType.BinPareto:
+            bin_pareto_chart = MultiChartWindow(self.li)
+            bin_pareto_chart.set_data(test_id_list, chart_type)
+            dock = MyDock("BinPareto_{}".format(self.charts), size=(400, 400), closable=True)
+            dock.addWidget(bin_pareto_chart)
         return self.add_dock(dock)
 
     def closeDock(self, dock_name):
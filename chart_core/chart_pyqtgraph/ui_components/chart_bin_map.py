@@ -5,5 +5,164 @@
 @File    : chart_bin_map.py
 @Author  : Link
 @Time    : 2022/12/11 12:35
-@Mark    : 使用散点图做的bin map
+@Mark    : bin map, 每个GROUP栅格化成一张uint16的图, 用LUT上色, 不再用散点图
 """
+import math
+
+import numpy as np
+from PySide2 import QtWidgets
+from PySide2.QtGui import QCloseEvent
+from PySide2.QtWidgets import QWidget
+from pyqtgraph import GraphicsLayoutWidget, ImageItem, LabelItem, intColor, mkColor
+
+from chart_core.chart_pyqtgraph.core.chart_service import ChartDataService
+from chart_core.chart_pyqtgraph.core.wafer_map import WaferRaster
+from chart_core.chart_pyqtgraph.ui_components.ui_unit_chart import UnitChartWindow
+from common.app_variable import FailFlag
+from common.li import Li
+
+
+class BinColor:
+    """
+    BIN 的颜色表, PASS BIN 用绿色系, FAIL BIN 用分散的色相
+    LUT的第0位是没有数据的栅格, 透明
+    """
+    PASS_COLORS = ("#00CC00", "#66FF66", "#009933", "#99FF99", "#33CC99", "#006600")
+
+    @staticmethod
+    def lut(bins: np.ndarray, pass_bins: set) -> np.ndarray:
+        """
+        :param bins: 排序后的BIN
+        :param pass_bins:
+        :return: [len(bins) + 1, 4] uint8
+        """
+        lut = np.zeros((len(bins) + 1, 4), dtype=np.uint8)
+        fail_count = max(len(bins) - len(pass_bins), 1)
+        pass_index, fail_index = 0, 0
+        for index, each in enumerate(bins):
+            if each in pass_bins:
+                color = mkColor(BinColor.PASS_COLORS[pass_index % len(BinColor.PASS_COLORS)])
+                pass_index += 1
+            else:
+                color = intColor(fail_index, hues=max(fail_count, 9), minValue=180)
+                fail_index += 1
+            lut[index + 1] = color.getRgb()
+        return lut
+
+
+class BinMapChart(UnitChartWindow):
+    """
+    最小单元是GROUP, 不限制GROUP的数量, 按网格排列
+    """
+    bin_head: str = "SOFT_BIN"
+    li: Li = None
+    service: ChartDataService = None
+
+    def __init__(self, li: Li):
+        super(BinMapChart, self).__init__()
+        self.li = li
+
+        self.widGet = QWidget()
+        self.pw = GraphicsLayoutWidget()
+        self.gridLayout = QtWidgets.QVBoxLayout(self.widGet)
+        self.label = QtWidgets.QLabel()
+        font = self.label.font()
+        font.setPointSize(15)
+        self.label.setFont(font)
+        self.gridLayout.addWidget(self.label)
+        self.gridLayout.addWidget(self.pw)
+        self.setCentralWidget(self.widGet)
+        self.service = ChartDataService.of(self.li)
+        self.service.subscribe(self)
+
+    def set_data(self, bin_head: str = "SOFT_BIN"):
+        """
+        :param bin_head: HARD_BIN or SOFT_BIN
+        :return:
+        """
+        if self.li is None:
+            raise Exception("first set li")
+        self.bin_head = bin_head
+        self.set_title("Bin Map: " + bin_head)
+        self.label.setText(bin_head)
+
+    def pw_show(self):
+        self.show()
+
+    def set_title(self, title: str = "Bin Map"):
+        self.setWindowTitle(title)
+
+    def get_data_df(self):
+        if self.li.to_chart_csv_data.chart_df is None:
+            return self.li.to_chart_csv_data.df
+        return self.li.to_chart_csv_data.chart_df
+
+    def get_raster(self, data_df):
+        """
+        坐标范围用全部数据的, 选取后Map大小不变
+        :param data_df:
+        :return: GROUP名, BIN, [group, x, y]
+        """
+        coord = WaferRaster.coord_range(self.li.to_chart_csv_data.df)
+        return self.service.bin_raster(self.bin_head, data_df, coord)
+
+    def data_job(self):
+        """ 后台预先栅格化 """
+        if self.li.to_chart_csv_data.df is None:
+            return None
+        data_df = self.get_data_df()
+        if data_df is None or len(data_df) == 0:
+            return None
+        service, bin_head = self.service, self.bin_head
+        coord = WaferRaster.coord_range(self.li.to_chart_csv_data.df)
+        return lambda: service.bin_raster(bin_head, data_df, coord)
+
+    def set_front_chart(self):
+        if self.li.to_chart_csv_data.df is None:
+            return
+        data_df = self.get_data_df()
+        self.pw.clear()
+        if data_df is None or len(data_df) == 0:
+            self.label.setText("无有效数据")
+            return
+        group_keys, bins, raster = self.get_raster(data_df)
+        pass_bins = set(data_df.loc[data_df.FAIL_FLAG == FailFlag.PASS, self.bin_head].unique())
+        lut = BinColor.lut(bins, pass_bins)
+        levels = (0, len(lut))
+        row = math.ceil(math.sqrt(len(group_keys)))
+        for index, key in enumerate(group_keys):
+            t_row, t_col = divmod(index, row)
+            im = ImageItem(image=raster[index], lut=lut, levels=levels)
+            plot_item = self.pw.addPlot(t_row, t_col, 1, 1, title=key)
+            plot_item.hideAxis("left")
+            plot_item.hideAxis("bottom")
+            plot_item.getViewBox().invertY(True)
+            plot_item.getViewBox().setAspectLocked(True)
+            plot_item.addItem(im)
+            plot_item.setMouseEnabled(x=False, y=False)
+        self.pw.addItem(self.legend(bins, pass_bins, lut, raster), 0, row + 1, max(row, 1), 1)
+        self.label.setText("{}: {} GROUP, {} BIN".format(self.bin_head, len(group_keys), len(bins)))
+
+    def legend(self, bins: np.ndarray, pass_bins: set, lut: np.ndarray, raster: np.ndarray) -> LabelItem:
+        """
+        数量是栅格化后的数量, 复测的die按GraphMapDuplicate只算一次
+        """
+        count = np.bincount(raster.ravel(), minlength=len(bins) + 1)
+        total = max(int(count[1:].sum()), 1)
+        text = []
+        for index, each in enumerate(bins):
+            color = "#{:02X}{:02X}{:02X}".format(*lut[index + 1][:3])
+            text.append(
+                '<span style="color:{}">&#9632;</span> BIN{} {}: {} ({:.2%})'.format(
+                    color, each, "P" if each in pass_bins else "F", count[index + 1], count[index + 1] / total
+                )
+            )
+        return LabelItem("<br>".join(text), justify="left")
+
+    def __del__(self):
+        if self.service is not None:
+            self.service.unsubscribe(self)
+
+    def closeEvent(self, event: QCloseEvent) -> None:
+        self.__del__()
+        super(BinMapChart, self).closeEvent(event)
@@ -0,0 +1,113 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+@File    : chart_bin_pareto.py
+@Author  : Link
+@Time    : 2023/2/12 16:10
+@Mark    : FAIL BIN 柏拉图, 每个GROUP一组柱子, 右轴是累计百分比
+"""
+import numpy as np
+from PySide2.QtGui import QCloseEvent
+from pyqtgraph import PlotWidget, BarGraphItem, PlotCurveItem, ViewBox, intColor, mkPen
+
+from chart_core.chart_pyqtgraph.core.chart_service import ChartDataService
+from chart_core.chart_pyqtgraph.ui_components.ui_unit_chart import UnitChartWindow
+from common.cal_interface.bin_utils import BinCount
+from common.li import Li
+
+
+class BinParetoChart(UnitChartWindow):
+    """
+    数量来自 BinCount.pareto, 选取数据后跟着 chart_df 刷新
+    """
+    bin_head: str = "SOFT_BIN"
+    li: Li = None
+    service: ChartDataService = None
+    top: int = 20  # 只显示前N个BIN
+
+    def __init__(self, li: Li):
+        super(BinParetoChart, self).__init__()
+        self.li = li
+        self.pw = PlotWidget(enableMenu=False)
+        self.setCentralWidget(self.pw)
+        self.pw.hideButtons()
+        self.pw.setMouseEnabled(x=False, y=False)
+        self.legend = self.pw.addLegend()
+
+        self.bottom_axis = self.pw.getAxis("bottom")
+        self.left_axis = self.pw.getAxis("left")
+        self.left_axis.setLabel("COUNT")
+        # 累计百分比用右边的轴
+        self.pw.showAxis("right")
+        self.percent_vb = ViewBox()
+        self.pw.scene().addItem(self.percent_vb)
+        self.pw.getAxis("right").linkToView(self.percent_vb)
+        self.pw.getAxis("right").setLabel("CUM %")
+        self.percent_vb.setXLink(self.pw.getPlotItem())
+        self.percent_vb.setYRange(0, 100)
+        self.pw.getViewBox().sigResized.connect(self.update_views)
+        self.service = ChartDataService.of(self.li)
+        self.service.subscribe(self)
+
+    def update_views(self):
+        self.percent_vb.setGeometry(self.pw.getViewBox().sceneBoundingRect())
+        self.percent_vb.linkedViewChanged(self.pw.getViewBox(), self.percent_vb.XAxis)
+
+    def set_data(self, bin_head: str = "SOFT_BIN"):
+        """
+        :param bin_head: HARD_BIN or SOFT_BIN
+        :return:
+        """
+        if self.li is None:
+            raise Exception("first set li")
+        self.bin_head = bin_head
+        self.set_title("Bin Pareto: " + bin_head)
+
+    def pw_show(self):
+        self.show()
+
+    def set_title(self, title: str = "Bin Pareto"):
+        self.setWindowTitle(title)
+        self.pw.setTitle(title)
+
+    def set_front_chart(self):
+        if self.li.to_chart_csv_data.df is None:
+            return
+        if self.li.to_chart_csv_data.chart_df is None:
+            data_df = self.li.to_chart_csv_data.df
+        else:
+            data_df = self.li.to_chart_csv_data.chart_df
+        self.pw.clear()
+        self.percent_vb.clear()
+        if data_df is None or len(data_df) == 0:
+            return
+        pareto = BinCount.pareto(data_df, self.bin_head, by=["GROUP"]).head(self.top)
+        if len(pareto) == 0:
+            self.set_title("Bin Pareto: {} 无FAIL数据".format(self.bin_head))
+            return
+        self.set_title("Bin Pareto: " + self.bin_head)
+        groups = [each for each in pareto.columns if each not in ("TOTAL", "PERCENT", "CUM_PERCENT")]
+        x = np.arange(len(pareto))
+        width = 0.8 / len(groups)
+        for index, group in enumerate(groups):
+            bar = BarGraphItem(
+                x=x - 0.4 + width * (index + 0.5), height=pareto[group].to_numpy(), width=width,
+                brush=intColor(index, hues=max(len(groups), 9)),
+            )
+            self.pw.addItem(bar)
+            self.legend.addItem(bar, group)
+        self.percent_vb.addItem(
+            PlotCurveItem(x=x, y=pareto["CUM_PERCENT"].to_numpy() * 100, pen=mkPen("r", width=2))
+        )
+        self.bottom_axis.setTicks(([(i, "BIN{}".format(each)) for i, each in enumerate(pareto.index)], []))
+        self.pw.setXRange(-0.6, len(pareto) - 0.4)
+        self.update_views()
+
+    def __del__(self):
+        if self.service is not None:
+            self.service.unsubscribe(self)
+
+    def closeEvent(self, event: QCloseEvent) -> None:
+        self.__del__()
+        super(BinParetoChart, self).closeEvent(event)
@@ -16,7 +16,8 @@ from PySide2 import QtCore
 from PySide2.QtGui import QCloseEvent
 from pyqtgraph import InfiniteLine, BarGraphItem
 
-from app_test.test_utils.wrapper_utils import Time
+from common.trace import Trace
+from chart_core.chart_pyqtgraph.core.chart_service import ChartDataService
 from chart_core.chart_pyqtgraph.core.mixin import BasePlot, GraphRangeSignal, PlotWidget
 from chart_core.chart_pyqtgraph.core.view_box import CustomViewBox
 from chart_core.chart_pyqtgraph.ui_components.ui_unit_chart import UnitChartWindow
@@ -65,8 +66,8 @@ class TransBarChart(UnitChartWindow, BasePlot):
 
         self.pw.setMouseEnabled(x=False)
         self.vb.select_signal.connect(self.select_range)
-        self.li.QChartSelect.connect(self.li_chart_signal)
-        self.li.QChartRefresh.connect(self.li_chart_signal)
+        self.service = ChartDataService.of(self.li)
+        self.service.subscribe(self)
 
         self.chart_v_lines = []
 
@@ -81,9 +82,22 @@ class TransBarChart(UnitChartWindow, BasePlot):
 
         self.vb.scene().sigMouseMoved.connect(mouseMoved)
 
-    def li_chart_signal(self):
-        if self.action_signal_binding.isChecked():
-            self.set_front_chart()
+    def data_job(self):
+        """
+        后台预先计算分布, 分组边界和 set_df_chart 一样
+        """
+        if self.key is None or self.p_range is None:
+            return None
+        service, key = self.service, self.key
+        bins = np.linspace(self.p_range.y_min, self.p_range.y_max, UiGlobalVariable.GraphBins)
+        front = self.li.to_chart_csv_data.chart_df is not None
+
+        def job():
+            service.group_histogram(key, bins)
+            if front:
+                service.group_histogram(key, bins, front=True)
+
+        return job
 
     def select_range(self, axs: Union[List[QtCore.QRectF], None]):
         """
@@ -98,44 +112,51 @@ class TransBarChart(UnitChartWindow, BasePlot):
             """
             self.li.set_chart_data(None)
             return
-        chart_prr_list = []
-        for ax in axs:
-            """
-            1. 选取X轴
-            2. 选取Y轴
-            """
-            select_start = math.ceil(ax.left() / self.bar_width)
-            select_stop = math.ceil(ax.right() / self.bar_width)
-            if select_start > len(self.ticks) or select_stop < 0:
-                continue
-
-            keys = []
-            for i in range(select_start - 1, select_stop):
-                if i < 0:
-                    continue
-                if i == len(self.ticks):
-                    break
-                key = self.ticks[i]
-                keys.append(key)
-            for key in keys:
-                temp = self.li.to_chart_csv_data.group_df[key]
-                if len(temp) == 0:
+        rects = [(ax.left(), ax.right(), ax.top(), ax.bottom()) for ax in axs]
+        bar_width, ticks, key = self.bar_width, list(self.ticks), self.key
+        group_df = self.li.to_chart_csv_data.group_df
+
+        def job():
+            chart_prr_list = []
+            for left, right, top, bottom in rects:
+                """
+                1. 选取X轴
+                2. 选取Y轴
+                """
+                select_start = math.ceil(left / bar_width)
+                select_stop = math.ceil(right / bar_width)
+                if select_start > len(ticks) or select_stop < 0:
                     continue
-                result_min, result_max = ax.top(), ax.bottom()
-                chart_prr = temp[
-                    (temp[self.key] > result_min) & (temp[self.key] < result_max)
-                    ]
-                chart_prr_list.append(chart_prr)
 
-        self.li.set_chart_data(pd.concat(chart_prr_list))
+                keys = []
+                for i in range(select_start - 1, select_stop):
+                    if i < 0:
+                        continue
+                    if i == len(ticks):
+                        break
+                    keys.append(ticks[i])
+                for group in keys:
+                    temp = group_df[group]
+                    if len(temp) == 0:
+                        continue
+                    chart_prr = temp[
+                        (temp[key] > top) & (temp[key] < bottom)
+                        ]
+                    chart_prr_list.append(chart_prr)
+            if not chart_prr_list:
+                return None
+            chart_df = pd.concat(chart_prr_list)
+            return chart_df, Li.split_group(chart_df)
+
+        self.service.submit(self, job, self.set_select_data)
 
     def set_range_data_to_chart(self, a, ax) -> bool:
         res = super(TransBarChart, self).set_range_data_to_chart(a, ax)
         if res:
-            self.set_front_chart()
+            self.service.request(self)
         return res
 
-    @Time()
+    @Trace.span()
     @GraphRangeSignal
     def set_df_chart(self):
         """
@@ -154,6 +175,7 @@ class TransBarChart(UnitChartWindow, BasePlot):
         columns, x0, y0, y1, y, width, self.bar_width = [], [], [], [], [], [], 0
         chart_v_lines_x_list = []  # 用于在柱状图的底部用一条竖线分割开
 
+        histogram = self.service.group_histogram(self.key, self.list_bins)
         for index, (key, df) in enumerate(self.li.to_chart_csv_data.group_df.items()):
             columns.append(key)
             if self.li.to_chart_csv_data.select_group is not None:
@@ -161,12 +183,12 @@ class TransBarChart(UnitChartWindow, BasePlot):
                     continue
             if len(df) == 0:
                 continue
-            temp_dis = df[self.key].value_counts(bins=self.list_bins, sort=False)
-            if len(temp_dis) == 0:
+            temp_dis = histogram.get(key, None)
+            if temp_dis is None or len(temp_dis) == 0:
                 continue
             self.bar_width = max(temp_dis) if max(temp_dis) > self.bar_width else self.bar_width
             chart_v_lines_x_list.append(index + 0.2)
-            for bin_index, value in enumerate(temp_dis.values):
+            for bin_index, value in enumerate(temp_dis):
                 x0.append(index + 0.2)
                 y0.append(self.list_bins[bin_index])
                 y1.append(self.list_bins[bin_index + 1])
@@ -192,7 +214,7 @@ class TransBarChart(UnitChartWindow, BasePlot):
             self.vb.setYRange(self.p_range.y_min, self.p_range.y_max)
             self.change = True
 
-    @Time()
+    @Trace.span()
     def set_front_chart(self):
         self.bg2.setOpts(x0=[], y=[], y0=[], y1=[], width=[])
         self.set_df_chart()
@@ -201,16 +223,17 @@ class TransBarChart(UnitChartWindow, BasePlot):
         if self.list_bins is None:
             return
         x0, y0, y1, y, width = [], [], [], [], []
+        histogram = self.service.group_histogram(self.key, self.list_bins, front=True)
         for key, df in self.li.to_chart_csv_data.group_chart_df.items():
             if self.li.to_chart_csv_data.select_group is not None:
                 if key not in self.li.to_chart_csv_data.select_group:
                     continue
             if len(df) == 0:
                 continue
-            temp_dis = df[self.key].value_counts(bins=self.list_bins, sort=False)
-            if len(temp_dis) == 0:
+            temp_dis = histogram.get(key, None)
+            if temp_dis is None or len(temp_dis) == 0:
                 continue
-            for bin_index, value in enumerate(temp_dis.values):
+            for bin_index, value in enumerate(temp_dis):
                 x0.append(self.ticks.index(key) + 0.2)
                 y0.append(self.list_bins[bin_index])
                 y1.append(self.list_bins[bin_index + 1])
@@ -18,6 +18,7 @@ from PySide2 import QtCore
 from PySide2.QtGui import QResizeEvent, QCloseEvent
 from pyqtgraph import ScatterPlotItem, InfiniteLine
 
+from chart_core.chart_pyqtgraph.core.chart_service import ChartDataService
 from chart_core.chart_pyqtgraph.core.mixin import BasePlot, GraphRangeSignal, PlotWidget
 from chart_core.chart_pyqtgraph.core.view_box import CustomViewBox, pg
 from chart_core.chart_pyqtgraph.ui_components.ui_unit_chart import UnitChartWindow
@@ -61,8 +62,8 @@ class TransScatterChart(UnitChartWindow, BasePlot):
 
         # self.pw.setMouseEnabled(x=False)
         self.vb.select_signal.connect(self.select_range)
-        self.li.QChartSelect.connect(self.li_chart_signal)
-        self.li.QChartRefresh.connect(self.li_chart_signal)
+        self.service = ChartDataService.of(self.li)
+        self.service.subscribe(self)
         if UiGlobalVariable.GraphUseLocalColor:
             color = pg.colormap.get('./colors/CET-C6.csv')
         else:
@@ -87,9 +88,25 @@ class TransScatterChart(UnitChartWindow, BasePlot):
 
         self.vb.scene().sigMouseMoved.connect(mouseMoved)
 
-    def li_chart_signal(self):
-        if self.action_signal_binding.isChecked():
-            self.set_front_chart()
+    def get_step(self) -> int:
+        """ 抽样间隔 """
+        if UiGlobalVariable.GraphPlotScatterSimple and self.list_bins is not None:
+            return self.list_bins + 1
+        return 1
+
+    def data_job(self):
+        """ 后台预先准备散点 """
+        if self.key is None:
+            return None
+        service, key, step = self.service, self.key, self.get_step()
+        front = self.li.to_chart_csv_data.chart_df is not None
+
+        def job():
+            service.group_points(key, step)
+            if front:
+                service.group_points(key, step, front=True)
+
+        return job
 
     def select_range(self, axs: Union[List[QtCore.QRectF], None]):
         if not self.action_signal_binding.isChecked():
@@ -97,18 +114,21 @@ class TransScatterChart(UnitChartWindow, BasePlot):
         if axs is None:
             self.li.set_chart_data(None)
             return
-        chart_prr_list = []
-        for ax in axs:
-            part_id_min, part_id_max = ax.left(), ax.right()
-            result_min, result_max = ax.top(), ax.bottom()
-            temp = self.li.to_chart_csv_data.df
-            chart_prr = temp[
-                ((temp.PART_ID > part_id_min) & (temp.PART_ID < part_id_max)) & (
-                        (temp[self.key] > result_min) & (temp[self.key] < result_max))
-                ]
-            chart_prr_list.append(chart_prr)
-
-        self.li.set_chart_data(pd.concat(chart_prr_list))
+        rects = [(ax.left(), ax.right(), ax.top(), ax.bottom()) for ax in axs]
+        temp, key = self.li.to_chart_csv_data.df, self.key
+
+        def job():
+            chart_prr_list = []
+            for part_id_min, part_id_max, result_min, result_max in rects:
+                chart_prr = temp[
+                    ((temp.PART_ID > part_id_min) & (temp.PART_ID < part_id_max)) & (
+                            (temp[key] > result_min) & (temp[key] < result_max))
+                    ]
+                chart_prr_list.append(chart_prr)
+            chart_df = pd.concat(chart_prr_list)
+            return chart_df, Li.split_group(chart_df)
+
+        self.service.submit(self, job, self.set_select_data)
 
     @GraphRangeSignal
     def set_df_chart(self):
@@ -141,18 +161,13 @@ class TransScatterChart(UnitChartWindow, BasePlot):
         color_split_nm = 512 / 2 ** color_square_nm
         color_list = self.c[::int(color_split_nm)]
 
-        for index, (key, df) in enumerate(self.li.to_chart_csv_data.group_df.items()):
+        points = self.service.group_points(self.key, self.get_step())
+        for index, key in enumerate(self.li.to_chart_csv_data.group_df.keys()):
             if self.li.to_chart_csv_data.select_group is not None:
                 if key not in self.li.to_chart_csv_data.select_group:
                     continue
             idx = int(index % color_split_nm)
-            if UiGlobalVariable.GraphPlotScatterSimple:
-                x = df.PART_ID
-                x = x[::self.list_bins + 1]
-                result = df[self.key][::self.list_bins + 1]
-            else:
-                x = df.PART_ID
-                result = df[self.key]
+            x, result = points.get(key, (np.array([]), np.array([])))
             brush = list(color_list[idx])
             if self.li.to_chart_csv_data.chart_df is None:
                 brush[3] = 255
@@ -191,19 +206,14 @@ class TransScatterChart(UnitChartWindow, BasePlot):
         if self.li.to_chart_csv_data.chart_df is None:
             return
 
-        for index, (key, df) in enumerate(self.li.to_chart_csv_data.group_chart_df.items()):
+        points = self.service.group_points(self.key, self.get_step(), front=True)
+        for index, key in enumerate(self.li.to_chart_csv_data.group_chart_df.keys()):
             if self.li.to_chart_csv_data.select_group is not None:
                 if key not in self.li.to_chart_csv_data.select_group:
                     continue
-            if len(df) == 0:
+            x, result = points.get(key, (np.array([]), np.array([])))
+            if len(x) == 0:
                 continue
-            if UiGlobalVariable.GraphPlotScatterSimple:
-                x = df.PART_ID
-                x = x[::self.list_bins + 1]
-                result = df[self.key][::self.list_bins + 1]
-            else:
-                x = df.PART_ID
-                result = df[self.key]
             brush = self.brush_cache[key]
             if index >= len(self.scatter_front_list):
                 plot = ScatterPlotItem(symbol='o', size=self.scatter_size, pen=None, brush=tuple(brush))
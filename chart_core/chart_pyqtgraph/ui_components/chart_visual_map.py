@@ -14,10 +14,7 @@ from PySide2.QtGui import QResizeEvent, QCloseEvent
 from PySide2.QtWidgets import QWidget
 from pyqtgraph import GraphicsLayoutWidget, ImageItem, ColorBarItem, colormap, HistogramLUTItem, InfiniteLine
 
-import numpy as np
-
-from chart_core.chart_pyqtgraph.core.visual.visual import *
-
+from chart_core.chart_pyqtgraph.core.chart_service import ChartDataService
 from chart_core.chart_pyqtgraph.ui_components.ui_unit_chart import UnitChartWindow
 from common.li import Li
 from ui_component.ui_app_variable import UiGlobalVariable
@@ -35,6 +32,7 @@ class VisualMapChart(UnitChartWindow):
     y_max: int = 0
     bottom_ticks: list = None
     left_ticks: list = None
+    service: ChartDataService = None
 
     def __init__(self, li: Li):
         super(VisualMapChart, self).__init__()
@@ -55,12 +53,8 @@ class VisualMapChart(UnitChartWindow):
         else:
             color = colormap.get("CET-D8")
         self.c = color
-        self.li.QChartSelect.connect(self.li_chart_signal)
-        self.li.QChartRefresh.connect(self.li_chart_signal)
-
-    def li_chart_signal(self):
-        if self.action_signal_binding.isChecked():
-            self.set_front_chart()
+        self.service = ChartDataService.of(self.li)
+        self.service.subscribe(self)
 
     def set_data(self, key: int):
         """
@@ -88,22 +82,42 @@ class VisualMapChart(UnitChartWindow):
         self.x_min, self.y_min = self.li.to_chart_csv_data.df.X_COORD.min(), self.li.to_chart_csv_data.df.Y_COORD.min()
         self.x_max, self.y_max = self.li.to_chart_csv_data.df.X_COORD.max(), self.li.to_chart_csv_data.df.Y_COORD.max()
 
+    def get_coord(self):
+        return int(self.x_min), int(self.y_min), int(self.x_max - self.x_min + 1), int(self.y_max - self.y_min + 1)
+
+    def get_data_df(self):
+        if self.li.to_chart_csv_data.chart_df is None:
+            return self.li.to_chart_csv_data.df
+        return self.li.to_chart_csv_data.chart_df
+
+    def get_raster(self, data_df):
+        """
+        所有GROUP一次栅格化, 按 (TEST_ID, 分组, 选取) 缓存在 ChartDataService 中
+        :param data_df:
+        :return: GROUP名, [group, x, y]
+        """
+        return self.service.raster(self.key, data_df, self.get_coord())
+
+    def data_job(self):
+        """ 后台预先栅格化 """
+        if self.key not in self.li.capability_key_dict:
+            return None
+        data_df = self.get_data_df()
+        if data_df is None:
+            return None
+        service, key, coord = self.service, self.key, self.get_coord()
+        return lambda: service.raster(key, data_df, coord)
+
     def set_front_chart(self):
         if self.key not in self.li.capability_key_dict:
             return
-        if self.li.to_chart_csv_data.chart_df is None:
-            data_df = self.li.to_chart_csv_data.df
-        else:
-            data_df = self.li.to_chart_csv_data.chart_df
+        data_df = self.get_data_df()
         if data_df is None:
             return
-        map_group = data_df.groupby("GROUP")
-        x, y = self.x_max - self.x_min + 1, self.y_max - self.y_min + 1
         self.pw.clear()
-        if len(map_group) > 25:
+        if data_df["GROUP"].nunique() > 25:
             print("选取的Mapping数据过多了")
             return
-        row = math.ceil(math.sqrt(len(map_group)))
         items = []
         _min, _max = data_df[self.key].min(), data_df[self.key].max()
         diff = _max - _min
@@ -111,16 +125,11 @@ class VisualMapChart(UnitChartWindow):
             self.label.setText("无有效数据")
             return
         rounding = diff / 1E9
-        for index, (key, df) in enumerate(map_group):
-            data = np.full([x, y], np.nan)
-            coord_to_np(
-                df.X_COORD.to_numpy() - self.x_min,
-                df.Y_COORD.to_numpy() - self.y_min,
-                df[self.key].to_numpy(),
-                data
-            )
+        group_keys, raster = self.get_raster(data_df)
+        row = math.ceil(math.sqrt(len(group_keys)))
+        for index, key in enumerate(group_keys):
             t_row, t_col = divmod(index, row)
-            im = ImageItem(image=data)
+            im = ImageItem(image=raster[index])
 
             items.append(im)
             plot_item = self.pw.addPlot(t_row, t_col, 1, 1, title=key)
@@ -145,14 +154,8 @@ class VisualMapChart(UnitChartWindow):
         # isoLine.setValue(0.0022)
 
     def __del__(self):
-        try:
-            self.li.QChartSelect.disconnect(self.set_front_chart)
-        except RuntimeError:
-            pass
-        try:
-            self.li.QChartRefresh.disconnect(self.set_front_chart)
-        except RuntimeError:
-            pass
+        if self.service is not None:
+            self.service.unsubscribe(self)
 
     def closeEvent(self, event: QCloseEvent) -> None:
         self.__del__()
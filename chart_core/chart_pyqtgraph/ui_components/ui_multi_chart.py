@@ -12,10 +12,13 @@ import datetime as dt
 from typing import List
 
 from PySide2 import QtGui
-from PySide2.QtCore import Slot, Qt
+from PySide2.QtCore import Slot, Qt, QTimer
 from PySide2.QtWidgets import QMainWindow, QPushButton, QSpinBox, QWidget, QLayout
 
+from chart_core.chart_pyqtgraph.core.chart_service import ChartDataService
 from chart_core.chart_pyqtgraph.core.mixin import ChartType
+from chart_core.chart_pyqtgraph.ui_components.chart_bin_map import BinMapChart
+from chart_core.chart_pyqtgraph.ui_components.chart_bin_pareto import BinParetoChart
 from chart_core.chart_pyqtgraph.ui_components.chart_trans_bar import TransBarChart
 from chart_core.chart_pyqtgraph.ui_components.chart_trans_scatter import TransScatterChart
 from chart_core.chart_pyqtgraph.ui_components.chart_visual_map import VisualMapChart
@@ -79,6 +82,10 @@ class MultiChartWindow(QMainWindow, Ui_MainWindow):
         self.pushButton_2.pressed.connect(self._on_pushButton_2_pressed)
         self.unit_chart_width.valueChanged.connect(self.resize_update)
         self.unit_chart_height.valueChanged.connect(self.resize_update)
+        # 只重绘看得到的chart, 滚动到的时候再重绘
+        self.service = ChartDataService.of(self.li)
+        self.scrollArea.verticalScrollBar().valueChanged.connect(self.service.flush)
+        self.scrollArea.horizontalScrollBar().valueChanged.connect(self.service.flush)
 
     def set_width_height(self):
         self.unit_chart_width.setValue(UiGlobalVariable.GraphPlotWidth)
@@ -122,11 +129,14 @@ class MultiChartWindow(QMainWindow, Ui_MainWindow):
         )
         for each in self.temp:  # type:UnitChartWindow
             each.set_resize_update(self.unit_chart_width.value(), self.unit_chart_height.value())
+        self.service.flush()
 
     def clear(self):
         if self.temp is None:
             self.temp = list()
         else:
+            for each in self.temp:
+                self.service.unsubscribe(each)
             self.temp.clear()
         self.clearLayout(self.verticalLayout_3)
         # self.widget.resize(
@@ -134,6 +144,11 @@ class MultiChartWindow(QMainWindow, Ui_MainWindow):
         # )
 
     def set_data(self, test_id_list: List[int], chart_type: ChartType):
+        """
+        :param test_id_list: ChartType.BinMap/BinPareto 时为 ["HARD_BIN"] or ["SOFT_BIN"]
+        :param chart_type:
+        :return:
+        """
         if not test_id_list:
             return
         self.clear()
@@ -144,7 +159,7 @@ class MultiChartWindow(QMainWindow, Ui_MainWindow):
                 bar_chart = TransBarChart(self.li)
                 bar_chart.set_data(test_id)  # TEST_ID == 1
                 bar_chart.set_range_self()
-                bar_chart.set_df_chart()
+                self.service.mark_dirty(bar_chart)
                 bar_chart.set_line_self()
                 self.verticalLayout_3.addWidget(bar_chart)
                 plot = bar_chart
@@ -152,21 +167,34 @@ class MultiChartWindow(QMainWindow, Ui_MainWindow):
                 scatter_chart = TransScatterChart(self.li)
                 scatter_chart.set_data(test_id)  # TEST_ID == 1
                 scatter_chart.set_range_self()
-                scatter_chart.set_df_chart()
+                self.service.mark_dirty(scatter_chart)
                 scatter_chart.set_line_self()
                 self.verticalLayout_3.addWidget(scatter_chart)
                 plot = scatter_chart
             if chart_type == ChartType.VisualMap:
                 visual_map_chart = VisualMapChart(self.li)
                 visual_map_chart.set_data(test_id)
-                visual_map_chart.set_front_chart()
+                self.service.mark_dirty(visual_map_chart)
                 self.verticalLayout_3.addWidget(visual_map_chart)
                 plot = visual_map_chart
+            if chart_type == ChartType.BinMap:
+                bin_map_chart = BinMapChart(self.li)
+                bin_map_chart.set_data(test_id)
+                self.service.mark_dirty(bin_map_chart)
+                self.verticalLayout_3.addWidget(bin_map_chart)
+                plot = bin_map_chart
+            if chart_type == ChartType.BinPareto:
+                bin_pareto_chart = BinParetoChart(self.li)
+                bin_pareto_chart.set_data(test_id)
+                self.service.mark_dirty(bin_pareto_chart)
+                self.verticalLayout_3.addWidget(bin_pareto_chart)
+                plot = bin_pareto_chart
 
             if plot is None:
                 return
             self.temp.append(plot)
         self.resize_update()
+        self.service.prefetch()
 
     @Slot()
     def on_action_copy_image_triggered(self):
@@ -186,6 +214,10 @@ class MultiChartWindow(QMainWindow, Ui_MainWindow):
         """
         self.statusbar.showMessage("==={}==={}===".format(dt.datetime.now().strftime("%H:%M:%S"), message))
 
+    def showEvent(self, event) -> None:
+        super(MultiChartWindow, self).showEvent(event)
+        QTimer.singleShot(0, self.service.flush)  # 等布局完成后才知道哪些chart看得到
+
     def closeEvent(self, event: QCloseEvent) -> None:
         self.clear()
         self.li = None
@@ -19,6 +19,7 @@ from ui_component.ui_app_variable import UiGlobalVariable, QtPlotAllUse
 
 
 class UnitChartWindow(QMainWindow, Ui_MainWindow):
+    generation: int = 0  # 后台计算的版本号, 由 ChartDataService 使用
 
     def __init__(self, parent=None):
         super(UnitChartWindow, self).__init__(parent)
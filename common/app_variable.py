@@ -10,6 +10,7 @@ import os
 from dataclasses import dataclass
 from typing import Union, Dict
 
+import numpy as np
 import pandas as pd
 from numpy import (
     uint8 as U1,
@@ -93,6 +94,45 @@ class ToChartCsv:
     group_limit: Dict[str, pd.DataFrame] = None
 
 
+@dataclass
+class LimitDiffModule:
+    """
+    LimitDiff.calculation 的结果, 测试项按 ptmd 中的顺序, LOT按 select_summary 中的顺序
+    """
+    tests: pd.DataFrame = None  # [TEST_ID, TEXT, UNITS]
+    lots: pd.DataFrame = None  # select_summary
+    lo_limit: np.ndarray = None  # [测试项, LOT], 没有这个测试项的LOT是NAN
+    hi_limit: np.ndarray = None
+    lo_change: np.ndarray = None  # [测试项, LOT], 和上一个LOT不同
+    hi_change: np.ndarray = None
+    first_change: np.ndarray = None  # [测试项], 第一个有变化的LOT的位置, 没有变化是-1
+
+
+@dataclass
+class LotCompareModule:
+    """
+    LotCompare.calculation 的结果, 矩阵都是 [测试项, LOT]
+    """
+    keys: list = None  # 实际用到的LOT分组列
+    lots: pd.DataFrame = None  # [*keys, QTY, PASS, YIELD]
+    tests: pd.DataFrame = None  # [TEST_ID, TEXT, DATAT_TYPE, LO_LIMIT, HI_LIMIT]
+    qty: np.ndarray = None
+    avg: np.ndarray = None  # PASS的数据, 全部FAIL时用所有数据, 和 CapabilityUtils.calculation_ptr 一样
+    std: np.ndarray = None
+    cpk: np.ndarray = None
+    reject_rate: np.ndarray = None
+
+
+@dataclass
+class SearchIndexModule:
+    """
+    TableSearch.build 的结果, 行都是数据的顺序
+    """
+    texts: list = None  # 每行小写的 TEXT/TEST_NUM/TEST_TXT, 用 \n 隔开
+    trigrams: dict = None  # 三个字符 -> 含有它的行号(np.ndarray, 升序)
+    numbers: dict = None  # 列名 -> float[行], 带%的列去掉%后的数字
+
+
 @dataclass
 class DataModule:
     """
@@ -0,0 +1,79 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+@File    : bin_utils.py
+@Author  : Link
+@Time    : 2023/2/12 15:40
+@Mark    : BIN统计, 所有分组一次 np.bincount, 给 HBR/SBR 和 Bin Pareto 用
+"""
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from common.app_variable import FailFlag
+
+
+class BinCount:
+    DEFAULT_BY = ("GROUP", "DA_GROUP", "SITE_NUM")
+
+    @staticmethod
+    def count(df: pd.DataFrame, bin_head: str, by=DEFAULT_BY) -> pd.DataFrame:
+        """
+        各列先编码, 组合成一个整数后 np.unique 压缩成实际出现的组合, 再 bincount
+        不按各列种类数的乘积开数组, 组合很多但实际出现的很少时不会占大量内存
+        :param df: 需要有 FAIL_FLAG, bin_head 和 by 中的列, by 中不存在的列会被忽略
+        :param bin_head: HARD_BIN or SOFT_BIN
+        :param by: 分组列
+        :return: [*by, bin_head, FAIL_FLAG, COUNT], 按分组列 -> BIN -> FAIL_FLAG 排序
+        """
+        columns = [each for each in by if each in df] + [bin_head, "FAIL_FLAG"]
+        codes, uniques = [], []
+        valid = np.ones(len(df), dtype=bool)
+        for column in columns:
+            code, unique = pd.factorize(df[column], sort=True)
+            valid &= code >= 0
+            codes.append(code)
+            uniques.append(unique)
+        if not valid.any():
+            return pd.DataFrame({column: [] for column in columns + ["COUNT"]})
+        codes = [code[valid] for code in codes]
+        flat, size = np.zeros(len(codes[0]), dtype=np.int64), 1
+        for code, unique in zip(codes, uniques):
+            if size * len(unique) >= 2 ** 62:  # 乘积放不下时先压缩, 排序后的unique不改变顺序
+                _, flat = np.unique(flat, return_inverse=True)
+                size = int(flat.max()) + 1
+            flat = flat * len(unique) + code
+            size *= len(unique)
+        _, first, inverse = np.unique(flat, return_index=True, return_inverse=True)
+        data = {column: uniques[i].take(codes[i][first]) for i, column in enumerate(columns)}
+        data["COUNT"] = np.bincount(inverse.ravel(), minlength=len(first))
+        return pd.DataFrame(data)
+
+    @staticmethod
+    def pareto(df: pd.DataFrame, bin_head: str, by: List[str] = ("GROUP",), only_fail: bool = True) -> pd.DataFrame:
+        """
+        BIN按总数从大到小排列
+        :param df:
+        :param bin_head:
+        :param by: 每个分组一列数量
+        :param only_fail: 只看FAIL的BIN
+        :return: index: bin_head, columns: [*分组, TOTAL, PERCENT, CUM_PERCENT]
+        """
+        count = BinCount.count(df, bin_head, by=by)
+        total_die = count["COUNT"].sum()
+        if only_fail:
+            count = count[count.FAIL_FLAG == FailFlag.FAIL]
+        by = [each for each in by if each in count]
+        if by:
+            pivot = count.pivot_table(index=bin_head, columns=by, values="COUNT", aggfunc="sum", fill_value=0)
+            pivot.columns = ["|".join(map(str, each)) if isinstance(each, tuple) else str(each)
+                             for each in pivot.columns]
+        else:
+            pivot = count.groupby(bin_head)[["COUNT"]].sum()
+        pivot["TOTAL"] = pivot.sum(axis=1)
+        pivot = pivot.sort_values("TOTAL", ascending=False, kind="stable")
+        pivot["PERCENT"] = pivot["TOTAL"] / total_die if total_die else 0.0
+        pivot["CUM_PERCENT"] = pivot["PERCENT"].cumsum()
+        return pivot
@@ -12,10 +12,9 @@ from typing import List, Union
 import pandas as pd
 import numpy as np
 
-from app_test.test_utils.wrapper_utils import Time
+from common.trace import Trace
 from common.app_variable import PtmdModule, LimitType, DataModule, DatatType, Calculation, FailFlag
 from parser_core.stdf_parser_func import PtmdOptFlag, DtpTestFlag, PtmdParmFlag
-from ui_component.ui_app_variable import UiGlobalVariable
 
 
 class CapabilityUtils:
@@ -23,9 +22,10 @@ class CapabilityUtils:
     要注意:
         存到数据库中的数据必然不能被Round操作
     """
+    FLOAT_ROUND = 9  # 小数位, 界面设置中的 GraphPlotFloatRound 改变时同步过来
 
     @staticmethod
-    # @Time()
+    # @Trace.span()
     def top_fail(top_fail_df: pd.DataFrame, data_df: pd.DataFrame) -> (pd.DataFrame, int):
         """
         TODO:
@@ -46,7 +46,7 @@ class CapabilityUtils:
         return top_fail_df, fail_qty
 
     @staticmethod
-    @Time()
+    @Trace.span()
     def calculation_top_fail(df_module: DataModule):
         """
         Top Fail如何计算? 算逐项fail即可.
@@ -72,7 +72,7 @@ class CapabilityUtils:
         return top_fail_dict
 
     @staticmethod
-    # @Time()
+    # @Trace.span()
     def re_cal_top_fail(ptmd: PtmdModule, df_module: DataModule, dtp_unit_df: pd.DataFrame) -> (
             pd.DataFrame, pd.DataFrame):
         """
@@ -106,7 +106,7 @@ class CapabilityUtils:
         return dtp_unit_df
 
     @staticmethod
-    @Time()
+    @Trace.span()
     def calculation_new_top_fail(df_module: DataModule):
         """
         TODO:
@@ -171,7 +171,7 @@ class CapabilityUtils:
         #     return factor
 
         # data_df["RESULT"] = _mad(data_df["RESULT"])
-        decimal = UiGlobalVariable.GraphPlotFloatRound
+        decimal = CapabilityUtils.FLOAT_ROUND
         fail_exec = data_df.FAIL_FLG == FailFlag.FAIL
         reject_qty = len(data_df[fail_exec])
         if len(data_df) == reject_qty:
@@ -247,7 +247,7 @@ class CapabilityUtils:
             h_limit_type = LimitType.NoHighLimit
         elif ptmd.PARM_FLG & PtmdParmFlag.EqualHighLimit:
             h_limit_type = LimitType.EqualHighLimit
-        decimal = UiGlobalVariable.GraphPlotFloatRound
+        decimal = CapabilityUtils.FLOAT_ROUND
         reject_qty = len(data_df[data_df.TEST_FLG & DtpTestFlag.TestFailed == DtpTestFlag.TestFailed])
         temp_dict = {
             "TEST_ID": ptmd.TEST_ID,  # 每个测试项目最后整合后只会有唯一一个TEST_ID
@@ -278,7 +278,7 @@ class CapabilityUtils:
         return temp_dict
 
     @staticmethod
-    @Time()
+    @Trace.span()
     def calculation_capability(df_module: DataModule, top_fail_dict: dict) -> List[dict]:
         """
         python dict 是可以保持顺序的
@@ -0,0 +1,98 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+@File    : capability_table.py
+@Author  : Link
+@Time    : 2023/2/19 10:30
+@Mark    : 制程能力表的列式数据, 给 CapabilityTableModel 用
+    排序是对列做argsort, 颜色标记是整列比较, 不再从格子的文本里float回来
+"""
+from typing import List, Tuple, Dict
+
+import numpy as np
+import pandas as pd
+
+
+class CapabilityTable:
+    CPK = "CPK"
+    TOP_FAIL = "FAIL_QTY"
+    REJECT = "REJECT_QTY"
+
+    @staticmethod
+    def to_frame(capability_key_list: List[dict]) -> pd.DataFrame:
+        """
+        列的顺序和第一个dict一样, 和原来的TableWidget一致
+        """
+        return pd.DataFrame(capability_key_list).reset_index(drop=True)
+
+    @staticmethod
+    def sort_order(values: pd.Series, ascending: bool = True) -> np.ndarray:
+        """
+        能转成数字的按数字排, 否则按文本排, 稳定排序, NAN/空值永远在最后
+        :return: 显示的第i行对应的数据行
+        """
+        numeric = pd.to_numeric(values, errors="coerce")
+        if numeric.notna().sum() == values.notna().sum():
+            keys = numeric.to_numpy(dtype=np.float64)
+            empty = np.isnan(keys)
+        else:
+            empty = values.isna().to_numpy()
+            keys = values.astype(str).to_numpy()
+        valid = np.flatnonzero(~empty)
+        if ascending:
+            order = valid[np.argsort(keys[valid], kind="stable")]
+        else:
+            # 降序时相同的值也保持原来的先后
+            ranks = pd.Series(keys[valid]).rank(method="dense").to_numpy()
+            order = valid[np.argsort(-ranks, kind="stable")]
+        return np.concatenate([order, np.flatnonzero(empty)])
+
+    @staticmethod
+    def clamp_mask(df: pd.DataFrame, cpk_lo: float, cpk_hi: float, top_fail: float,
+                   reject: float) -> Dict[str, np.ndarray]:
+        """
+        需要标记颜色的行, 和原来plot_points中的判断一样
+        :return: {列名: bool[行]}, 行按数据的顺序
+        """
+
+        def column(name: str) -> np.ndarray:
+            if name not in df:
+                return np.full(len(df), np.nan)
+            return pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=np.float64)
+
+        cpk = column(CapabilityTable.CPK)
+        with np.errstate(invalid="ignore"):
+            return {
+                CapabilityTable.CPK: (cpk_lo < cpk) & (cpk < cpk_hi),
+                CapabilityTable.TOP_FAIL: column(CapabilityTable.TOP_FAIL) > top_fail,
+                CapabilityTable.REJECT: column(CapabilityTable.REJECT) > reject,
+            }
+
+    @staticmethod
+    def mask_points(mask: np.ndarray, order: np.ndarray) -> np.ndarray:
+        """
+        右边小图上点的y, 第一行在最上面
+        :param mask: 数据顺序的mask
+        :param order: sort_order
+        :return:
+        """
+        length = len(order)
+        return length - np.flatnonzero(mask[order])
+
+    @staticmethod
+    def limit_dict(df: pd.DataFrame, rows: np.ndarray = None) -> Dict[int, Tuple[float, float, str, str]]:
+        """
+        表格中的Limit, 给Li.update_limit
+        :param df:
+        :param rows: 数据行, None是全部
+        :return: {TEST_ID: (LO_LIMIT, HI_LIMIT, LO_LIMIT_TYPE, HI_LIMIT_TYPE)}
+        """
+        if rows is not None:
+            df = df.iloc[rows]
+        return {
+            int(test_id): (float(lo), float(hi), str(l_type), str(h_type))
+            for test_id, lo, hi, l_type, h_type in zip(
+                df["TEST_ID"], df["LO_LIMIT"], df["HI_LIMIT"], df["LO_LIMIT_TYPE"], df["HI_LIMIT_TYPE"]
+            )
+        }
@@ -0,0 +1,163 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+@File    : cross_lot.py
+@Author  : Link
+@Time    : 2023/2/21 10:30
+@Mark    : 跨LOT查询, 不用打开界面, 例如 "PART_TYP=Y 最近90天所有LOT中测试项X的CPK"
+    1. SummaryCatalog 按时间/PART_TYP/LOT_ID等条件选出 CACHE_PATH 中的HDF5
+    2. 每个HDF5只留下要的测试项, 按TEST_ID一次groupby得到统计值
+    3. 多个文件用进程池并行, 结果是一个文件一个测试项一行的长表
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Sequence, Union, List
+
+import numpy as np
+import pandas as pd
+
+from common.app_variable import GlobalVariable, PartFlags, ReadFail
+from common.sql_interface.summary_catalog import SummaryCatalog
+from parser_core.stdf_parser_file_write_read import ParserData
+from parser_core.stdf_parser_func import DtpTestFlag
+
+
+class CrossLotQuery:
+    FILE_COLUMNS = ["HDF5_PATH", "LOT_ID", "SBLOT_ID", "WAFER_ID", "PART_TYP", "JOB_NAM", "FLOW_ID", "START_T"]
+    TEST_COLUMNS = ["TEST_ID", "DATAT_TYPE", "TEST_NUM", "TEST_TXT", "TEXT", "UNITS", "LO_LIMIT", "HI_LIMIT"]
+    STAT_COLUMNS = ["QTY", "REJECT_QTY", "AVG", "STD", "MEDIAN", "MIN", "MAX", "CPK"]
+
+    @staticmethod
+    def files(start_t: int = None, finish_t: int = None, days: int = None, part_flag: int = PartFlags.ALL,
+              read_fail: int = ReadFail.Y, cache_path: str = None, db_path: str = None, **where) -> pd.DataFrame:
+        """
+        目录中符合条件并且HDF5还在的文件
+        :param days: 最近几天, 有start_t时不用
+        :param where: SummaryCatalog.query 的条件, PART_TYP="Y", LOT_ID=[...]
+        :return: SummaryCatalog.query 的结果
+        """
+        if start_t is None and days is not None:
+            start_t = int(time.time()) - days * 86400
+        df = SummaryCatalog.query(start_t, finish_t, part_flag, read_fail, db_path=db_path, **where)
+        cache_path = os.path.normcase(os.path.abspath(cache_path or GlobalVariable.CACHE_PATH))
+        keep = [
+            os.path.normcase(os.path.abspath(each)).startswith(cache_path) and os.path.exists(each)
+            for each in df["HDF5_PATH"]
+        ]
+        return df[np.array(keep, dtype=bool)].reset_index(drop=True)
+
+    @staticmethod
+    def select_tests(ptmd_df: pd.DataFrame, tests: Sequence[Union[int, str]]) -> pd.DataFrame:
+        """
+        :param ptmd_df: 需要有TEXT
+        :param tests: int是TEST_ID, str是TEXT(TEST_NUM:TEST_TXT)或TEST_TXT; 不同文件的TEST_ID可能不一样, 跨LOT用TEXT
+        """
+        ids = [each for each in tests if not isinstance(each, str)]
+        texts = [each for each in tests if isinstance(each, str)]
+        mask = ptmd_df["TEST_ID"].isin(ids) | ptmd_df["TEXT"].isin(texts) | ptmd_df["TEST_TXT"].isin(texts)
+        return ptmd_df[mask]
+
+    @staticmethod
+    def test_stats(prr_df: pd.DataFrame, dtp_df: pd.DataFrame, ptmd_df: pd.DataFrame,
+                   part_flag: int = PartFlags.ALL, read_fail: int = ReadFail.Y) -> pd.DataFrame:
+        """
+        一个文件中 ptmd_df 里每个测试项的统计值, 和 CapabilityUtils.calculation_ptr 一样:
+            只用PASS的值, 全部失效时用全部的值; STD为0时用1E-05; CPK取绝对值
+        :param prr_df:
+        :param dtp_df: [PART_ID, TEST_ID, RESULT, TEST_FLG, ...]
+        :param ptmd_df: 已经筛选过的测试项, 需要有TEXT
+        :return: [*TEST_COLUMNS, *STAT_COLUMNS]
+        """
+        prr_df = ParserData.get_prr_data(prr_df, part_flag, read_fail)
+        dtp_df = dtp_df[dtp_df["TEST_ID"].isin(ptmd_df["TEST_ID"]) & dtp_df["PART_ID"].isin(prr_df["PART_ID"])]
+        fail = (dtp_df["TEST_FLG"] & DtpTestFlag.TestFailed) == DtpTestFlag.TestFailed
+        count = fail.groupby(dtp_df["TEST_ID"]).agg(["size", "sum"])
+        all_fail = count.index[count["size"] == count["sum"]]
+        use_df = dtp_df[~fail | dtp_df["TEST_ID"].isin(all_fail)]
+        stats = use_df.groupby("TEST_ID")["RESULT"].agg(["mean", "std", "median", "min", "max"])
+
+        df = ptmd_df.reindex(columns=CrossLotQuery.TEST_COLUMNS).reset_index(drop=True)
+        test_ids = df["TEST_ID"]
+        count = count.reindex(test_ids)
+        stats = stats.reindex(test_ids)
+        df["QTY"] = count["size"].fillna(0).to_numpy(dtype=np.int64)
+        df["REJECT_QTY"] = count["sum"].fillna(0).to_numpy(dtype=np.int64)
+        mean = stats["mean"].to_numpy(dtype=np.float64)
+        std = stats["std"].to_numpy(dtype=np.float64)
+        std = np.where(std == 0, 1E-05, std)
+        df["AVG"], df["STD"] = mean, std
+        df["MEDIAN"] = stats["median"].to_numpy(dtype=np.float64)
+        df["MIN"] = stats["min"].to_numpy(dtype=np.float64)
+        df["MAX"] = stats["max"].to_numpy(dtype=np.float64)
+        lo = df["LO_LIMIT"].to_numpy(dtype=np.float64)
+        hi = df["HI_LIMIT"].to_numpy(dtype=np.float64)
+        df["CPK"] = np.abs(np.minimum((hi - mean) / (3 * std), (mean - lo) / (3 * std)))
+        return df
+
+    @staticmethod
+    def read_file(hdf5_path: str, tests: Sequence[Union[int, str]], part_flag: int = PartFlags.ALL,
+                  read_fail: int = ReadFail.Y) -> pd.DataFrame:
+        """
+        在子进程中执行, 只读 prr_df/ptmd_df/dtp_df
+        dtp_df 是fixed格式存的, 不能按TEST_ID部分读取, 读出来后马上只留下要的测试项
+        """
+        ptmd_df = pd.read_hdf(hdf5_path, key="ptmd_df")
+        ptmd_df["TEXT"] = ptmd_df["TEST_NUM"].astype(str) + ":" + ptmd_df["TEST_TXT"]
+        ptmd_df = CrossLotQuery.select_tests(ptmd_df, tests)
+        if ptmd_df.empty:
+            return ptmd_df.reindex(columns=CrossLotQuery.TEST_COLUMNS + CrossLotQuery.STAT_COLUMNS)
+        prr_df = pd.read_hdf(hdf5_path, key="prr_df")
+        dtp_df = pd.read_hdf(hdf5_path, key="dtp_df")
+        dtp_df = dtp_df[dtp_df["TEST_ID"].isin(ptmd_df["TEST_ID"])]
+        return CrossLotQuery.test_stats(prr_df, dtp_df, ptmd_df, part_flag, read_fail)
+
+    @staticmethod
+    def run(tests: Sequence[Union[int, str]], part_flag: int = PartFlags.ALL, read_fail: int = ReadFail.Y,
+            workers: int = None, **kwargs) -> pd.DataFrame:
+        """
+        CrossLotQuery.run(["1000:VDD_LEAK"], days=90, PART_TYP="Y")
+        :param tests: 见 select_tests
+        :param part_flag:
+        :param read_fail:
+        :param workers: 进程数, 1时在当前进程中执行
+        :param kwargs: files 的参数
+        :return: [*FILE_COLUMNS, *TEST_COLUMNS, *STAT_COLUMNS], 按START_T排序; 读取失败的文件会跳过
+        """
+        files = CrossLotQuery.files(part_flag=part_flag, read_fail=read_fail, **kwargs)
+        paths = files["HDF5_PATH"].tolist()
+        workers = max(min(len(paths), workers or os.cpu_count() or 1), 1)
+        results = {}  # type:dict
+        if workers == 1:
+            for path in paths:
+                try:
+                    results[path] = CrossLotQuery.read_file(path, tests, part_flag, read_fail)
+                except Exception as err:
+                    print("cross lot query exception: ", path, err)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(CrossLotQuery.read_file, path, tests, part_flag, read_fail): path
+                    for path in paths
+                }
+                for future in as_completed(futures):
+                    try:
+                        results[futures[future]] = future.result()
+                    except Exception as err:
+                        print("cross lot query exception: ", futures[future], err)
+        return CrossLotQuery.merge(files, results)
+
+    @staticmethod
+    def merge(files: pd.DataFrame, results: dict) -> pd.DataFrame:
+        """ 按files的顺序把每个文件的结果接起来, 加上文件信息 """
+        frames = []  # type:List[pd.DataFrame]
+        for row in files.reindex(columns=CrossLotQuery.FILE_COLUMNS).to_dict(orient="records"):
+            df = results.get(row["HDF5_PATH"])
+            if df is None or df.empty:
+                continue
+            frames.append(pd.concat([pd.DataFrame([row] * len(df)), df.reset_index(drop=True)], axis=1))
+        columns = CrossLotQuery.FILE_COLUMNS + CrossLotQuery.TEST_COLUMNS + CrossLotQuery.STAT_COLUMNS
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)[columns]
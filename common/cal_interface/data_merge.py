@@ -0,0 +1,142 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+@File    : data_merge.py
+@Author  : Link
+@Time    : 2023/2/21 15:20
+@Mark    : 多个文件(不同程序/版本)Merge时, 测试项的对应关系
+    KEY的选取:
+        TEXT: TEST_NUM:TEST_TXT, 和以前一样
+        TEST_NUM: 只看测试号, 程序改了测试名也能对上
+        TEXT_93K: TEXT去掉第一个@之后的部分, 93k的 TEST_TXT@PIN
+        MAPPING: 用户的对应表 [TEXT, KEY], 没有写在表中的按TEXT
+        同一个文件中不同的测试项得到相同的KEY时(如多个 TEST_NUM=0 的FTR), 这些测试项改回按TEXT
+    所有文件的ptmd_df先接在一起, KEY一次factorize(哈希)得到新的TEST_ID, dtp_df按(ID, TEST_ID)查表替换
+    文件数再多也只是整列操作, 不会每个测试项一次循环
+"""
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from common.app_variable import DataModule, GlobalVariable
+from common.trace import Trace
+
+
+class DataMerge:
+    TEXT = "TEXT"
+    TEST_NUM = "TEST_NUM"
+    TEXT_93K = "TEXT_93K"
+    MAPPING = "MAPPING"
+    KEYS = (TEXT, TEST_NUM, TEXT_93K, MAPPING)
+    MAPPING_HEAD = ("TEXT", "KEY")
+
+    @staticmethod
+    def load_mapping(path: str) -> pd.DataFrame:
+        """ csv或者xlsx, 需要有 TEXT, KEY 两列 """
+        if path.lower().endswith((".xlsx", ".xls")):
+            df = pd.read_excel(path, dtype=str)
+        else:
+            df = pd.read_csv(path, dtype=str)
+        missing = [each for each in DataMerge.MAPPING_HEAD if each not in df]
+        if missing:
+            raise KeyError("对应表缺少列: {}".format(",".join(missing)))
+        return df[list(DataMerge.MAPPING_HEAD)].dropna()
+
+    @staticmethod
+    def merge_key(ptmd_df: pd.DataFrame, key: str = TEXT, mapping: pd.DataFrame = None) -> pd.Series:
+        """
+        :param ptmd_df: 需要有 TEXT, TEST_NUM, 有ID列时检查同一个文件中的KEY冲突
+        :param key: KEYS
+        :param mapping: key为MAPPING时的对应表
+        :return: 每个测试项的KEY
+        """
+        text = ptmd_df["TEXT"].astype(str)
+        if key == DataMerge.TEXT:
+            return text
+        if key == DataMerge.TEST_NUM:
+            keys = ptmd_df["TEST_NUM"].astype(str)
+        elif key == DataMerge.TEXT_93K:
+            keys = text.str.split("@", n=1).str[0]
+        elif key == DataMerge.MAPPING:
+            if mapping is None:
+                return text
+            table = mapping.drop_duplicates("TEXT", keep="last").set_index("TEXT")["KEY"].astype(str)
+            keys = text.map(table).fillna(text)
+        else:
+            raise ValueError("不支持的Merge KEY: {}".format(key))
+        if "ID" not in ptmd_df:
+            return keys
+        return DataMerge.fix_collision(ptmd_df, keys)
+
+    @staticmethod
+    def fix_collision(ptmd_df: pd.DataFrame, keys: pd.Series) -> pd.Series:
+        """
+        同一个文件(ID)中多个TEST_ID对应同一个KEY时, 合并后会变成一个测试项, unstack时index重复
+        这些测试项的KEY改回TEXT, 并print冲突的KEY
+        """
+        df = pd.DataFrame({"ID": ptmd_df["ID"].to_numpy(), "TEST_ID": ptmd_df["TEST_ID"].to_numpy(),
+                           "KEY": keys.to_numpy()})
+        collision = (df.groupby(["ID", "KEY"])["TEST_ID"].transform("nunique") > 1).to_numpy()
+        if not collision.any():
+            return keys
+        print("Merge KEY在同一个文件中重复, 这些测试项按TEXT对应: {}".format(
+            ",".join(pd.unique(df.KEY[collision]).astype(str))
+        ))
+        return keys.where(~collision, ptmd_df["TEXT"].astype(str))
+
+    @staticmethod
+    @Trace.span()
+    def merge(args: List[DataModule], key: str = TEXT, mapping: pd.DataFrame = None) -> DataModule:
+        """
+        将所有的TEST_ID重新分配, KEY一样的测试项用同一个TEST_ID
+        新的ptmd_df中每个KEY留最后一个文件的那一行(limit等以最后一个为准), TEST_ID从1开始
+        :param args: 每个DataModule的prr/dtp/ptmd都要有ID列
+        :param key:
+        :param mapping:
+        :return: dtp_df按新的TEST_ID排序, 没有出现在ptmd_df中的数据会被去掉
+        """
+        if len(args) == 1:
+            return args[0]
+        prr_df = pd.concat([each.prr_df for each in args])
+        dtp_df = pd.concat([each.dtp_df for each in args])
+        ptmd_df = pd.concat([each.ptmd_df for each in args], ignore_index=True)
+
+        codes, _ = pd.factorize(DataMerge.merge_key(ptmd_df, key, mapping))
+        new_test_id = codes + 1
+        index = pd.MultiIndex.from_arrays([ptmd_df["ID"].to_numpy(), ptmd_df["TEST_ID"].to_numpy()])
+        position = index.get_indexer(
+            pd.MultiIndex.from_arrays([dtp_df["ID"].to_numpy(), dtp_df["TEST_ID"].to_numpy()])
+        ) if index.is_unique else DataMerge.last_indexer(index, dtp_df)
+        found = position >= 0
+        dtp_test_id = new_test_id[position[found]]
+        order = np.argsort(dtp_test_id, kind="stable")
+        dtp_df = dtp_df[found].iloc[order].assign(TEST_ID=dtp_test_id[order].astype(dtp_df["TEST_ID"].dtype))
+
+        ptmd_df = ptmd_df.assign(TEST_ID=new_test_id)
+        ptmd_df = ptmd_df.drop_duplicates("TEST_ID", keep="last").sort_values("TEST_ID").reset_index(drop=True)
+        for k, v in GlobalVariable.PTMD_TYPE_DICT.items():
+            ptmd_df[k] = ptmd_df[k].astype(v)
+        return DataModule(prr_df=prr_df, dtp_df=dtp_df, ptmd_df=ptmd_df)
+
+    @staticmethod
+    def last_indexer(index: pd.MultiIndex, dtp_df: pd.DataFrame) -> np.ndarray:
+        """ 同一个文件中TEST_ID重复时, 用最后一个 """
+        keep = ~index.duplicated(keep="last")
+        rows = np.flatnonzero(keep)
+        position = index[keep].get_indexer(
+            pd.MultiIndex.from_arrays([dtp_df["ID"].to_numpy(), dtp_df["TEST_ID"].to_numpy()])
+        )
+        return np.where(position >= 0, rows[position], -1)
+
+    @staticmethod
+    def key_dictionary(ptmd_df: pd.DataFrame, key: str = TEXT, mapping: pd.DataFrame = None) -> pd.DataFrame:
+        """
+        Merge前预览: 每个KEY在每个文件中的TEXT
+        :param ptmd_df: 多个文件接在一起的ptmd_df, 有ID列
+        :return: [KEY, ID, TEXT, TEST_NUM, TEST_TXT], 一个KEY对应多个TEXT的就是被合并的
+        """
+        df = ptmd_df[["ID", "TEXT", "TEST_NUM", "TEST_TXT"]].copy()
+        df.insert(0, "KEY", DataMerge.merge_key(ptmd_df, key, mapping).to_numpy())
+        return df.sort_values(["KEY", "ID"], kind="stable").reset_index(drop=True)
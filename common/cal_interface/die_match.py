@@ -0,0 +1,112 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+@File    : die_match.py
+@Author  : Link
+@Time    : 2023/2/19 20:10
+@Mark    : 两次测试(CP1/CP2, 高温/低温)之间逐颗DIE的对比
+    按坐标(或PART_TXT)对齐两组数据, 同一颗DIE重复时取最后一次(复测的最终结果)
+    对齐后是 [DIE, 测试项] 的矩阵, 差值/比值/相关系数都是整列计算
+"""
+from typing import Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from common.cal_interface.process_table import ProcessTable
+
+
+class DieMatch:
+    DEFAULT_KEYS = ("X_COORD", "Y_COORD")
+
+    @staticmethod
+    def match(base_df: pd.DataFrame, other_df: pd.DataFrame,
+              keys: Sequence[str] = DEFAULT_KEYS) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :return: 两组数据中对应的行号(iloc), 长度一样
+        """
+        keys = list(keys)
+        base_key = base_df[keys].reset_index(drop=True)
+        base_key = base_key[base_key.notna().all(axis=1)].drop_duplicates(keep="last")
+        other_key = other_df[keys].reset_index(drop=True)
+        other_key = other_key[other_key.notna().all(axis=1)].drop_duplicates(keep="last")
+        index = pd.MultiIndex.from_frame(base_key)
+        position = index.get_indexer(pd.MultiIndex.from_frame(other_key))
+        found = position >= 0
+        return base_key.index.to_numpy()[position[found]], other_key.index.to_numpy()[found]
+
+    @staticmethod
+    def correlation(base: np.ndarray, other: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        每一列的皮尔逊相关系数, 只用两边都有值的DIE
+        :param base: [DIE, 测试项]
+        :param other: [DIE, 测试项]
+        :return: 有效DIE数, 相关系数
+        """
+        valid = ~(np.isnan(base) | np.isnan(other))
+        qty = valid.sum(axis=0)
+        base, other = np.where(valid, base, 0), np.where(valid, other, 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            base = np.where(valid, base - base.sum(axis=0) / qty, 0)
+            other = np.where(valid, other - other.sum(axis=0) / qty, 0)
+            corr = (base * other).sum(axis=0) / np.sqrt((base * base).sum(axis=0) * (other * other).sum(axis=0))
+        return qty, corr
+
+    @staticmethod
+    def compare(base_df: pd.DataFrame, other_df: pd.DataFrame, calculation: dict,
+                keys: Sequence[str] = DEFAULT_KEYS, decimal: int = 6) -> pd.DataFrame:
+        """
+        other - base
+        :param base_df: 基准, 需要有keys和calculation中的列
+        :param other_df:
+        :param calculation: {TEXT: capability dict}
+        :param keys: DIE的匹配列
+        :param decimal:
+        :return: [*LIMIT_HEAD, QTY, BASE_AVG, OTHER_AVG, DELTA_AVG, DELTA_STD, DELTA_MAX, RATIO_AVG, CORR]
+            DELTA_MAX 是绝对值最大的差值(带符号)
+        """
+        columns = list(calculation.keys())
+        base_rows, other_rows = DieMatch.match(base_df, other_df, keys)
+        base = base_df[columns].to_numpy(dtype=np.float64)[base_rows]
+        other = other_df[columns].to_numpy(dtype=np.float64)[other_rows]
+        qty, corr = DieMatch.correlation(base, other)
+        valid = ~(np.isnan(base) | np.isnan(other))
+        base, other = np.where(valid, base, np.nan), np.where(valid, other, np.nan)
+        delta = other - base
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratio = np.where(base != 0, other / base, np.nan)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # 全部是NAN的列不告警
+            base_avg = np.nansum(base, axis=0) / qty
+            other_avg = np.nansum(other, axis=0) / qty
+            delta_avg = np.nansum(delta, axis=0) / qty
+            delta_std = np.sqrt(np.nansum((delta - delta_avg) ** 2, axis=0) / (qty - 1))
+            ratio_qty = (~np.isnan(ratio)).sum(axis=0)
+            ratio_avg = np.nansum(ratio, axis=0) / ratio_qty
+        abs_delta = np.where(np.isnan(delta), -1, np.abs(delta))
+        delta_max = delta[abs_delta.argmax(axis=0), np.arange(len(columns))] if len(delta) else \
+            np.full(len(columns), np.nan)
+
+        df = ProcessTable.limit_frame(calculation)
+        df["QTY"] = qty
+        for name, values in (
+                ("BASE_AVG", base_avg), ("OTHER_AVG", other_avg), ("DELTA_AVG", delta_avg),
+                ("DELTA_STD", delta_std), ("DELTA_MAX", delta_max), ("RATIO_AVG", ratio_avg), ("CORR", corr),
+        ):
+            df[name] = np.round(np.where(qty > 0, values, np.nan), decimal)
+        return df
+
+    @staticmethod
+    def die_delta(base_df: pd.DataFrame, other_df: pd.DataFrame, calculation: dict,
+                  keys: Sequence[str] = DEFAULT_KEYS) -> pd.DataFrame:
+        """
+        逐颗DIE的差值, 给导出或画图用
+        :return: [*keys, {TEXT}...] 值是 other - base
+        """
+        columns = list(calculation.keys())
+        base_rows, other_rows = DieMatch.match(base_df, other_df, keys)
+        delta = other_df[columns].to_numpy(dtype=np.float64)[other_rows] - \
+            base_df[columns].to_numpy(dtype=np.float64)[base_rows]
+        df = other_df[list(keys)].iloc[other_rows].reset_index(drop=True)
+        return pd.concat([df, pd.DataFrame(delta, columns=columns)], axis=1)
@@ -0,0 +1,125 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+@File    : limit_diff.py
+@Author  : Link
+@Time    : 2023/2/18 10:20
+@Mark    : 多个LOT之间的Limit差异, 一次透视, 没有逐格的循环
+    只负责计算, Excel/CSV/JSON 都是从 LimitDiffModule 渲染
+"""
+import json
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from common.app_variable import LimitDiffModule
+from common.export_interface.csv_export import CsvExport
+from common.trace import Trace
+
+
+class LimitDiff:
+    COLUMN_HEAD = ["TEST_ID", "TEXT", "UNITS"]
+    LIMIT_HEAD = ["LO_LIMIT", "HI_LIMIT"]
+
+    @staticmethod
+    def limit_matrix(summary_df: pd.DataFrame, limit_df: pd.DataFrame) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+        """
+        groupby(TEXT, ID) 一次透视, 同一个ID中重复的TEXT取第一个
+        :param summary_df: 需要有ID, 决定LOT的顺序
+        :param limit_df: ptmd_df, 需要有 ID, TEST_ID, TEXT, UNITS, LO_LIMIT, HI_LIMIT
+        :return: 测试项, LO [测试项, LOT], HI [测试项, LOT]
+        """
+        tests = limit_df[LimitDiff.COLUMN_HEAD].drop_duplicates(keep='first').reset_index(drop=True)
+        pivot = limit_df.groupby(["TEXT", "ID"])[LimitDiff.LIMIT_HEAD].first().unstack("ID")
+        ids = summary_df["ID"].tolist()
+        pivot = pivot.reindex(index=tests["TEXT"], columns=pd.MultiIndex.from_product([LimitDiff.LIMIT_HEAD, ids]))
+        values = pivot.to_numpy(dtype=np.float64)
+        return tests, values[:, :len(ids)], values[:, len(ids):]
+
+    @staticmethod
+    def change_mask(values: np.ndarray) -> np.ndarray:
+        """
+        和上一个LOT不同, 第一个LOT不比较, 自己没有值的不标记, NAN和NAN算相同
+        :param values: [测试项, LOT]
+        :return:
+        """
+        mask = np.zeros(values.shape, dtype=bool)
+        now, before = values[:, 1:], values[:, :-1]
+        mask[:, 1:] = ~np.isnan(now) & ~(now == before)
+        return mask
+
+    @staticmethod
+    def first_change(mask: np.ndarray) -> np.ndarray:
+        """
+        :return: [测试项], 没有变化是-1
+        """
+        if mask.shape[1] == 0:
+            return np.full(mask.shape[0], -1, dtype=np.int64)
+        return np.where(mask.any(axis=1), mask.argmax(axis=1), -1)
+
+    @staticmethod
+    @Trace.span()
+    def calculation(summary_df: pd.DataFrame, limit_df: pd.DataFrame) -> LimitDiffModule:
+        tests, lo_limit, hi_limit = LimitDiff.limit_matrix(summary_df, limit_df)
+        lo_change, hi_change = LimitDiff.change_mask(lo_limit), LimitDiff.change_mask(hi_limit)
+        return LimitDiffModule(
+            tests=tests,
+            lots=summary_df.reset_index(drop=True),
+            lo_limit=lo_limit,
+            hi_limit=hi_limit,
+            lo_change=lo_change,
+            hi_change=hi_change,
+            first_change=LimitDiff.first_change(lo_change | hi_change),
+        )
+
+    @staticmethod
+    def to_frame(diff: LimitDiffModule, only_change: bool = False) -> pd.DataFrame:
+        """
+        宽表, 给CSV和界面表格用
+        :return: [TEST_ID, TEXT, UNITS, FIRST_CHANGE_ID, {ID}_LO_LIMIT, {ID}_HI_LIMIT, ...]
+        """
+        ids = diff.lots["ID"].to_numpy()
+        df = diff.tests.copy()
+        # -1 不在index中, reindex后是空
+        df["FIRST_CHANGE_ID"] = pd.Series(ids, dtype=object).reindex(diff.first_change).to_numpy()
+        # LO/HI 交错排列, 和Excel中一样
+        limits = np.stack([diff.lo_limit, diff.hi_limit], axis=2).reshape(len(df), -1)
+        columns = ["{}_{}".format(each, head) for each in ids for head in LimitDiff.LIMIT_HEAD]
+        df = pd.concat([df, pd.DataFrame(limits, columns=columns)], axis=1)
+        if only_change:
+            df = df[diff.first_change >= 0].reset_index(drop=True)
+        return df
+
+    @staticmethod
+    def to_json(diff: LimitDiffModule, only_change: bool = True) -> dict:
+        """
+        {"lots": [...], "tests": [{TEST_ID, TEXT, UNITS, FIRST_CHANGE_ID, LO_LIMIT: [...], HI_LIMIT: [...]}]}
+        NAN 写成 None
+        """
+        index = np.flatnonzero(diff.first_change >= 0) if only_change else np.arange(len(diff.tests))
+        ids = diff.lots["ID"].tolist()
+        lo = np.where(np.isnan(diff.lo_limit[index]), None, diff.lo_limit[index]).tolist()
+        hi = np.where(np.isnan(diff.hi_limit[index]), None, diff.hi_limit[index]).tolist()
+        tests = []
+        for row, (test_id, text, units) in enumerate(diff.tests.iloc[index].itertuples(index=False, name=None)):
+            first = int(diff.first_change[index[row]])
+            tests.append({
+                "TEST_ID": int(test_id), "TEXT": text, "UNITS": units,
+                "FIRST_CHANGE_ID": ids[first] if first >= 0 else None,
+                "LO_LIMIT": lo[row], "HI_LIMIT": hi[row],
+            })
+        return {"lots": ids, "tests": tests}
+
+    @staticmethod
+    def save(diff: LimitDiffModule, file_path: str, only_change: bool = False) -> str:
+        """
+        按后缀写成 .json(to_json) 或 .csv(to_frame)
+        :return: file_path
+        """
+        if file_path.lower().endswith(".json"):
+            with open(file_path, "w", encoding="utf-8") as f:
+                json.dump(LimitDiff.to_json(diff, only_change), f, ensure_ascii=False, indent=1)
+            return file_path
+        return CsvExport.write(LimitDiff.to_frame(diff, only_change), file_path)
@@ -0,0 +1,148 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+@File    : lot_compare.py
+@Author  : Link
+@Time    : 2023/2/18 15:40
+@Mark    : LOT之间的AVG/STD/CPK/良率对比
+    (测试项, LOT) 编码成一个整数, np.bincount 一次算出数量/和/平方和, 取代原来的三次 pivot_table
+    所有LOT都一样的分组列(例如同一个PART_TYP)不参与分组
+"""
+from typing import List, Tuple, Sequence
+
+import numpy as np
+import pandas as pd
+
+from common.app_variable import LotCompareModule, DataModule, DatatType, FailFlag
+from common.trace import Trace
+
+
+class LotCompare:
+    DEFAULT_KEYS = ("SUB_CON", "PART_TYP", "JOB_NAM", "TEST_COD", "LOT_ID", "SBLOT_ID", "WAFER_ID")
+
+    @staticmethod
+    def used_keys(summary_df: pd.DataFrame, keys: Sequence[str] = DEFAULT_KEYS) -> List[str]:
+        """
+        不存在的列和所有LOT都一样的列去掉, 都一样时保留最后一列(最细的)
+        """
+        keys = [each for each in keys if each in summary_df]
+        used = [each for each in keys if summary_df[each].nunique(dropna=False) > 1]
+        return used or keys[-1:] or ["ID"]
+
+    @staticmethod
+    def lot_code(summary_df: pd.DataFrame, keys: List[str]) -> Tuple[pd.DataFrame, pd.Series]:
+        """
+        :return: LOT的分组信息, ID -> LOT的位置
+        """
+        grouped = summary_df[keys].astype(str).groupby(keys, sort=True)
+        lots = grouped.size().reset_index()[keys]
+        return lots, pd.Series(grouped.ngroup().to_numpy(), index=summary_df["ID"].to_numpy())
+
+    @staticmethod
+    def group_stats(flat: np.ndarray, values: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        :return: 数量, 平均值, 标准差(ddof=1), 数量不够的是NAN
+        """
+        count = np.bincount(flat, minlength=size)
+        total = np.bincount(flat, weights=values, minlength=size)
+        square = np.bincount(flat, weights=values * values, minlength=size)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / count
+            var = (square - total * mean) / (count - 1)
+        std = np.sqrt(np.maximum(var, 0))
+        std[count < 2] = np.nan
+        return count, mean, std
+
+    @staticmethod
+    @Trace.span()
+    def calculation(summary_df: pd.DataFrame, df_module: DataModule,
+                    keys: Sequence[str] = DEFAULT_KEYS) -> LotCompareModule:
+        """
+        :param summary_df: select_summary, 需要有ID和keys中的列
+        :param df_module: Li.df_module, dtp_df 的index是 [TEST_ID, DIE_ID]
+        :param keys: LOT的分组列
+        :return:
+        """
+        keys = LotCompare.used_keys(summary_df, keys)
+        lots, id_to_lot = LotCompare.lot_code(summary_df, keys)
+        tests = df_module.ptmd_df.drop_duplicates("TEST_ID", keep="last")[
+            ["TEST_ID", "TEXT", "DATAT_TYPE", "LO_LIMIT", "HI_LIMIT"]
+        ].reset_index(drop=True)
+        test_count, lot_count = len(tests), len(lots)
+        size = test_count * lot_count
+
+        dtp_df = df_module.dtp_df
+        test_code = pd.Index(tests["TEST_ID"]).get_indexer(dtp_df.index.get_level_values("TEST_ID"))
+        lot_index = id_to_lot.reindex(dtp_df["ID"].to_numpy()).to_numpy()
+        valid = (test_code >= 0) & ~np.isnan(lot_index)
+        flat = test_code[valid] * lot_count + lot_index[valid].astype(np.int64)
+        result = dtp_df["RESULT"].to_numpy(dtype=np.float64)[valid]
+        fail = dtp_df["FAIL_FLG"].to_numpy()[valid] == FailFlag.FAIL
+
+        qty = np.bincount(flat, minlength=size)
+        reject = np.bincount(flat[fail], minlength=size)
+        # 减去每个测试项的平均值再算平方和, 避免大数相减丢失精度
+        finite = ~np.isnan(result)
+        test_flat = flat // lot_count
+        with np.errstate(invalid="ignore", divide="ignore"):
+            shift = np.bincount(test_flat[finite], weights=result[finite], minlength=test_count) / \
+                    np.bincount(test_flat[finite], minlength=test_count)
+        values = result - shift[test_flat]
+        all_count, all_mean, all_std = LotCompare.group_stats(flat[finite], values[finite], size)
+        use = finite & ~fail
+        pass_count, pass_mean, pass_std = LotCompare.group_stats(flat[use], values[use], size)
+        # 全部FAIL时用所有数据
+        only_fail = pass_count == 0
+        mean = np.where(only_fail, all_mean, pass_mean) + np.repeat(shift, lot_count)
+        std = np.where(only_fail, all_std, pass_std)
+        std = np.where(std == 0, 1E-05, std)
+
+        lo = np.repeat(tests["LO_LIMIT"].to_numpy(dtype=np.float64), lot_count)
+        hi = np.repeat(tests["HI_LIMIT"].to_numpy(dtype=np.float64), lot_count)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cpk = np.abs(np.minimum((hi - mean) / (3 * std), (mean - lo) / (3 * std)))
+            reject_rate = reject / qty
+        ptr = np.repeat(tests["DATAT_TYPE"].isin([DatatType.PTR, DatatType.MPR]).to_numpy(), lot_count)
+        mean, std, cpk = (np.where(ptr, each, np.nan) for each in (mean, std, cpk))
+
+        # LOT的良率
+        prr_df = df_module.prr_df
+        prr_lot = id_to_lot.reindex(prr_df["ID"].to_numpy()).to_numpy()
+        prr_valid = ~np.isnan(prr_lot)
+        prr_lot = prr_lot[prr_valid].astype(np.int64)
+        lots["QTY"] = np.bincount(prr_lot, minlength=lot_count)
+        lots["PASS"] = np.bincount(
+            prr_lot[prr_df["FAIL_FLAG"].to_numpy()[prr_valid] == FailFlag.PASS], minlength=lot_count
+        )
+        lots["YIELD"] = lots["PASS"] / lots["QTY"].where(lots["QTY"] > 0)
+
+        shape = (test_count, lot_count)
+        return LotCompareModule(
+            keys=keys,
+            lots=lots,
+            tests=tests,
+            qty=qty.reshape(shape),
+            avg=mean.reshape(shape),
+            std=std.reshape(shape),
+            cpk=cpk.reshape(shape),
+            reject_rate=reject_rate.reshape(shape),
+        )
+
+    @staticmethod
+    def to_frame(compare: LotCompareModule) -> pd.DataFrame:
+        """
+        长表, 每行一个 (LOT, 测试项)
+        :return: [*keys, TEST_ID, TEXT, QTY, AVG, STD, CPK, REJECT_RATE]
+        """
+        test_count, lot_count = compare.qty.shape
+        df = compare.lots[compare.keys].iloc[np.tile(np.arange(lot_count), test_count)].reset_index(drop=True)
+        test_index = np.repeat(np.arange(test_count), lot_count)
+        df["TEST_ID"] = compare.tests["TEST_ID"].to_numpy()[test_index]
+        df["TEXT"] = compare.tests["TEXT"].to_numpy()[test_index]
+        df["QTY"] = compare.qty.ravel()
+        df["AVG"] = compare.avg.ravel()
+        df["STD"] = compare.std.ravel()
+        df["CPK"] = compare.cpk.ravel()
+        df["REJECT_RATE"] = compare.reject_rate.ravel()
+        return df
@@ -10,6 +10,7 @@
 
 import pandas as pd
 
+from common.cal_interface.bin_utils import BinCount
 from parser_core.stdf_parser_func import PrrPartFlag
 
 
@@ -31,45 +32,37 @@ class PandasStdfUtils:
         return record_all
 
     @staticmethod
-    def df_generator_hbr(df: pd.DataFrame, head_num: int, site_num: int, bin_name=None) -> list:
+    def df_generator_br(df: pd.DataFrame, head_num: int, site_num: int, bin_head: str, prefix: str,
+                        bin_name=None) -> list:
         """
-        注意从MIR中找到bin相关信息
+        HBR/SBR 共用, 数量由 BinCount 一次 bincount 得到
+        :param prefix: HBIN or SBIN
         """
         if bin_name is None:
             bin_name = dict()
-        br_data = []
-        for group_tuple, c_df in df.groupby(["HARD_BIN", "FAIL_FLAG"]):
-            r_bin, pf = group_tuple
-            br_data.append(
-                {
-                    "HEAD_NUM": head_num,
-                    "SITE_NUM": site_num,
-                    "HBIN_NUM": r_bin,
-                    "HBIN_CNT": len(c_df),
-                    "HBIN_PF": "P" if pf else "F",
-                    "HBIN_NAM": bin_name.get(r_bin, ""),
-                }
-            )
-        return br_data
+        count = BinCount.count(df, bin_head, by=())
+        return [
+            {
+                "HEAD_NUM": head_num,
+                "SITE_NUM": site_num,
+                prefix + "_NUM": r_bin,
+                prefix + "_CNT": int(cnt),
+                prefix + "_PF": "P" if pf else "F",
+                prefix + "_NAM": bin_name.get(r_bin, ""),
+            }
+            for r_bin, pf, cnt in zip(count[bin_head], count["FAIL_FLAG"], count["COUNT"])
+        ]
+
+    @staticmethod
+    def df_generator_hbr(df: pd.DataFrame, head_num: int, site_num: int, bin_name=None) -> list:
+        """
+        注意从MIR中找到bin相关信息
+        """
+        return PandasStdfUtils.df_generator_br(df, head_num, site_num, "HARD_BIN", "HBIN", bin_name)
 
     @staticmethod
     def df_generator_sbr(df: pd.DataFrame, head_num: int, site_num: int, bin_name=None) -> list:
         """
         注意从MIR中找到bin相关信息
         """
-        if bin_name is None:
-            bin_name = dict()
-        br_data = []
-        for group_tuple, c_df in df.groupby(["SOFT_BIN", "FAIL_FLAG"]):
-            r_bin, pf = group_tuple
-            br_data.append(
-                {
-                    "HEAD_NUM": head_num,
-                    "SITE_NUM": site_num,
-                    "SBIN_NUM": r_bin,
-                    "SBIN_CNT": len(c_df),
-                    "SBIN_PF": "P" if pf else "F",
-                    "SBIN_NAM": bin_name.get(r_bin, ""),
-                }
-            )
-        return br_data
+        return PandasStdfUtils.df_generator_br(df, head_num, site_num, "SOFT_BIN", "SBIN", bin_name)
@@ -0,0 +1,136 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+@File    : process_table.py
+@Author  : Link
+@Time    : 2023/2/19 16:40
+@Mark    : 制程能力界面(ProcessWidget)的表, 按 GROUP@DA_GROUP 分组
+    一次 groupby().agg 算出所有测试项的均值/标准差, CPK 用Limit向量广播, 结果直接是宽表
+"""
+from typing import List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from common.app_variable import FailFlag
+
+
+class ProcessTable:
+    GROUP_KEYS = ["GROUP", "DA_GROUP"]
+    LIMIT_HEAD = ["TEST_ID", "DATAT_TYPE", "TEXT", "UNITS", "LO_LIMIT", "HI_LIMIT", "LO_LIMIT_TYPE", "HI_LIMIT_TYPE"]
+    # 选项 -> 列名后缀
+    VALUE_SUFFIX = {"MEAN": "AVG", "STD": "STD", "CPK": "CPK"}
+
+    @staticmethod
+    def group_names(index: pd.Index) -> List[str]:
+        """ (GROUP, DA_GROUP) -> GROUP@DA_GROUP """
+        if isinstance(index, pd.MultiIndex):
+            return ['@'.join(str(ea) for ea in key) for key in index]
+        return [str(key) for key in index]
+
+    @staticmethod
+    def yield_table(jmp_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        :return: [Item, Total, Pass, Fail, Yield]
+        """
+        count = jmp_df.assign(PASS=jmp_df["FAIL_FLAG"] == FailFlag.PASS).groupby(
+            ProcessTable.GROUP_KEYS, observed=True
+        )["PASS"].agg(["size", "sum"])
+        total = count["size"].to_numpy()
+        pass_num = count["sum"].to_numpy().astype(np.int64)
+        return pd.DataFrame({
+            "Item": ProcessTable.group_names(count.index),
+            "Total": total,
+            "Pass": pass_num,
+            "Fail": total - pass_num,
+            "Yield": ["{}%".format(each) for each in np.round(pass_num / total * 100, 3).tolist()],
+        })
+
+    @staticmethod
+    def limit_frame(calculation: dict) -> pd.DataFrame:
+        """
+        :param calculation: {TEXT: capability dict}, TEXT是jmp_df中的列名
+        """
+        df = pd.DataFrame(list(calculation.values()))
+        df["TEXT"] = list(calculation.keys())
+        return df.reindex(columns=ProcessTable.LIMIT_HEAD)
+
+    @staticmethod
+    def cpk(mean: np.ndarray, std: np.ndarray, lo: np.ndarray, hi: np.ndarray, decimal: int) -> np.ndarray:
+        """
+        和原来一样: std为0时CPK是0, 不取绝对值
+        :param mean: [测试项, 分组]
+        :param std: [测试项, 分组]
+        :param lo: [测试项]
+        :param hi: [测试项]
+        :param decimal:
+        :return: [测试项, 分组]
+        """
+        lo, hi = lo[:, None], hi[:, None]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cpk = np.minimum((hi - mean) / (3 * std), (mean - lo) / (3 * std))
+        return np.where(std == 0, 0, np.round(cpk, decimal))
+
+    @staticmethod
+    def data_table(jmp_df: pd.DataFrame, calculation: dict, item_list: Sequence[str],
+                   decimal: int = 9) -> pd.DataFrame:
+        """
+        PASS的数据分组后的均值/标准差/CPK
+        :param jmp_df: 需要有GROUP, DA_GROUP, FAIL_FLAG和calculation中的列
+        :param calculation:
+        :param item_list: PROCESS_VALUE 中选中的, MEAN/STD/CPK
+        :param decimal: CPK的小数位
+        :return: [*LIMIT_HEAD, {GROUP@DA_GROUP}_AVG, {GROUP@DA_GROUP}_STD, {GROUP@DA_GROUP}_CPK, ...]
+        """
+        keys = list(calculation.keys())
+        groups = jmp_df.groupby(ProcessTable.GROUP_KEYS, observed=True).size().index
+        pass_df = jmp_df[jmp_df["FAIL_FLAG"] == FailFlag.PASS]
+        stats = pass_df.groupby(ProcessTable.GROUP_KEYS, observed=True)[keys].agg(["mean", "std"])
+        # 没有PASS数据的分组是NAN
+        stats = stats.reindex(groups)
+        mean = stats.xs("mean", axis=1, level=1)[keys].to_numpy(dtype=np.float64).T
+        std = stats.xs("std", axis=1, level=1)[keys].to_numpy(dtype=np.float64).T
+
+        df = ProcessTable.limit_frame(calculation)
+        values = {
+            "AVG": np.round(mean, 5),
+            "STD": np.round(std, 5),
+            "CPK": ProcessTable.cpk(
+                mean, std, df["LO_LIMIT"].to_numpy(dtype=np.float64), df["HI_LIMIT"].to_numpy(dtype=np.float64),
+                decimal,
+            ),
+        }
+        suffixes = [ProcessTable.VALUE_SUFFIX[each] for each in item_list if each in ProcessTable.VALUE_SUFFIX]
+        columns = {}
+        for column, name in enumerate(ProcessTable.group_names(groups)):
+            for suffix in suffixes:
+                columns["{}_{}".format(name, suffix)] = values[suffix][:, column]
+        return pd.concat([df, pd.DataFrame(columns, index=df.index)], axis=1)
+
+    @staticmethod
+    def value_table(df: pd.DataFrame, calculation: dict, decimal: int = 6) -> pd.DataFrame:
+        """
+        一个分组的值报告, 只计算PASS的DIE
+        :return: [TEST_ID, DATAT_TYPE, TEST_NUM, TEST_TXT, UNITS, LO_LIMIT, HI_LIMIT, AVG, STD, CPK, QTY,
+            LO_LIMIT_TYPE, HI_LIMIT_TYPE, TEXT]
+        """
+        keys = list(calculation.keys())
+        pass_df = df[df["FAIL_FLAG"] == FailFlag.PASS][keys]
+        mean = pass_df.mean().to_numpy(dtype=np.float64)
+        std = pass_df.std().to_numpy(dtype=np.float64)
+        table = pd.DataFrame(list(calculation.values()))
+        table["TEXT"] = keys
+        table = table.reindex(columns=[
+            "TEST_ID", "DATAT_TYPE", "TEST_NUM", "TEST_TXT", "UNITS", "LO_LIMIT", "HI_LIMIT",
+            "LO_LIMIT_TYPE", "HI_LIMIT_TYPE", "TEXT",
+        ])
+        cpk = ProcessTable.cpk(
+            mean[:, None], std[:, None], table["LO_LIMIT"].to_numpy(dtype=np.float64),
+            table["HI_LIMIT"].to_numpy(dtype=np.float64), decimal,
+        )[:, 0]
+        table.insert(7, "AVG", np.round(mean, decimal))
+        table.insert(8, "STD", np.round(std, decimal))
+        table.insert(9, "CPK", cpk)
+        table.insert(10, "QTY", len(df))
+        return table
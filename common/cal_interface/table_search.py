@@ -0,0 +1,144 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+@File    : table_search.py
+@Author  : Link
+@Time    : 2023/2/19 14:20
+@Mark    : 制程能力表的筛选, 每次载入数据后建一次索引, 之后每个按键只查索引
+    文本用三字符(trigram)倒排索引找候选行, 再确认一次
+    数字列 CPK<1.33 / FAIL_RATE>0.1% 是整列比较
+"""
+import operator
+import re
+from typing import Sequence, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from common.app_variable import SearchIndexModule
+
+
+class TableSearch:
+    TEXT_COLUMNS = ("TEXT", "TEST_NUM", "TEST_TXT")
+    OPERATORS = {
+        "<=": operator.le, ">=": operator.ge, "==": operator.eq, "!=": operator.ne,
+        "=": operator.eq, "<": operator.lt, ">": operator.gt,
+    }
+    NUMBER_TERM = re.compile(r"^([A-Za-z_]\w*)\s*(<=|>=|==|!=|=|<|>)\s*([-+]?[\d.]+(?:[eE][-+]?\d+)?)%?$")
+
+    @staticmethod
+    def to_number(values: pd.Series) -> np.ndarray:
+        """ "1.2%" -> 1.2, 转不了的是NAN """
+        if not pd.api.types.is_numeric_dtype(values):
+            values = values.astype(str).str.rstrip("%")
+        return pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64)
+
+    @staticmethod
+    def grams(text: str) -> set:
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    @staticmethod
+    def build(df: pd.DataFrame, text_columns: Sequence[str] = TEXT_COLUMNS) -> SearchIndexModule:
+        text_columns = [each for each in text_columns if each in df]
+        if text_columns:
+            columns = [df[each].astype(str).str.lower().tolist() for each in text_columns]
+            texts = ["\n".join(each) for each in zip(*columns)]
+        else:
+            texts = [""] * len(df)
+        trigrams = {}  # type:Dict[str, np.ndarray]
+        series = pd.Series(texts, dtype=object)
+        lengths = series.str.len().to_numpy() if len(series) else np.array([], dtype=np.int64)
+        # 按位置整列切片, 不逐行循环
+        gram_list, row_list = [], []
+        for start in range(int(lengths.max(initial=0)) - 2):
+            rows = np.flatnonzero(lengths >= start + 3)
+            gram_list.append(series.iloc[rows].str[start:start + 3].to_numpy())
+            row_list.append(rows)
+        if gram_list:
+            codes, uniques = pd.factorize(np.concatenate(gram_list))
+            rows = np.concatenate(row_list)
+            # 同一行重复的三字符只留一个, 排序后每个三字符的行号是升序
+            pair = np.sort(codes.astype(np.int64) * len(texts) + rows)
+            pair = pair[np.r_[True, pair[1:] != pair[:-1]]]
+            codes, rows = pair // len(texts), pair % len(texts)
+            splits = np.flatnonzero(np.diff(codes)) + 1
+            trigrams = dict(zip(uniques[codes[np.r_[0, splits]]].tolist(), np.split(rows, splits)))
+        numbers = {}
+        for each in df.columns:
+            values = TableSearch.to_number(df[each])
+            if not np.isnan(values).all():
+                numbers[str(each).upper()] = values
+        return SearchIndexModule(texts=texts, trigrams=trigrams, numbers=numbers)
+
+    @staticmethod
+    def candidates(index: SearchIndexModule, text: str) -> np.ndarray:
+        """
+        含有text所有三字符的行, 短于3个字符时是所有行
+        """
+        rows = None
+        for gram in TableSearch.grams(text):
+            posting = index.trigrams.get(gram)
+            if posting is None:
+                return np.array([], dtype=np.int64)
+            rows = posting if rows is None else np.intersect1d(rows, posting, assume_unique=True)
+        if rows is None:
+            return np.arange(len(index.texts))
+        return rows
+
+    @staticmethod
+    def pattern_mask(index: SearchIndexModule, pattern: re.Pattern, rows: np.ndarray = None) -> np.ndarray:
+        mask = np.zeros(len(index.texts), dtype=bool)
+        rows = range(len(index.texts)) if rows is None else rows.tolist()
+        texts = index.texts
+        hit = [row for row in rows if pattern.search(texts[row])]
+        mask[hit] = True
+        return mask
+
+    @staticmethod
+    def term_mask(index: SearchIndexModule, term: str) -> np.ndarray:
+        """
+        re:xxx  正则
+        CPK<1.33, FAIL_RATE>0.1%  数字比较, 列名不区分大小写
+        带 * ? 的是通配符, 其他是子串, 都不区分大小写
+        """
+        if term[:3].lower() == "re:":
+            try:
+                # 每列一行, ^ $ 对每列生效
+                pattern = re.compile(term[3:], re.IGNORECASE | re.MULTILINE)
+            except re.error as err:
+                raise ValueError("正则错误: {}".format(err))
+            return TableSearch.pattern_mask(index, pattern)
+        number = TableSearch.NUMBER_TERM.match(term)
+        if number is not None and number.group(1).upper() in index.numbers:
+            column, op, value = number.groups()
+            with np.errstate(invalid="ignore"):
+                return TableSearch.OPERATORS[op](index.numbers[column.upper()], float(value))
+        term = term.lower()
+        if "*" in term or "?" in term:
+            # 通配符不跨列
+            pattern = re.escape(term).replace(r"\*", "[^\n]*").replace(r"\?", "[^\n]")
+            literal = max(re.split(r"[*?]", term), key=len)
+            return TableSearch.pattern_mask(index, re.compile(pattern), TableSearch.candidates(index, literal))
+        mask = np.zeros(len(index.texts), dtype=bool)
+        rows = TableSearch.candidates(index, term)
+        texts = index.texts
+        mask[[row for row in rows.tolist() if term in texts[row]]] = True
+        return mask
+
+    @staticmethod
+    def terms(text: str) -> List[str]:
+        """ 空格隔开的条件, CPK < 1.33 这种写法先合并成一个 """
+        text = re.sub(r"\s*(<=|>=|==|!=|=|<|>)\s*", r"\1", text.strip())
+        return text.split()
+
+    @staticmethod
+    def query(index: SearchIndexModule, text: str) -> np.ndarray:
+        """
+        空格隔开的条件都要满足
+        :return: bool[行], 行按数据的顺序; 空条件是所有行
+        """
+        mask = np.ones(len(index.texts), dtype=bool)
+        for term in TableSearch.terms(text):
+            mask &= TableSearch.term_mask(index, term)
+        return mask
@@ -0,0 +1,109 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+@File    : data_export.py
+@Author  : Link
+@Time    : 2023/2/15 20:10
+@Mark    : 给JMP用的数据文件, CSV 或 Parquet
+    Parquet 保留 float32 和类别列(GROUP/DA_GROUP/BIN), JMP 打开时不需要再扫描整个文本去推断类型
+    Parquet 需要 pyarrow, 没有安装时退回 CSV
+    cached_write 通过 ExportCache 复用内容相同的文件
+"""
+import importlib.util
+import os
+from typing import Callable, Union, Tuple
+
+import pandas as pd
+
+from common.export_interface.csv_export import CsvExport
+from common.export_interface.export_cache import ExportCache
+from common.trace import Trace
+
+
+class ExportFormat:
+    CSV = "CSV"
+    PARQUET = "PARQUET"
+    FORMATS = (CSV, PARQUET)
+    SUFFIX = {CSV: ".csv", PARQUET: ".parquet"}
+
+
+class DataExport:
+    CATEGORY_COLUMNS = ("GROUP", "DA_GROUP", "HARD_BIN", "SOFT_BIN")
+
+    @staticmethod
+    def available(export_format: str) -> bool:
+        if export_format == ExportFormat.PARQUET:
+            return importlib.util.find_spec("pyarrow") is not None
+        return export_format == ExportFormat.CSV
+
+    @staticmethod
+    def usable_format(export_format: str) -> str:
+        """ 选择的格式不能用时退回CSV """
+        if DataExport.available(export_format):
+            return export_format
+        return ExportFormat.CSV
+
+    @staticmethod
+    def file_path(file_path: str, export_format: str) -> str:
+        """ 把 temp_xxx.csv 换成对应格式的后缀 """
+        return os.path.splitext(file_path)[0] + ExportFormat.SUFFIX[export_format]
+
+    @staticmethod
+    def to_parquet_df(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        类别列转成category, 列名转成str(TEST_ID之外可能有int列名)
+        """
+        df = df.rename(columns=str)
+        category = {
+            each: "category" for each in DataExport.CATEGORY_COLUMNS
+            if each in df and df[each].dtype.name != "category"
+        }
+        if category:
+            df = df.astype(category)
+        return df
+
+    @staticmethod
+    @Trace.span()
+    def write(df: pd.DataFrame, file_path: str, export_format: str = ExportFormat.CSV, precision: int = 6,
+              progress: Union[Callable[[int], None], None] = None) -> str:
+        """
+        :param df:
+        :param file_path: 后缀会按 export_format 替换
+        :param export_format: ExportFormat
+        :param precision: 只有CSV用到
+        :param progress: 回调 0~100
+        :return: 实际写入的文件路径
+        """
+        export_format = DataExport.usable_format(export_format)
+        file_path = DataExport.file_path(file_path, export_format)
+        if export_format == ExportFormat.PARQUET:
+            DataExport.to_parquet_df(df).to_parquet(file_path, index=False, engine="pyarrow")
+            if progress is not None:
+                progress(100)
+            return file_path
+        return CsvExport.write(df, file_path, precision=precision, progress=progress)
+
+    @staticmethod
+    def cached_write(df: pd.DataFrame, cache_path: str, export_format: str = ExportFormat.CSV, precision: int = 6,
+                     max_bytes: int = 0, progress: Union[Callable[[int], None], None] = None) -> Tuple[str, bool]:
+        """
+        内容一样的数据只写一次
+        :param df:
+        :param cache_path: 缓存目录
+        :param export_format:
+        :param precision:
+        :param max_bytes: 缓存目录的大小上限, <= 0 不限制
+        :param progress:
+        :return: 文件路径, 是否命中缓存
+        """
+        export_format = DataExport.usable_format(export_format)
+        key = ExportCache.key(df, export_format, precision if export_format == ExportFormat.CSV else None)
+        file_path, hit = ExportCache.get_or_write(
+            cache_path, key, ExportFormat.SUFFIX[export_format],
+            lambda temp_path: DataExport.write(df, temp_path, export_format, precision, progress),
+            max_bytes,
+        )
+        if hit and progress is not None:
+            progress(100)
+        return file_path, hit
@@ -0,0 +1,88 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+@File    : export_cache.py
+@Author  : Link
+@Time    : 2023/2/16 20:20
+@Mark    : 导出文件的缓存, 文件名就是内容的hash
+    同一份数据(数据空间/选取的TEST_ID/分组/选取范围都一样)换一种JMP图不用再写一次文件, 只生成新的jsl
+    缓存目录总大小超过上限时, 先删最久没用到的文件
+"""
+import hashlib
+import os
+from threading import Lock, get_ident
+from typing import Callable, Tuple, Hashable
+
+import numpy as np
+import pandas as pd
+
+
+class ExportCache:
+    PREFIX = "data_"
+    lock = Lock()
+
+    @staticmethod
+    def key(df: pd.DataFrame, *extra: Hashable) -> str:
+        """
+        列名/类型/每行的hash, 再加上导出格式和小数位等参数
+        选取和分组改变时 df 的内容也会变, 所以不需要另外去记录数据版本
+        :param df:
+        :param extra: 影响文件内容的其他参数
+        :return:
+        """
+        sha = hashlib.sha1()
+        sha.update(repr([(str(name), str(dtype)) for name, dtype in df.dtypes.items()]).encode("utf-8"))
+        sha.update(repr(extra).encode("utf-8"))
+        sha.update(np.ascontiguousarray(pd.util.hash_pandas_object(df, index=False).to_numpy()).tobytes())
+        return sha.hexdigest()
+
+    @staticmethod
+    def file_path(cache_path: str, key: str, suffix: str) -> str:
+        return os.path.join(cache_path, "{}{}{}".format(ExportCache.PREFIX, key, suffix))
+
+    @staticmethod
+    def get_or_write(cache_path: str, key: str, suffix: str, writer: Callable[[str], str],
+                     max_bytes: int) -> Tuple[str, bool]:
+        """
+        :param cache_path: JMP_CACHE_PATH
+        :param key: ExportCache.key
+        :param suffix: .csv/.parquet
+        :param writer: writer(临时文件路径) -> 写入的文件路径, 写完后改名, 避免JMP读到写了一半的文件
+        :param max_bytes: 缓存目录中导出文件的总大小上限, <= 0 不限制
+        :return: 文件路径, 是否命中缓存
+        """
+        file_path = ExportCache.file_path(cache_path, key, suffix)
+        if os.path.exists(file_path):
+            os.utime(file_path)  # 最近使用
+            return file_path, True
+        temp_path = writer("{}.{}.tmp{}".format(file_path[:-len(suffix)], get_ident(), suffix))
+        os.replace(temp_path, file_path)
+        ExportCache.evict(cache_path, max_bytes, keep=file_path)
+        return file_path, False
+
+    @staticmethod
+    def evict(cache_path: str, max_bytes: int, keep: str = None):
+        """
+        按最后使用时间从旧到新删除, keep 是刚写入的文件, 不删
+        """
+        if max_bytes <= 0:
+            return
+        with ExportCache.lock:
+            files = []
+            for each in os.scandir(cache_path):
+                if not each.is_file() or not each.name.startswith(ExportCache.PREFIX) or ".tmp" in each.name:
+                    continue
+                stat = each.stat()
+                files.append((stat.st_mtime, stat.st_size, each.path))
+            total = sum(each[1] for each in files)
+            for _, size, path in sorted(files):
+                if total <= max_bytes:
+                    break
+                if keep is not None and os.path.normcase(path) == os.path.normcase(keep):
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:  # JMP还开着这个文件
+                    continue
+                total -= size
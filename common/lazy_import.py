@@ -0,0 +1,60 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+@File    : lazy_import.py
+@Author  : Link
+@Time    : 2023/2/26 10:40
+@Mark    : 启动时不用的模块(JMP/图表/STDF载入/报表...)延迟到第一次用到时再import
+    JmpFactory = LazyImport("chart_core.chart_jmp.jmp_factory", "JmpFactory")
+    之后和原来的对象一样用: JmpFactory.scatter(...), StdfLoadUi(self, ...)
+    环境变量 STDF_EAGER_IMPORT=1 时马上import, 用来对比启动时间或检查打包
+    PyInstaller 看不到字符串中的模块, 新加的模块要放进 app.spec 的 hiddenimports
+"""
+import importlib
+import os
+from typing import List
+
+
+class LazyImport:
+    EAGER = os.environ.get("STDF_EAGER_IMPORT") == "1"
+    MODULES: List[str] = []  # 所有延迟import的模块
+
+    def __init__(self, module: str, name: str = None):
+        """
+        :param module: 模块的完整路径
+        :param name: 模块中的类/函数, None时就是模块本身
+        """
+        self.module = module
+        self.name = name
+        self.target = None
+        if module not in LazyImport.MODULES:
+            LazyImport.MODULES.append(module)
+        if LazyImport.EAGER:
+            self.load()
+
+    def load(self):
+        if self.target is None:
+            target = importlib.import_module(self.module)
+            self.target = target if self.name is None else getattr(target, self.name)
+        return self.target
+
+    @property
+    def loaded(self) -> bool:
+        return self.target is not None
+
+    def __getattr__(self, item):
+        if item in ("module", "name", "target"):  # copy/pickle 时还没有 __init__
+            raise AttributeError(item)
+        return getattr(self.load(), item)
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+    def __repr__(self):
+        return "<LazyImport {}{}>".format(self.module, "" if self.name is None else "." + self.name)
+
+    @staticmethod
+    def load_all():
+        for each in LazyImport.MODULES:
+            importlib.import_module(each)
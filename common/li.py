@@ -8,18 +8,24 @@
 @Mark    : 
 """
 
+import os
 from multiprocessing import Process
-from typing import List, Dict, Union, Tuple
+from typing import List, Dict, Union, Tuple, Callable
 
+import numpy as np
 import pandas as pd
-from PySide2.QtCore import QObject, Signal
 
-from app_test.test_utils.wrapper_utils import Time
+from common.trace import Trace
 from common.app_variable import DataModule, ToChartCsv, GlobalVariable, PtmdModule, LimitType, FailFlag
 from common.cal_interface.capability import CapabilityUtils
+from common.cal_interface.data_merge import DataMerge
+from common.cal_interface.limit_diff import LimitDiff
+from common.cal_interface.lot_compare import LotCompare
+from common.sql_interface.summary_catalog import SummaryCatalog
+from common.stdf_interface.stdf_bulk_write import StdfBulkWrite
+from common.stdf_interface.stdf_def_interface import Mir
 from parser_core.stdf_parser_file_write_read import ParserData
 from parser_core.stdf_parser_func import PtmdOptFlag, PtmdParmFlag
-from report_core.openxl_utils.utils import OpenXl
 
 
 class SummaryCore:
@@ -65,7 +71,7 @@ class SummaryCore:
     summary_df: pd.DataFrame = None
 
     def set_data(self, summary: Union[list, pd.DataFrame]):
-        if not summary:
+        if summary is None or len(summary) == 0:
             return
         if isinstance(summary, list):
             self.summary_df = pd.DataFrame(summary)
@@ -80,26 +86,41 @@ class SummaryCore:
         :return:
         """
         tree_dict_list = list()
-        for key, e_df in self.summary_df.groupby("LOT_ID"):  # type:str, pd.DataFrame
-            key = str(key)
-            qty = e_df["QTY"].sum()
-            pass_qty = e_df["PASS"].sum()
+        grouped = self.summary_df.groupby("LOT_ID")
+        lot_df = grouped.agg(QTY=("QTY", "sum"), PASS=("PASS", "sum"), START_T=("START_T", "min"))
+        records = self.summary_df.to_dict(orient="records")
+        indices = grouped.indices
+        for key, qty, pass_qty, start_t in lot_df.itertuples(name=None):
             if qty == 0:
                 pass_yield = "0.0%"
             else:
                 pass_yield = '{}%'.format(round(pass_qty / qty * 100, 2))
             tree_dict = {
-                "LOT_ID": key,
+                "LOT_ID": str(key),
                 "QTY": qty,
                 "PASS": pass_qty,
                 "YIELD": pass_yield,
-                "START_T": e_df["START_T"].min(),
-                "children": e_df.to_dict(orient="records")
+                "START_T": start_t,
+                "children": [records[each] for each in indices[key]]
             }
             tree_dict_list.append(tree_dict)
 
         return tree_dict_list
 
+    def load_catalog(self, id_start: int, part_flag: int = 0, read_fail: int = 1, **kwargs):
+        """
+        从 SummaryCatalog 中查询历史数据, 不需要重新解析和读取PRR
+        :param id_start: 和 RunStdfAnalysis 一样, space_nm * 1000
+        :param part_flag:
+        :param read_fail:
+        :param kwargs: SummaryCatalog.query 的条件, LOT_ID=..., start_t=...
+        :return:
+        """
+        df = SummaryCatalog.query(part_flag=part_flag, read_fail=read_fail, **kwargs)
+        df = df.drop(columns=["FILE_SIZE", "FILE_MTIME"])
+        df.insert(0, "ID", id_start + np.arange(len(df)))
+        return self.set_data(df)
+
     def add_custom_node(self, ids: List[int], new_lot_id: str):
         """
         将多个数据组合为一个自定义的LOT, 比如两个版本的数据对比, 将一部分分为版本A(LOT_A), 另一部分分为版本B(LOT_B)
@@ -133,6 +154,7 @@ class SummaryCore:
             return
         self.summary_df.loc[self.summary_df.ID.isin(ids), "LOT_ID"] = new_lot_id
 
+    @Trace.span()
     def load_select_data(self, ids: List[int], quick: bool = False, sample_num: int = 1E4):
         """
         返回数据
@@ -174,21 +196,47 @@ class SummaryCore:
     #     """
 
 
-class Li(QObject):
+class LiEvent:
+    """
+    代替Qt的Signal, connect/disconnect/emit的用法一样, 不需要PySide2
+    emit时在当前线程中直接调用; 界面中通过 QtLi 转成Qt的Signal, 跨线程时由Qt排队
+    """
+
+    def __init__(self):
+        self.slots = []
+
+    def connect(self, slot: Callable):
+        if slot not in self.slots:
+            self.slots.append(slot)
+
+    def disconnect(self, slot: Callable = None):
+        if slot is None:
+            self.slots.clear()
+        elif slot in self.slots:
+            self.slots.remove(slot)
+
+    def emit(self, *args):
+        for slot in list(self.slots):
+            slot(*args)
+
+
+class Li:
     """
     从Tree中得到的确定是需要的数据.
     进到这里面的数据都是数据帧和控制Group的Summary
+    不依赖Qt, 命令行(stdf_analysis)中也可以用; 界面用 QtLi.of(li) 拿到Qt的Signal
     """
     select_summary: pd.DataFrame = None
     id_module_dict: Dict[int, DataModule] = None
     df_module: DataModule = None
-    # ======================== signal
-    QCalculation = Signal()  # 属于重新计算的模型, 运算比较耗费时间
-    QMessage = Signal(str)  # 用于全局来调用一个MessageBox, 只做提示
-    QStatusMessage = Signal(str)  # 用于全局来调用一个MessageBox, 只做提示
+    # ======================== signal, 见 LiEvent, 在__init__中生成
+    QCalculation: LiEvent = None  # 属于重新计算的模型, 运算比较耗费时间
+    QMessage: LiEvent = None  # (str) 用于全局来调用一个MessageBox, 只做提示
+    QStatusMessage: LiEvent = None  # (str) 用于全局来调用一个MessageBox, 只做提示
 
-    QChartSelect = Signal()  # 用于刷新选取的数据
-    QChartRefresh = Signal()  # 用于重新刷新所有的图
+    QChartSelect: LiEvent = None  # 用于刷新选取的数据
+    QChartRefresh: LiEvent = None  # 用于重新刷新所有的图
+    EVENTS = ("QCalculation", "QMessage", "QStatusMessage", "QChartSelect", "QChartRefresh")
 
     # 用于更新Limit后的数据运算
     # ======================== Temp
@@ -200,9 +248,16 @@ class Li(QObject):
     to_chart_csv_data: ToChartCsv = None
     group_params = None
     da_group_params = None
+    chart_service = None  # ChartDataService, 所有chart共用的数据缓存, 第一个chart创建时生成
+    qt_signal = None  # QtLi, 界面中第一次 QtLi.of(li) 时生成
+
+    # ======================== Merge时测试项的对应方式, 见 DataMerge
+    merge_key: str = DataMerge.TEXT
+    merge_mapping: pd.DataFrame = None
 
     def __init__(self):
-        super(Li, self).__init__()
+        for name in self.EVENTS:
+            setattr(self, name, LiEvent())
 
     @property
     def dt(self):
@@ -232,6 +287,12 @@ class Li(QObject):
         self.select_summary["GROUP"] = "*"
         self.id_module_dict = id_module_dict
 
+    def set_merge(self, key: str, mapping: pd.DataFrame = None):
+        """ Merge的空间在concat前设置 """
+        self.merge_key = key
+        self.merge_mapping = mapping
+
+    @Trace.span()
     def concat(self):
         """
         TODO:
@@ -249,7 +310,7 @@ class Li(QObject):
         data_module_list = []
         for df_id, module in self.id_module_dict.items():
             data_module_list.append(module)
-        self.df_module = ParserData.contact_data_module(data_module_list)
+        self.df_module = ParserData.contact_data_module(data_module_list, self.merge_key, self.merge_mapping)
         self.df_module.prr_df.set_index(["DIE_ID"], inplace=True)
         self.df_module.dtp_df.set_index(["TEST_ID", "DIE_ID"], inplace=True)
         self.df_module.prr_df["DA_GROUP"] = "*"
@@ -277,7 +338,7 @@ class Li(QObject):
         for each in self.capability_key_list:
             self.capability_key_dict[each["TEST_ID"]] = each
 
-    @Time()
+    @Trace.span()
     def background_generation_data_use_to_chart_and_to_save_csv(self):
         """
         将数据叠起来, 用于数据可视化和导出到JMP和Altair
@@ -301,21 +362,32 @@ class Li(QObject):
         temp_result = temp_result[~temp_result.index.duplicated(keep="last")]
         self.to_chart_csv_data.limit = temp_result.unstack(0)
 
-    def set_chart_data(self, chart_df: Union[pd.DataFrame, None]):
+    @staticmethod
+    def split_group(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """
+        按 {group}@{da_group} 拆分数据, 不涉及Qt, 可以在后台线程中运行
+        """
+        group_data = {}
+        for (group, da_group), each_df in df.groupby(["GROUP", "DA_GROUP"]):
+            key = f"{group}@{da_group}"
+            group_data[key] = each_df
+        return group_data
+
+    def set_chart_data(self, chart_df: Union[pd.DataFrame, None],
+                       group_chart_df: Union[Dict[str, pd.DataFrame], None] = None):
         """
         用于pyqtgraph绘图
         :param chart_df:
+        :param group_chart_df: 已经在后台拆分好的数据, 为None时在这里拆分
         :return:
         """
         self.to_chart_csv_data.chart_df = chart_df
         if chart_df is None:
             self.select_chart()
             return
-        group_data = {}
-        for (group, da_group), df in self.to_chart_csv_data.chart_df.groupby(["GROUP", "DA_GROUP"]):
-            key = f"{group}@{da_group}"
-            group_data[key] = df
-        self.to_chart_csv_data.group_chart_df = group_data
+        if group_chart_df is None:
+            group_chart_df = self.split_group(chart_df)
+        self.to_chart_csv_data.group_chart_df = group_chart_df
         self.select_chart()
 
     def set_data_group(self, group_params: Union[list, None], da_group_params: Union[list, None]):
@@ -358,11 +430,7 @@ class Li(QObject):
             data, self.select_summary[["ID", "GROUP"]], on="ID"
         )
 
-        group_data = {}
-        for (group, da_group), df in self.to_chart_csv_data.df.groupby(["GROUP", "DA_GROUP"]):
-            key = f"{group}@{da_group}"
-            group_data[key] = df
-        self.to_chart_csv_data.group_df = group_data
+        self.to_chart_csv_data.group_df = self.split_group(self.to_chart_csv_data.df)
         self.set_chart_data(None)
         self.refresh_chart()
         return True
@@ -498,13 +566,45 @@ class Li(QObject):
         """
         if self.df_module is None:
             return self.QStatusMessage.emit("请先将数据载入到数据空间中!")
-        # TODO:使用多进程后台处理(多进程可以实时修改代码,较为方便)
-        p = Process(target=OpenXl.excel_limit_run, kwargs={
-            'summary_df': self.select_summary,
-            "limit_df": self.df_module.ptmd_df,
-        })
+        from report_core.openxl_utils.utils import OpenXl  # OpenXl 会import到Qt的Print, 命令行中用不到
+        diff = LimitDiff.calculation(self.select_summary, self.df_module.ptmd_df)
+        # 和Excel同样的数据另存一份CSV, 给其他工具用; 文件被占用时只提示, 不影响Excel
+        try:
+            csv_path = LimitDiff.save(diff, os.path.join(GlobalVariable.LIMIT_PATH, "limit_diff.csv"))
+            self.QStatusMessage.emit("Limit差异表已保存: {}".format(csv_path))
+        except OSError as err:
+            self.QStatusMessage.emit("Limit差异表保存失败: {}".format(err))
+        # 只把差异的结果交给Excel进程, 不再传整个ptmd_df
+        p = Process(target=OpenXl.excel_limit_run, kwargs={'diff': diff})
+        p.start()
+
+    def show_lot_compare(self):
+        """
+        LOT之间的AVG/STD/CPK/良率对比
+        :return:
+        """
+        if self.df_module is None:
+            return self.QStatusMessage.emit("请先将数据载入到数据空间中!")
+        from report_core.openxl_utils.utils import OpenXl
+        compare = LotCompare.calculation(self.select_summary, self.df_module)
+        p = Process(target=OpenXl.excel_lot_compare_run, kwargs={'compare': compare})
         p.start()
-        # OpenXl.excel_limit_run(self.select_summary, self.df_module.ptmd_df)
+
+    def save_stdf(self, file_path: str) -> int:
+        """
+        数据空间中的数据(筛选/更新Limit后的)存回STDF, MIR用第一个文件的信息
+        :return: 写入的字节数
+        """
+        if self.df_module is None:
+            self.QStatusMessage.emit("请先将数据载入到数据空间中!")
+            return 0
+        info = self.select_summary.iloc[0].to_dict()
+        mir = Mir(**{
+            key: info[key] for key in ("SETUP_T", "START_T", "LOT_ID", "SBLOT_ID", "PART_TYP", "JOB_NAM", "NODE_NAM",
+                                       "FLOW_ID", "TEST_COD", "TST_TEMP")
+            if key in info and not pd.isna(info[key])
+        })
+        return StdfBulkWrite.write(file_path, self.df_module, mir)
 
     def get_text_by_test_id(self, test_id: int):
         row = self.capability_key_dict[test_id]
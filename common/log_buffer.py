@@ -0,0 +1,65 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+@File    : log_buffer.py
+@Author  : Link
+@Time    : 2023/2/26 16:20
+@Mark    : print 的缓冲, 代替每次write都processEvents的Stream
+    任何线程中 write 只是 deque.append, 界面用定时器取出(drain)后一次写到 text_browser
+    deque 有上限, 满了时丢掉最早的
+"""
+from collections import deque
+from typing import List, Tuple
+
+
+class LogStream:
+    """
+    sys.stdout/sys.stderr 的替代, 只有 write/flush
+    """
+
+    def __init__(self, queue: deque, error: bool = False):
+        self.append = queue.append
+        self.error = error
+
+    def write(self, text: str) -> int:
+        self.append((self.error, text))
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+
+class LogBuffer:
+    MAX_SIZE = 100000  # 最多缓存的write次数
+
+    def __init__(self, max_size: int = MAX_SIZE):
+        self.queue = deque(maxlen=max_size)
+        self.pending = {False: "", True: ""}  # 还没有换行的部分, 等后面的write
+        self.stdout = LogStream(self.queue)
+        self.stderr = LogStream(self.queue, error=True)
+
+    def __len__(self):
+        return len(self.queue)
+
+    def drain(self, max_writes: int = None) -> List[Tuple[bool, str]]:
+        """
+        在界面的线程中调用
+        :param max_writes: 一次最多取出的write次数, 剩下的下次再取
+        :return: [(是否stderr, 一行)], 空行不要; 队列取完时没有换行的部分也一起返回
+        """
+        lines = []
+        count = len(self.queue) if max_writes is None else min(len(self.queue), max_writes)
+        for _ in range(count):
+            error, text = self.queue.popleft()
+            *complete, self.pending[error] = (self.pending[error] + text).split("\n")
+            lines.extend((error, each) for each in complete if each)
+        if not self.queue:
+            for error, text in self.pending.items():
+                if text:
+                    lines.append((error, text))
+                self.pending[error] = ""
+        return lines
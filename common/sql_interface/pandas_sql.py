@@ -7,32 +7,29 @@
 @Time    : 2022/12/23 23:52
 @Mark    : 用来缓存解析的文件记录的
          @BAT: SQL的坏处, 会改动的人很少. 考虑还是使用csv作为SQL存档
+         每个线程每个db只开一个连接(WAL, 语句缓存), 写入用 executemany + 显式事务
 """
 import sqlite3
-from typing import Union
+import threading
+from contextlib import contextmanager
+from typing import Union, Iterable, Sequence, List, Iterator
 
-from common.app_variable import GlobalVariable
+import pandas as pd
 from pandas import DataFrame
-from sqlalchemy import create_engine
 
+from common.app_variable import GlobalVariable
 
-class SqlEngine:
+
+class SqlLite:
     """
-    存数据
+    连接按 (线程, db路径) 缓存, sqlite3的连接不能跨线程使用
+    参数用 :key 的命名占位符
     """
+    _local = threading.local()
+    CACHED_STATEMENTS = 256
 
-    def __init__(self):
-        self.engine = create_engine(
-            "sqlite:///{}?check_same_thread=False".format(GlobalVariable.SQLITE_PATH), echo=True
-        )
-
-    def insert_into_sql_by_table_name(self, df: DataFrame, table_name: str):
-        table_name = table_name.lower()
-        with self.engine.begin() as conn:
-            df.to_sql(table_name, conn, index=False, if_exists='append', chunksize=1000)
-
-
-class SqlLite:
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path
 
     @staticmethod
     def dict_factory(cursor, row):
@@ -43,66 +40,123 @@ class SqlLite:
         return d
 
     @staticmethod
-    def connect():
-        # 建立和数据库sample.db的连接
-        conn = sqlite3.connect(GlobalVariable.SQLITE_PATH)
-        # 使得查询结果以字典形式返回
-        conn.row_factory = SqlLite.dict_factory
-        # 创建游标以用于执行sql
-        cursor = conn.cursor()
-        return conn, cursor
+    def connection(db_path: str = None) -> sqlite3.Connection:
+        """
+        当前线程的连接, 没有就新建
+        isolation_level=None: 不自动开事务, 批量写入用 transaction()
+        """
+        db_path = db_path or GlobalVariable.SQLITE_PATH
+        pool = getattr(SqlLite._local, "pool", None)
+        if pool is None:
+            pool = SqlLite._local.pool = {}
+        conn = pool.get(db_path)
+        if conn is None:
+            conn = sqlite3.connect(
+                db_path, timeout=30, isolation_level=None, cached_statements=SqlLite.CACHED_STATEMENTS
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            pool[db_path] = conn
+        return conn
+
+    @staticmethod
+    def close(db_path: str = None):
+        """ 关闭当前线程的连接, db_path为None时全部关闭 """
+        pool = getattr(SqlLite._local, "pool", None) or {}
+        paths = list(pool) if db_path is None else [db_path]
+        for each in paths:
+            conn = pool.pop(each, None)
+            if conn is not None:
+                conn.close()
+
+    @staticmethod
+    @contextmanager
+    def transaction(db_path: str = None) -> Iterator[sqlite3.Connection]:
+        """
+        with SqlLite.transaction() as conn: ...
+        出错时回滚, 已经在事务中时直接用外层的事务
+        """
+        conn = SqlLite.connection(db_path)
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    @staticmethod
+    def execute_many(sql: str, rows: Iterable[Sequence], db_path: str = None) -> int:
+        """
+        一个事务中 executemany, rows可以是生成器
+        :return: 影响的行数
+        """
+        with SqlLite.transaction(db_path) as conn:
+            return conn.executemany(sql, rows).rowcount
+
+    @staticmethod
+    def insert_sql(table: str, columns: Sequence[str], upsert: bool = False,
+                   conflict: Sequence[str] = None) -> str:
+        """
+        :param table:
+        :param columns:
+        :param upsert: 冲突时更新, 没有conflict时是 INSERT OR REPLACE
+        :param conflict: 唯一约束的列, 冲突时更新其他列
+        """
+        head, marks = ",".join('"{}"'.format(each) for each in columns), ",".join("?" * len(columns))
+        if upsert and conflict:
+            updates = ",".join('"{0}"=excluded."{0}"'.format(each) for each in columns if each not in conflict)
+            action = "DO UPDATE SET {}".format(updates) if updates else "DO NOTHING"
+            return "INSERT INTO {} ({}) VALUES ({}) ON CONFLICT ({}) {}".format(
+                table, head, marks, ",".join('"{}"'.format(each) for each in conflict), action
+            )
+        return "INSERT {}INTO {} ({}) VALUES ({})".format("OR REPLACE " if upsert else "", table, head, marks)
+
+    @staticmethod
+    def insert_many(table: str, columns: Sequence[str], rows: Iterable[Sequence], upsert: bool = False,
+                    conflict: Sequence[str] = None, db_path: str = None) -> int:
+        return SqlLite.execute_many(SqlLite.insert_sql(table, columns, upsert, conflict), rows, db_path)
 
     def exe_sql(self, sql, **kwargs) -> bool:
-        conn, cursor = self.connect()
         try:
-            # 可以执行多条语句
-            # cursor.executescript(sql, **kwargs)
             # 只能执行一条语句
-            cursor.execute(sql, **kwargs)
-        except Exception as e:
+            SqlLite.connection(self.db_path).execute(sql, kwargs)
+        except sqlite3.Error as e:
             print('execute sql exception: ', e)
             return False
-        finally:
-            cursor.close()
-            conn.close()
         return True
 
-    def get_all(self, sql, **kwargs):
-        conn, cursor = self.connect()
+    def get_all(self, sql, **kwargs) -> Union[List[dict], None]:
         try:
-            cursor.execute(sql, **kwargs)
-            datasets = cursor.fetchall()
-            return datasets
-        except Exception as e:
+            cursor = SqlLite.connection(self.db_path).execute(sql, kwargs)
+            cursor.row_factory = SqlLite.dict_factory
+            return cursor.fetchall()
+        except sqlite3.Error as e:
             print('get all exception: ', e)
-        finally:
-            cursor.close()
-            conn.close()
 
     def select(self, table: str, end=None, *select, **where):
         sql = "select %s from %s where %s "
         if end:
             sql += end
         selects = ','.join(select)
-        wheres = ' and '.join(["%s=%%(%s)s" % (key, key) for key in where])
+        wheres = ' and '.join(["%s=:%s" % (key, key) for key in where])
         return self.get_all(sql % (selects, table, wheres), **where)
 
-    def get_one(self, sql, **kwargs):
+    def get_one(self, sql, **kwargs) -> Union[dict, None]:
         """
 
         :param sql:
         :return:
         """
-        conn, cursor = self.connect()
         try:
-            cursor.execute(sql, **kwargs)
-            res = cursor.fetchone()
-            return res
-        except Exception as e:
+            cursor = SqlLite.connection(self.db_path).execute(sql, kwargs)
+            cursor.row_factory = SqlLite.dict_factory
+            return cursor.fetchone()
+        except sqlite3.Error as e:
             print('get one exception: ', e)
-        finally:
-            cursor.close()
-            conn.close()
 
     def select_one_or_none(self, table: str, end=None, *select, **where) -> Union[dict, None]:
         """
@@ -112,7 +166,7 @@ class SqlLite:
         if end:
             sql += end
         selects = ','.join(select)
-        wheres = ' and '.join(["%s=%%(%s)s" % (key, key) for key in where])
+        wheres = ' and '.join(["%s=:%s" % (key, key) for key in where])
         result = self.get_one(sql % (selects, table, wheres), **where)
         return result
 
@@ -122,6 +176,43 @@ class SqlLite:
         所以以id为where比较好用 id是唯一不可改变的
         """
         sql = "update %s set %s where %s"
-        update_cols = ','.join(["%s=%%(%s)s" % (key, key) for key in kwargs])
-        wheres = ' and '.join(["%s=%%(%s)s" % (key, key) for key in where])
+        update_cols = ','.join(["%s=:%s" % (key, key) for key in kwargs])
+        wheres = ' and '.join(["%s=:%s" % (key, key) for key in where])
         return self.exe_sql(sql % (table, update_cols, wheres), **{**kwargs, **where})
+
+
+class SqlEngine:
+    """
+    存数据, DataFrame 整表批量写入
+    """
+    SQL_TYPES = {"i": "INTEGER", "u": "INTEGER", "b": "INTEGER", "f": "REAL"}
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or GlobalVariable.SQLITE_PATH
+
+    @staticmethod
+    def create_sql(df: DataFrame, table_name: str) -> str:
+        columns = ",".join(
+            '"{}" {}'.format(name, SqlEngine.SQL_TYPES.get(dtype.kind, "TEXT"))
+            for name, dtype in df.dtypes.items()
+        )
+        return "CREATE TABLE IF NOT EXISTS {} ({})".format(table_name, columns)
+
+    @staticmethod
+    def to_rows(df: DataFrame) -> Iterator[tuple]:
+        """ numpy的数值转成python的, NAN -> NULL """
+        df = df.astype(object).where(pd.notna(df), None)
+        return df.itertuples(index=False, name=None)
+
+    def insert_into_sql_by_table_name(self, df: DataFrame, table_name: str, upsert: bool = False,
+                                      conflict: Sequence[str] = None) -> int:
+        """
+        表不存在时按df的类型建表, 一个事务写入全部数据
+        :return: 写入的行数
+        """
+        table_name = table_name.lower()
+        columns = [str(each) for each in df.columns]
+        with SqlLite.transaction(self.db_path) as conn:
+            conn.execute(self.create_sql(df, table_name))
+            conn.executemany(SqlLite.insert_sql(table_name, columns, upsert, conflict), self.to_rows(df))
+        return len(df)
@@ -0,0 +1,183 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+@File    : summary_catalog.py
+@Author  : Link
+@Time    : 2023/2/20 20:30
+@Mark    : 解析过的HDF5缓存文件的目录, 存在 GlobalVariable.SQLITE_PATH
+    file_catalog: 每个HDF5一行, MIR/WIR信息和文件指纹(大小, 修改时间)
+    file_yield: 每个HDF5每种 PART_FLAG/READ_FAIL 的数量和PASS数量
+    指纹一致时直接用目录中的数据, 不再读STDF的头和PRR; 打开历史数据是一次SQL查询
+"""
+import os
+import sqlite3
+from typing import Union, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from common.app_variable import GlobalVariable, PartFlags, ReadFail
+from common.sql_interface.pandas_sql import SqlLite
+from parser_core.stdf_parser_file_write_read import ParserData
+
+
+class SummaryCatalog:
+    INFO_COLUMNS = [
+        "FILE_PATH", "FILE_NAME", "LOT_ID", "SBLOT_ID", "WAFER_ID", "BLUE_FILM_ID", "TEST_COD", "FLOW_ID",
+        "PART_TYP", "JOB_NAM", "TST_TEMP", "NODE_NAM", "SETUP_T", "START_T", "SITE_CNT",
+    ]
+    INDEX_COLUMNS = ["LOT_ID", "SBLOT_ID", "WAFER_ID", "PART_TYP", "JOB_NAM", "FLOW_ID", "START_T"]
+    INTEGER_COLUMNS = {"SETUP_T", "START_T", "SITE_CNT"}
+
+    @staticmethod
+    def connect(db_path: str = None) -> sqlite3.Connection:
+        """ SqlLite中当前线程的连接, 不要close """
+        db_path = db_path or GlobalVariable.SQLITE_PATH
+        folder = os.path.dirname(db_path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        conn = SqlLite.connection(db_path)
+        SummaryCatalog.create_table(conn)
+        return conn
+
+    @staticmethod
+    def create_table(conn: sqlite3.Connection):
+        columns = ",\n".join(
+            "{} {}".format(each, "INTEGER" if each in SummaryCatalog.INTEGER_COLUMNS else "TEXT")
+            for each in SummaryCatalog.INFO_COLUMNS
+        )
+        indexes = "\n".join(
+            "CREATE INDEX IF NOT EXISTS idx_file_catalog_{0} ON file_catalog ({0});".format(each.lower())
+            for each in SummaryCatalog.INDEX_COLUMNS
+        )
+        conn.executescript("""
+        CREATE TABLE IF NOT EXISTS file_catalog (
+            HDF5_PATH TEXT PRIMARY KEY,
+            {columns},
+            FILE_SIZE INTEGER,
+            FILE_MTIME INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS file_yield (
+            HDF5_PATH TEXT NOT NULL,
+            PART_FLAG INTEGER NOT NULL,
+            READ_FAIL INTEGER NOT NULL,
+            QTY INTEGER,
+            PASS INTEGER,
+            PRIMARY KEY (HDF5_PATH, PART_FLAG, READ_FAIL)
+        );
+        {indexes}
+        """.format(columns=columns, indexes=indexes))
+
+    @staticmethod
+    def fingerprint(hdf5_path: str) -> Tuple[int, int]:
+        """ 文件大小, 修改时间(ns) """
+        stat = os.stat(hdf5_path)
+        return stat.st_size, stat.st_mtime_ns
+
+    @staticmethod
+    def yield_rows(hdf5_path: str, prr_df: pd.DataFrame) -> List[tuple]:
+        """ 所有 PART_FLAG/READ_FAIL 的数量 """
+        rows = []
+        for part_flag in range(len(PartFlags.PART_FLAGS)):
+            for read_fail in (ReadFail.Y, ReadFail.N):
+                data = ParserData.get_yield(prr_df, part_flag, read_fail)
+                rows.append((hdf5_path, part_flag, read_fail, int(data["QTY"]), int(data["PASS"])))
+        return rows
+
+    @staticmethod
+    def register(info: dict, prr_df: pd.DataFrame, db_path: str = None):
+        """
+        新增或更新一个HDF5的记录
+        :param info: SemiStdfUtils.get_lot_info_by_semi_ate 的结果, 需要有HDF5_PATH
+        :param prr_df: 这个HDF5的 prr_df
+        :param db_path:
+        """
+        hdf5_path = info["HDF5_PATH"]
+        size, mtime = SummaryCatalog.fingerprint(hdf5_path)
+        head = ["HDF5_PATH"] + SummaryCatalog.INFO_COLUMNS + ["FILE_SIZE", "FILE_MTIME"]
+        values = [hdf5_path] + [info.get(each) for each in SummaryCatalog.INFO_COLUMNS] + [size, mtime]
+        yield_rows = SummaryCatalog.yield_rows(hdf5_path, prr_df)
+        SummaryCatalog.connect(db_path)
+        with SqlLite.transaction(db_path) as conn:
+            conn.execute(SqlLite.insert_sql("file_catalog", head, upsert=True), values)
+            conn.execute("DELETE FROM file_yield WHERE HDF5_PATH = ?", (hdf5_path,))
+            conn.executemany("INSERT INTO file_yield VALUES (?, ?, ?, ?, ?)", yield_rows)
+
+    @staticmethod
+    def to_summary(df: pd.DataFrame) -> pd.DataFrame:
+        """ QTY/PASS -> YIELD, 和 ParserData.get_yield_data 的格式一样 """
+        qty = df["QTY"].to_numpy(dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            value = np.round(df["PASS"].to_numpy(dtype=np.float64) / qty * 100, 2)
+        df["YIELD"] = ["{}%".format(each) for each in np.where(qty == 0, 0.0, value).tolist()]
+        return df
+
+    @staticmethod
+    def lookup(hdf5_path: str, part_flag: int, read_fail: int, db_path: str = None) -> Union[dict, None]:
+        """
+        指纹和现在的HDF5一样才返回
+        :return: 和 RunStdfAnalysis 中的 by_analysis_data_dict 一样, 没有ID
+        """
+        if not os.path.exists(hdf5_path):
+            return None
+        df = SummaryCatalog.query(db_path=db_path, part_flag=part_flag, read_fail=read_fail, HDF5_PATH=hdf5_path)
+        if df.empty:
+            return None
+        row = df.iloc[0].to_dict()
+        if (row.pop("FILE_SIZE"), row.pop("FILE_MTIME")) != SummaryCatalog.fingerprint(hdf5_path):
+            return None
+        return row
+
+    @staticmethod
+    def query(start_t: int = None, finish_t: int = None, part_flag: int = PartFlags.ALL,
+              read_fail: int = ReadFail.Y, limit: int = None, db_path: str = None, **where) -> pd.DataFrame:
+        """
+        :param start_t: START_T >= start_t
+        :param finish_t: START_T < finish_t
+        :param part_flag:
+        :param read_fail:
+        :param limit:
+        :param db_path:
+        :param where: 列名=值, 值是list时是IN
+        :return: [HDF5_PATH, *INFO_COLUMNS, FILE_SIZE, FILE_MTIME, QTY, PASS, YIELD, PART_FLAG, READ_FAIL]
+            按 START_T 排序
+        """
+        conditions, params = ["y.PART_FLAG = ?", "y.READ_FAIL = ?"], [part_flag, read_fail]
+        for key, value in where.items():
+            if key not in SummaryCatalog.INFO_COLUMNS and key != "HDF5_PATH":
+                raise KeyError(key)
+            if isinstance(value, (list, tuple, set)):
+                conditions.append("c.{} IN ({})".format(key, ",".join("?" * len(value))))
+                params.extend(value)
+            else:
+                conditions.append("c.{} = ?".format(key))
+                params.append(value)
+        if start_t is not None:
+            conditions.append("c.START_T >= ?")
+            params.append(start_t)
+        if finish_t is not None:
+            conditions.append("c.START_T < ?")
+            params.append(finish_t)
+        sql = """
+        SELECT c.*, y.QTY, y.PASS, y.PART_FLAG, y.READ_FAIL FROM file_catalog c
+        JOIN file_yield y ON y.HDF5_PATH = c.HDF5_PATH
+        WHERE {} ORDER BY c.START_T
+        """.format(" AND ".join(conditions))
+        if limit:
+            sql += " LIMIT {}".format(int(limit))
+        df = pd.read_sql_query(sql, SummaryCatalog.connect(db_path), params=params)
+        return SummaryCatalog.to_summary(df)
+
+    @staticmethod
+    def prune(db_path: str = None) -> int:
+        """
+        删掉HDF5已经不存在的记录
+        :return: 删除的数量
+        """
+        paths = [each[0] for each in SummaryCatalog.connect(db_path).execute("SELECT HDF5_PATH FROM file_catalog")]
+        with SqlLite.transaction(db_path) as conn:
+            missing = [(each,) for each in paths if not os.path.exists(each)]
+            conn.executemany("DELETE FROM file_catalog WHERE HDF5_PATH = ?", missing)
+            conn.executemany("DELETE FROM file_yield WHERE HDF5_PATH = ?", missing)
+        return len(missing)
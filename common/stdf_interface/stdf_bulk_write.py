@@ -0,0 +1,339 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+@File    : stdf_bulk_write.py
+@Author  : Link
+@Time    : 2023/2/22 09:40
+@Mark    : 用 DataModule 批量写STDF V4(小端), 筛选过或是改过Limit的数据可以直接存回STDF
+    每条记录 = 定长部分 + 变长部分
+        定长部分: 每种记录一个numpy结构体数组, 整列赋值
+        变长部分: PTR/FTR的字符串每个测试项只编码一次(第一条PTR带Limit等完整信息), PRR的PART_ID/PART_TXT一起编码
+    所有记录按 (DIE, 顺序) 排好后, 用一次花式索引从字节池中拼出整个文件, 分块写入
+    StdfSystem 是逐条写的, 适合少量记录
+"""
+import struct
+from typing import Iterable, Tuple, List
+
+import numpy as np
+import pandas as pd
+
+from common.app_variable import DataModule, DatatType, FailFlag
+from common.stdf_interface.stdf_def_interface import Mir, Wir, Mrr
+from common.trace import Trace
+from parser_core.stdf_parser_func import DtpTestFlag, PtmdOptFlag
+
+
+class StdfBulkWrite:
+    ENCODING = "latin-1"
+    CHUNK_RECORDS = 1 << 19
+    # OPT_FLAG bit 2/3: 没有 LO_SPEC/HI_SPEC
+    NO_LOW_SPEC = 0b1 << 2
+    NO_HIGH_SPEC = 0b1 << 3
+    PRR_PART_FAILED = 0b1 << 3
+    # MIR中 LOT_ID 到 FLOW_ID 的字符串字段, Mir中没有的写空
+    MIR_STRINGS = (
+        "LOT_ID", "PART_TYP", "NODE_NAM", "TSTR_TYP", "JOB_NAM", "JOB_REV", "SBLOT_ID", "OPER_NAM", "EXEC_TYP",
+        "EXEC_VER", "TEST_COD", "TST_TEMP", "USER_TXT", "AUX_FILE", "PKG_TYP", "FAMLY_ID", "DATE_COD", "FACIL_ID",
+        "FLOOR_ID", "PROC_ID", "OPER_FRQ", "SPEC_NAM", "SPEC_VER", "FLOW_ID",
+    )
+
+    HEAD = [("REC_LEN", "<u2"), ("REC_TYP", "u1"), ("REC_SUB", "u1")]
+    PIR_DTYPE = np.dtype(HEAD + [("HEAD_NUM", "u1"), ("SITE_NUM", "u1")])
+    PTR_DTYPE = np.dtype(HEAD + [
+        ("TEST_NUM", "<u4"), ("HEAD_NUM", "u1"), ("SITE_NUM", "u1"), ("TEST_FLG", "u1"), ("PARM_FLG", "u1"),
+        ("RESULT", "<f4"),
+    ])
+    FTR_DTYPE = np.dtype(HEAD + [("TEST_NUM", "<u4"), ("HEAD_NUM", "u1"), ("SITE_NUM", "u1"), ("TEST_FLG", "u1")])
+    PRR_DTYPE = np.dtype(HEAD + [
+        ("HEAD_NUM", "u1"), ("SITE_NUM", "u1"), ("PART_FLG", "u1"), ("NUM_TEST", "<u2"), ("HARD_BIN", "<u2"),
+        ("SOFT_BIN", "<u2"), ("X_COORD", "<i2"), ("Y_COORD", "<i2"), ("TEST_T", "<u4"),
+    ])
+    # FTR 第一个可选字段开始, 到 TEST_TXT 之前全部无效/为空
+    FTR_OPTION = struct.pack("<BIIIIiihHHH", 0xFF, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0) + b"\x00\x00\x00"
+
+    @staticmethod
+    def cn(text) -> bytes:
+        """ C*n: 长度字节 + 内容, 超过255截断 """
+        if text is None or (isinstance(text, float) and np.isnan(text)):
+            return b"\x00"
+        data = str(text).encode(StdfBulkWrite.ENCODING, errors="replace")[:255]
+        return bytes((len(data),)) + data
+
+    @staticmethod
+    def record(rec_typ: int, rec_sub: int, body: bytes) -> bytes:
+        return struct.pack("<HBB", len(body), rec_typ, rec_sub) + body
+
+    @staticmethod
+    def far() -> bytes:
+        # CPU_TYPE 2: 小端, STDF_VER 4
+        return StdfBulkWrite.record(0, 10, struct.pack("<BB", 2, 4))
+
+    @staticmethod
+    def atr(cmd_line: str = "SAVE AS WITH PYTHON STDF CONVERT", mod_tim: int = 0) -> bytes:
+        return StdfBulkWrite.record(0, 20, struct.pack("<I", mod_tim) + StdfBulkWrite.cn(cmd_line))
+
+    @staticmethod
+    def mir(mir: Mir) -> bytes:
+        cn = StdfBulkWrite.cn
+        body = struct.pack("<IIB", int(mir.SETUP_T), int(mir.START_T), int(mir.STAT_NUM))
+        # MODE_COD, RTST_COD, PROT_COD, BURN_TIM, CMOD_COD
+        body += (str(mir.MODE_COD) or " ")[:1].encode(StdfBulkWrite.ENCODING) + b"  " + struct.pack("<H", 0xFFFF)
+        body += b" "
+        for each in StdfBulkWrite.MIR_STRINGS:
+            body += cn(getattr(mir, each, ""))
+        return StdfBulkWrite.record(1, 10, body)
+
+    @staticmethod
+    def wir(wir: Wir) -> bytes:
+        body = struct.pack("<BBI", int(wir.HEAD_NUM), int(wir.SITE_GRP), int(wir.START_T)) + \
+            StdfBulkWrite.cn(wir.WAFER_ID)
+        return StdfBulkWrite.record(2, 10, body)
+
+    @staticmethod
+    def wrr(wir: Wir, finish_t: int, part_cnt: int) -> bytes:
+        body = struct.pack("<BBII", int(wir.HEAD_NUM), int(wir.SITE_GRP), int(finish_t), part_cnt) + \
+            struct.pack("<IIII", 0xFFFFFFFF, 0xFFFFFFFF, 0xFFFFFFFF, 0xFFFFFFFF) + StdfBulkWrite.cn(wir.WAFER_ID)
+        return StdfBulkWrite.record(2, 20, body)
+
+    @staticmethod
+    def mrr(mrr: Mrr) -> bytes:
+        return StdfBulkWrite.record(1, 20, struct.pack("<I", int(mrr.FINISH_T)))
+
+    @staticmethod
+    def bin_records(prr_df: pd.DataFrame, bin_df: pd.DataFrame = None) -> bytes:
+        """ HBR/SBR, 汇总(HEAD_NUM 255)的数量; bin_df有名字和PF时带上 """
+        data = b""
+        names = {}
+        if bin_df is not None and len(bin_df):
+            for row in bin_df.itertuples(index=False):
+                names[(str(row.BIN_TYPE).upper()[:1], int(row.BIN_NUM))] = (str(row.BIN_PF)[:1] or " ", row.BIN_NAM)
+        for rec_sub, bin_type, column in ((40, "H", "HARD_BIN"), (50, "S", "SOFT_BIN")):
+            count = prr_df[column].value_counts().sort_index()
+            for bin_num, qty in count.items():
+                pf, name = names.get((bin_type, int(bin_num)), (" ", ""))
+                body = struct.pack("<BBHI", 255, 0, int(bin_num), int(qty)) + \
+                    pf.encode(StdfBulkWrite.ENCODING) + StdfBulkWrite.cn(name)
+                data += StdfBulkWrite.record(1, rec_sub, body)
+        return data
+
+    @staticmethod
+    def site_number(values: pd.Series) -> np.ndarray:
+        """ load_hdf5_analysis 后SITE_NUM是 S001 这种文本 """
+        if not pd.api.types.is_numeric_dtype(values):
+            values = values.astype(str).str.lstrip("S")
+        return pd.to_numeric(values, errors="coerce").fillna(0).to_numpy().astype(np.uint8)
+
+    @staticmethod
+    def frame(df: pd.DataFrame) -> pd.DataFrame:
+        """ Li.concat 后 DIE_ID/TEST_ID 在index中 """
+        names = [each for each in df.index.names if each is not None]
+        return df.reset_index(names) if names else df
+
+    @staticmethod
+    def limit_value(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        """ :return: 写入的值(NAN -> 0), 是否缺失 """
+        values = values.to_numpy(dtype=np.float64)
+        missing = np.isnan(values)
+        return np.where(missing, 0, values), missing
+
+    @staticmethod
+    def ptr_suffix(ptmd_df: pd.DataFrame) -> Tuple[List[bytes], List[bytes]]:
+        """
+        :return: 每个测试项 (第一条PTR的变长部分, 之后的PTR/FTR的变长部分)
+        """
+        cn = StdfBulkWrite.cn
+        lo, no_lo = StdfBulkWrite.limit_value(ptmd_df["LO_LIMIT"])
+        hi, no_hi = StdfBulkWrite.limit_value(ptmd_df["HI_LIMIT"])
+        lo_spec, no_lo_spec = StdfBulkWrite.limit_value(ptmd_df.get("LO_SPEC", pd.Series(np.nan, ptmd_df.index)))
+        hi_spec, no_hi_spec = StdfBulkWrite.limit_value(ptmd_df.get("HI_SPEC", pd.Series(np.nan, ptmd_df.index)))
+        opt_flag = ptmd_df.get("OPT_FLAG", pd.Series(0, ptmd_df.index)).fillna(0).to_numpy().astype(np.int64)
+        opt_flag = opt_flag | np.where(no_lo, PtmdOptFlag.NoLowLimit, 0) | np.where(no_hi, PtmdOptFlag.NoHighLimit, 0)
+        opt_flag = opt_flag | np.where(no_lo_spec, StdfBulkWrite.NO_LOW_SPEC, 0) | \
+            np.where(no_hi_spec, StdfBulkWrite.NO_HIGH_SPEC, 0)
+        scale = ptmd_df.reindex(columns=["RES_SCAL", "LLM_SCAL", "HLM_SCAL"]).fillna(0).to_numpy().astype(np.int64)
+        first, other = [], []
+        for i, row in enumerate(ptmd_df.reindex(
+                columns=["DATAT_TYPE", "TEST_TXT", "UNITS", "C_RESFMT", "C_LLMFMT", "C_HLMFMT"]
+        ).itertuples(index=False, name=None)):
+            data_type, test_txt, units, c_resfmt, c_llmfmt, c_hlmfmt = row
+            if data_type == DatatType.FTR:
+                suffix = StdfBulkWrite.FTR_OPTION + cn(test_txt) + b"\x00"
+                first.append(suffix)
+                other.append(suffix)
+                continue
+            suffix = cn(test_txt) + b"\x00"
+            other.append(suffix)
+            first.append(
+                suffix + struct.pack("<Bbbbff", opt_flag[i] & 0xFF, *scale[i], lo[i], hi[i]) +
+                cn(units) + cn(c_resfmt) + cn(c_llmfmt) + cn(c_hlmfmt) + struct.pack("<ff", lo_spec[i], hi_spec[i])
+            )
+        return first, other
+
+    @staticmethod
+    def gather(pool: np.ndarray, starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        """ 按顺序取出 pool[starts[i]: starts[i] + lengths[i]] 接在一起 """
+        offsets = np.cumsum(lengths) - lengths
+        index = np.repeat(starts - offsets, lengths) + np.arange(int(lengths.sum()), dtype=np.int64)
+        return pool[index]
+
+    @staticmethod
+    def part_records(prr_df: pd.DataFrame, dtp_df: pd.DataFrame, ptmd_df: pd.DataFrame) -> Iterable[bytes]:
+        """
+        PIR, (PTR|FTR)..., PRR, 按prr_df的顺序, 每块最多 CHUNK_RECORDS 条记录
+        """
+        key = "DIE_ID" if "DIE_ID" in prr_df and "DIE_ID" in dtp_df else "PART_ID"
+        part_index = pd.Index(prr_df[key].to_numpy())
+        if not part_index.is_unique:
+            raise ValueError("{}重复, 不能写入STDF".format(key))
+        ptmd_df = ptmd_df.drop_duplicates("TEST_ID", keep="last").reset_index(drop=True)
+        test_index = pd.Index(ptmd_df["TEST_ID"].to_numpy())
+
+        # ============================ 测试数据
+        part = part_index.get_indexer(dtp_df[key].to_numpy())
+        test = test_index.get_indexer(dtp_df["TEST_ID"].to_numpy())
+        keep = (part >= 0) & (test >= 0)
+        dtp_df, part, test = dtp_df[keep], part[keep], test[keep]
+        # 每颗DIE中按ptmd的顺序(测试流程)
+        order = np.lexsort((test, part))
+        dtp_df, part, test = dtp_df.iloc[order], part[order], test[order]
+        n_data = len(dtp_df)
+
+        head_num = prr_df["HEAD_NUM"].to_numpy().astype(np.uint8) if "HEAD_NUM" in prr_df else \
+            np.ones(len(prr_df), dtype=np.uint8)
+        site_num = StdfBulkWrite.site_number(prr_df["SITE_NUM"])
+        test_flg = dtp_df["TEST_FLG"].to_numpy().astype(np.int64)
+        if "FAIL_FLG" in dtp_df:
+            # 重新卡过Limit的结果以FAIL_FLG为准
+            failed = dtp_df["FAIL_FLG"].to_numpy() == FailFlag.FAIL
+            test_flg = np.where(failed, test_flg | DtpTestFlag.TestFailed, test_flg & ~DtpTestFlag.TestFailed)
+        test_flg = test_flg.astype(np.uint8)
+        test_num = ptmd_df["TEST_NUM"].to_numpy().astype(np.uint32)[test]
+        is_ftr = (ptmd_df["DATAT_TYPE"].to_numpy() == DatatType.FTR)[test]
+        first = np.zeros(n_data, dtype=bool)
+        first[np.unique(test, return_index=True)[1]] = True
+
+        first_suffix, other_suffix = StdfBulkWrite.ptr_suffix(ptmd_df)
+        suffix_pool = [b"".join(first_suffix), b"".join(other_suffix)]
+        first_len = np.array([len(each) for each in first_suffix], dtype=np.int64)
+        other_len = np.array([len(each) for each in other_suffix], dtype=np.int64)
+        first_start = np.cumsum(first_len) - first_len
+        other_start = np.cumsum(other_len) - other_len + len(suffix_pool[0])
+        data_suffix_start = np.where(first, first_start[test], other_start[test])
+        data_suffix_len = np.where(first, first_len[test], other_len[test])
+
+        ptr_rows = np.flatnonzero(~is_ftr)
+        ptr = np.zeros(len(ptr_rows), dtype=StdfBulkWrite.PTR_DTYPE)
+        ptr["REC_LEN"] = StdfBulkWrite.PTR_DTYPE.itemsize - 4 + data_suffix_len[ptr_rows]
+        ptr["REC_TYP"], ptr["REC_SUB"] = 15, 10
+        ptr["TEST_NUM"] = test_num[ptr_rows]
+        ptr["HEAD_NUM"] = head_num[part[ptr_rows]]
+        ptr["SITE_NUM"] = site_num[part[ptr_rows]]
+        ptr["TEST_FLG"] = test_flg[ptr_rows]
+        ptr["PARM_FLG"] = dtp_df["PARM_FLG"].to_numpy()[ptr_rows] if "PARM_FLG" in dtp_df else 0
+        ptr["RESULT"] = dtp_df["RESULT"].to_numpy(dtype=np.float32)[ptr_rows]
+
+        ftr_rows = np.flatnonzero(is_ftr)
+        ftr = np.zeros(len(ftr_rows), dtype=StdfBulkWrite.FTR_DTYPE)
+        ftr["REC_LEN"] = StdfBulkWrite.FTR_DTYPE.itemsize - 4 + data_suffix_len[ftr_rows]
+        ftr["REC_TYP"], ftr["REC_SUB"] = 15, 20
+        ftr["TEST_NUM"] = test_num[ftr_rows]
+        ftr["HEAD_NUM"] = head_num[part[ftr_rows]]
+        ftr["SITE_NUM"] = site_num[part[ftr_rows]]
+        ftr["TEST_FLG"] = test_flg[ftr_rows]
+
+        # ============================ PIR/PRR
+        n_part = len(prr_df)
+        pir = np.zeros(n_part, dtype=StdfBulkWrite.PIR_DTYPE)
+        pir["REC_LEN"], pir["REC_TYP"], pir["REC_SUB"] = 2, 5, 10
+        pir["HEAD_NUM"], pir["SITE_NUM"] = head_num, site_num
+
+        cn = StdfBulkWrite.cn
+        part_txt = prr_df["PART_TXT"] if "PART_TXT" in prr_df else pd.Series("", prr_df.index)
+        prr_suffix = [
+            cn(part_id) + cn(txt) + b"\x00" for part_id, txt in zip(prr_df["PART_ID"].tolist(), part_txt.tolist())
+        ]
+        prr_len = np.array([len(each) for each in prr_suffix], dtype=np.int64)
+        prr = np.zeros(n_part, dtype=StdfBulkWrite.PRR_DTYPE)
+        prr["REC_LEN"] = StdfBulkWrite.PRR_DTYPE.itemsize - 4 + prr_len
+        prr["REC_TYP"], prr["REC_SUB"] = 5, 20
+        prr["HEAD_NUM"], prr["SITE_NUM"] = head_num, site_num
+        part_flg = prr_df["PART_FLG"].to_numpy().astype(np.int64) if "PART_FLG" in prr_df else \
+            np.zeros(n_part, dtype=np.int64)
+        if "FAIL_FLAG" in prr_df:
+            failed = prr_df["FAIL_FLAG"].to_numpy() == FailFlag.FAIL
+            part_flg = np.where(failed, part_flg | StdfBulkWrite.PRR_PART_FAILED,
+                                part_flg & ~StdfBulkWrite.PRR_PART_FAILED)
+        prr["PART_FLG"] = part_flg
+        prr["NUM_TEST"] = np.minimum(np.bincount(part, minlength=n_part), 0xFFFF)
+        for column in ("HARD_BIN", "SOFT_BIN", "X_COORD", "Y_COORD", "TEST_T"):
+            invalid = -32768 if column in ("X_COORD", "Y_COORD") else 0  # 坐标的0是有效的die, 用STDF的无效值
+            if column in prr_df:
+                prr[column] = prr_df[column].fillna(invalid).to_numpy()
+            else:
+                prr[column] = invalid
+
+        # ============================ 字节池
+        blocks = [pir, ptr, ftr, prr]
+        pool = np.frombuffer(b"".join([each.tobytes() for each in blocks] + suffix_pool + prr_suffix), dtype=np.uint8)
+        base = np.cumsum([0] + [each.nbytes for each in blocks])
+        prr_suffix_start = base[-1] + len(suffix_pool[0]) + len(suffix_pool[1]) + np.cumsum(prr_len) - prr_len
+
+        def fixed_start(block: int, rows: np.ndarray) -> np.ndarray:
+            return base[block] + np.arange(len(rows), dtype=np.int64) * blocks[block].dtype.itemsize
+
+        # (DIE, 顺序) 排序: PIR 是 0, 测试数据从1开始, PRR 最后
+        data_seq = np.arange(n_data, dtype=np.int64) + 1
+        part_seq = np.arange(n_part, dtype=np.int64)
+        sort_part = np.concatenate([part_seq, part[ptr_rows], part[ftr_rows], part_seq])
+        sort_seq = np.concatenate([
+            np.zeros(n_part, dtype=np.int64), data_seq[ptr_rows], data_seq[ftr_rows],
+            np.full(n_part, n_data + 1, dtype=np.int64),
+        ])
+        fixed_starts = np.concatenate([
+            fixed_start(0, part_seq), fixed_start(1, ptr_rows), fixed_start(2, ftr_rows), fixed_start(3, part_seq)
+        ])
+        fixed_lens = np.concatenate([np.full(len(each), each.dtype.itemsize, dtype=np.int64) for each in blocks])
+        suffix_starts = np.concatenate([
+            np.zeros(n_part, dtype=np.int64),
+            base[-1] + data_suffix_start[ptr_rows], base[-1] + data_suffix_start[ftr_rows], prr_suffix_start,
+        ])
+        suffix_lens = np.concatenate([
+            np.zeros(n_part, dtype=np.int64), data_suffix_len[ptr_rows], data_suffix_len[ftr_rows], prr_len,
+        ])
+        order = np.lexsort((sort_seq, sort_part))
+        for start in range(0, len(order), StdfBulkWrite.CHUNK_RECORDS):
+            rows = order[start:start + StdfBulkWrite.CHUNK_RECORDS]
+            starts = np.column_stack([fixed_starts[rows], suffix_starts[rows]]).ravel()
+            lengths = np.column_stack([fixed_lens[rows], suffix_lens[rows]]).ravel()
+            yield StdfBulkWrite.gather(pool, starts, lengths).tobytes()
+
+    @staticmethod
+    @Trace.span()
+    def write(file_path: str, df_module: DataModule, mir: Mir = None, wir: Wir = None, mrr: Mrr = None) -> int:
+        """
+        :param file_path:
+        :param df_module: prr_df/dtp_df/ptmd_df, bin_df可以没有
+        :param mir: 没有时用默认的Mir
+        :param wir: 有的时候写 WIR/WRR
+        :param mrr:
+        :return: 写入的字节数
+        """
+        prr_df = StdfBulkWrite.frame(df_module.prr_df)
+        dtp_df = StdfBulkWrite.frame(df_module.dtp_df)
+        ptmd_df = StdfBulkWrite.frame(df_module.ptmd_df)
+        mir = mir or Mir()
+        mrr = mrr or Mrr(FINISH_T=mir.START_T)
+        size = 0
+        with open(file_path, "wb") as f:
+            for data in (StdfBulkWrite.far(), StdfBulkWrite.atr(), StdfBulkWrite.mir(mir)):
+                size += f.write(data)
+            if wir is not None:
+                size += f.write(StdfBulkWrite.wir(wir))
+            for data in StdfBulkWrite.part_records(prr_df, dtp_df, ptmd_df):
+                size += f.write(data)
+            if wir is not None:
+                size += f.write(StdfBulkWrite.wrr(wir, mrr.FINISH_T, len(prr_df)))
+            size += f.write(StdfBulkWrite.bin_records(prr_df, df_module.bin_df))
+            size += f.write(StdfBulkWrite.mrr(mrr))
+        return size
@@ -0,0 +1,195 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+@File    : trace.py
+@Author  : Link
+@Time    : 2023/2/26 20:30
+@Mark    : 代替 @Time() 的耗时记录, 记录到内存中而不是print
+    @Trace.span()                          函数整个是一个span, 自动记录入参/返回值的行数和大小
+    with Trace.block("parse", file=path) as span:
+        ...
+        span.set(rows_out=len(df))          手动补充信息
+    span可以嵌套, 同一个线程中按开始时间和深度成树; 进程池的子进程中的span不会回来
+    Trace.enabled 为False时, span只多一次属性判断; STDF_TRACE=1 时启动就记录
+    Trace.to_chrome() 导出 chrome://tracing / Perfetto 能打开的json, 界面见 PerformanceWidget
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Union, List
+
+import pandas as pd
+
+from common.app_variable import DataModule
+
+
+class Span:
+    """ 一段耗时, 结束时放进 Trace.buffer """
+    __slots__ = ("name", "args", "start", "depth")
+
+    def __init__(self, name: str, args: dict):
+        self.name = name
+        self.args = args
+        self.start = 0
+        self.depth = 0
+
+    def set(self, **kwargs):
+        self.args.update(kwargs)
+        return self
+
+    def __enter__(self):
+        stack = Trace.stack()
+        self.depth = len(stack)
+        stack.append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        end = time.perf_counter_ns()
+        Trace.stack().pop()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        Trace.buffer.append(
+            (self.name, self.start, end - self.start, threading.get_ident(), self.depth, self.args)
+        )
+        return False
+
+
+class NoSpan:
+    """ 不记录时用的span, 什么都不做 """
+    __slots__ = ()
+
+    def set(self, **kwargs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+class Trace:
+    enabled = os.environ.get("STDF_TRACE") == "1"
+    MAX_EVENTS = 100000
+    buffer = deque(maxlen=MAX_EVENTS)  # (name, start_ns, dur_ns, tid, depth, args)
+    ORIGIN = time.perf_counter_ns()
+    COLUMNS = ["NAME", "START", "DURATION", "TID", "DEPTH", "ARGS"]
+
+    _local = threading.local()
+    _no_span = NoSpan()
+
+    @staticmethod
+    def stack() -> List[Span]:
+        stack = getattr(Trace._local, "stack", None)
+        if stack is None:
+            stack = Trace._local.stack = []
+        return stack
+
+    @staticmethod
+    def enable(enabled: bool = True):
+        Trace.enabled = enabled
+
+    @staticmethod
+    def clear():
+        Trace.buffer.clear()
+
+    @staticmethod
+    def block(name: str, **kwargs) -> Union[Span, NoSpan]:
+        if not Trace.enabled:
+            return Trace._no_span
+        return Span(name, kwargs)
+
+    @staticmethod
+    def size(obj, prefix: str) -> dict:
+        """
+        DataFrame/DataModule 的行数和内存(不算object的内容), list/dict 只有长度
+        :param prefix: in/out
+        """
+        if isinstance(obj, pd.DataFrame):
+            return {prefix + "_rows": len(obj), prefix + "_bytes": int(obj.memory_usage(index=True).sum())}
+        if isinstance(obj, DataModule):
+            frames = [each for each in (obj.prr_df, obj.dtp_df, obj.ptmd_df) if each is not None]
+            return {
+                prefix + "_rows": len(obj.dtp_df) if obj.dtp_df is not None else 0,
+                prefix + "_bytes": int(sum(each.memory_usage(index=True).sum() for each in frames)),
+            }
+        if isinstance(obj, (list, tuple, dict)):
+            return {prefix + "_rows": len(obj)}
+        return {}
+
+    @staticmethod
+    def span(name: str = None) -> Callable:
+        """
+        装饰器, 用法和 @Time() 一样
+        第一个 DataFrame/DataModule/list 参数记为 in_rows/in_bytes, 返回值记为 out_rows/out_bytes
+        """
+
+        def decorator(func):
+            span_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not Trace.enabled:
+                    return func(*args, **kwargs)
+                info = {}
+                for each in args:
+                    info = Trace.size(each, "in")
+                    if info:
+                        break
+                with Span(span_name, info) as span:
+                    res = func(*args, **kwargs)
+                    span.args.update(Trace.size(res, "out"))
+                return res
+
+            return wrapper
+
+        return decorator
+
+    @staticmethod
+    def events() -> pd.DataFrame:
+        """ START/DURATION 是ms, START 从import本模块时算起 """
+        df = pd.DataFrame(list(Trace.buffer), columns=Trace.COLUMNS)
+        df["START"] = (df["START"] - Trace.ORIGIN) / 1E6
+        df["DURATION"] = df["DURATION"] / 1E6
+        return df.sort_values(["TID", "START", "DEPTH"]).reset_index(drop=True)
+
+    @staticmethod
+    def summary() -> pd.DataFrame:
+        """
+        按NAME汇总, 给界面的表格用, 按总时间排序
+        :return: [NAME, COUNT, TOTAL, MEAN, MAX, ROWS] 时间是ms
+        """
+        df = Trace.events()
+        df["ROWS"] = [each.get("out_rows", each.get("in_rows", 0)) for each in df["ARGS"]]
+        result = df.groupby("NAME", sort=False).agg(
+            COUNT=("DURATION", "size"), TOTAL=("DURATION", "sum"), MEAN=("DURATION", "mean"),
+            MAX=("DURATION", "max"), ROWS=("ROWS", "sum"),
+        )
+        return result.sort_values("TOTAL", ascending=False).reset_index()
+
+    @staticmethod
+    def to_chrome(file_path: str = None) -> dict:
+        """
+        Chrome Trace Event 格式, 完整事件(ph=X), ts/dur 是us
+        :param file_path: 有时写到文件
+        """
+        pid = os.getpid()
+        trace = {
+            "traceEvents": [
+                {
+                    "name": name, "cat": "stdf", "ph": "X", "pid": pid, "tid": tid,
+                    "ts": (start - Trace.ORIGIN) / 1E3, "dur": duration / 1E3, "args": args,
+                }
+                for name, start, duration, tid, depth, args in list(Trace.buffer)
+            ],
+            "displayTimeUnit": "ms",
+        }
+        if file_path is not None:
+            with open(file_path, "w", encoding="utf-8") as f:
+                json.dump(trace, f, default=str)
+        return trace
@@ -0,0 +1,117 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+@File    : stdf_ingest.py
+@Author  : Link
+@Time    : 2023/2/24 20:10
+@Mark    : 单个STDF载入到缓存: STDF -> HDF5 -> Summary一行
+    RunStdfAnalysis 和 stdf_analysis(命令行) 共用, 这里不能有Qt
+"""
+import os
+import sqlite3
+from typing import Union
+
+import pandas as pd
+
+from common.app_variable import GlobalVariable, PartFlags, ReadFail
+from common.sql_interface.summary_catalog import SummaryCatalog
+from common.trace import Trace
+from common.stdf_interface.stdf_parser import SemiStdfUtils
+from parser_core.dll_parser import LinkStdf
+from parser_core.stdf_parser_file_write_read import ParserData
+
+
+class StdfIngest:
+    stdf = None  # type:LinkStdf  # 每个进程一个, 进程池中不用每个文件都载入dll
+
+    @staticmethod
+    def parser() -> LinkStdf:
+        if StdfIngest.stdf is None:
+            StdfIngest.stdf = LinkStdf()
+            StdfIngest.stdf.init()
+        return StdfIngest.stdf
+
+    @staticmethod
+    def hdf5_path(file_path: str, lot_id: str, cache_path: str = None) -> str:
+        """ CACHE_PATH/LOT_ID/文件名.h5, LOT的文件夹不存在时新建 """
+        save_path = os.path.join(cache_path or GlobalVariable.CACHE_PATH, lot_id)
+        if not os.path.exists(save_path):
+            os.makedirs(save_path)
+        file_name = os.path.basename(file_path)
+        return os.path.join(save_path, os.path.splitext(file_name)[0] + ".h5")
+
+    @staticmethod
+    @Trace.span()
+    def to_hdf5(file_path: str, save_name: str, stdf: LinkStdf = None) -> bool:
+        """
+        dll 先解析成csv(在HDF5的同一个文件夹中), 再转成HDF5
+        :return: False时是STDF解析失败
+        """
+        stdf = stdf or StdfIngest.parser()
+        save_path = os.path.dirname(save_name)
+        ParserData.delete_swap_file(save_path)
+        if not stdf.parser_stdf_to_csv(file_path, save_path):
+            return False
+        df_module = ParserData.load_csv(save_path)
+        if ParserData.save_hdf5(df_module, save_name):
+            ParserData.delete_swap_file(save_path)
+        return True
+
+    @staticmethod
+    def catalog_lookup(save_name: str, part_flag: int, read_fail: int, db_path: str = None) -> Union[dict, None]:
+        try:
+            return SummaryCatalog.lookup(save_name, part_flag, read_fail, db_path)
+        except (sqlite3.Error, OSError) as err:
+            print("summary catalog exception: ", err)
+            return None
+
+    @staticmethod
+    def catalog_register(info: dict, prr: pd.DataFrame, db_path: str = None):
+        try:
+            SummaryCatalog.register(info, prr, db_path)
+        except (sqlite3.Error, OSError) as err:
+            print("summary catalog exception: ", err)
+
+    @staticmethod
+    @Trace.span()
+    def summary(file_path: str, save_name: str, unit_id: int, part_flag: int = PartFlags.ALL,
+                read_fail: int = ReadFail.Y, info: dict = None, db_path: str = None) -> dict:
+        """
+        SummaryCore 中的一行, 目录中有这个HDF5(指纹一致)时不再读STDF的头和PRR
+        :param info: 已经读过的STDF头(get_lot_info_by_semi_ate), 没有时再读
+        """
+        file_name = os.path.basename(file_path)
+        read_fail = ReadFail.Y if read_fail else ReadFail.N
+        data_dict = StdfIngest.catalog_lookup(save_name, part_flag, read_fail, db_path)
+        if data_dict is not None:
+            data_dict.update(FILE_PATH=file_path, FILE_NAME=file_name, ID=unit_id)
+            return data_dict
+        if info is None:
+            info = SemiStdfUtils.get_lot_info_by_semi_ate(file_path)
+        prr = ParserData.load_prr_df(save_name, unit_id=unit_id)
+        data_dict = {
+            "FILE_PATH": file_path,
+            "FILE_NAME": file_name,
+            "ID": unit_id,
+            **info,
+            **ParserData.get_yield(prr, part_flag, read_fail),
+            "PART_FLAG": part_flag,
+            "READ_FAIL": read_fail,
+            "HDF5_PATH": save_name,
+        }
+        StdfIngest.catalog_register(data_dict, prr, db_path)
+        return data_dict
+
+    @staticmethod
+    def ingest(file_path: str, unit_id: int, part_flag: int = PartFlags.ALL, read_fail: int = ReadFail.Y,
+               cache_path: str = None, db_path: str = None) -> Union[dict, None]:
+        """
+        一个文件从头到尾, 可以在子进程中执行
+        :return: Summary的一行, STDF解析失败时是None
+        """
+        info = SemiStdfUtils.get_lot_info_by_semi_ate(file_path)
+        save_name = StdfIngest.hdf5_path(file_path, info["LOT_ID"], cache_path)
+        if not os.path.exists(save_name) and not StdfIngest.to_hdf5(file_path, save_name):
+            return None
+        return StdfIngest.summary(file_path, save_name, unit_id, part_flag, read_fail, info, db_path)
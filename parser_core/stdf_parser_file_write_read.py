@@ -14,9 +14,10 @@ import pandas as pd
 import numpy as np
 from pandas import DataFrame as Df
 
-from app_test.test_utils.wrapper_utils import Time
+from common.trace import Trace
 from common.app_variable import TestVariable as TestVar, DataModule, GlobalVariable as GloVar, PtmdModule, TestVariable, \
     PartFlags, FailFlag, GlobalVariable
+from common.cal_interface.data_merge import DataMerge
 from parser_core.stdf_parser_func import PrrPartFlag, DtpTestFlag
 
 
@@ -167,7 +168,7 @@ class ParserData:
         return df
 
     @staticmethod
-    @Time()
+    @Trace.span()
     def load_hdf5_analysis(file_path: str, part_flag: int, read_fail: int, unit_id: int) -> DataModule:
         """
         根据条件来选取数据, 能走到这一步的基本不会有报错了
@@ -256,51 +257,14 @@ class ParserData:
     #     return df_module, unstack_module
 
     @staticmethod
-    @Time()
-    def contact_data_module(args: List[DataModule]):
+    @Trace.span()
+    def contact_data_module(args: List[DataModule], key: str = DataMerge.TEXT, mapping: pd.DataFrame = None):
         """
-        关键函数, 将多份的数据组合起来, 特别是不同程序的数据, 并将所有的TEST_ID重新分配, 按照 TEST_NUM:TEST_TXT 来分配唯一TEST_ID
+        关键函数, 将多份的数据组合起来, 特别是不同程序的数据, 并将所有的TEST_ID重新分配, 按照 key 来分配唯一TEST_ID
         TODO: ID也是用来和Summary链接的桥梁
         :param args:
+        :param key: DataMerge.KEYS, 默认 TEST_NUM:TEST_TXT
+        :param mapping: key为MAPPING时的对应表
         :return:
         """
-        if len(args) == 1:
-            return args[0]
-        prr_df_list: list = list()
-        dtp_df_list: list = list()
-        ptmd_df_list: list = list()
-        for data_module in args:
-            prr_df_list.append(data_module.prr_df)
-            dtp_df_list.append(data_module.dtp_df)
-            ptmd_df_list.append(data_module.ptmd_df)
-        prr_df = pd.concat(prr_df_list)
-        dtp_df = pd.concat(dtp_df_list)
-        ptmd_df = pd.concat(ptmd_df_list)
-
-        new_test_id = 0
-        ptmd_dict = {}  # 需要生成一份新的PTMD数据, 不绑定ID了
-        new_dtps = []
-        dtp_dict = dict()
-        for (_id, _test_id), _dtp_df in dtp_df.groupby(["ID", "TEST_ID"], sort=False):
-            key = "{}-{}".format(_id, _test_id)
-            dtp_dict[key] = _dtp_df
-
-        for text, df in ptmd_df.groupby("TEXT", sort=False):
-            new_test_id += 1
-            for row in df.itertuples():  # type:PtmdModule
-                # TODO: 1. 取出所有旧的TEST_ID 2. 替换成新的TEST_ID
-                # start = time.perf_counter()
-                key = "{}-{}".format(row.ID, row.TEST_ID)
-                _dtp_df = dtp_dict[key]
-                _dtp_df["TEST_ID"] = new_test_id
-                new_dtps.append(_dtp_df)
-                # use_time = round(time.perf_counter() - start, 3)
-                # print("func: {} exec time: {}.".format("loc", use_time))
-                ptmd_dict[new_test_id] = row
-
-        ptmd_df = pd.DataFrame(ptmd_dict.values())
-        for k, v in GloVar.PTMD_TYPE_DICT.items():
-            ptmd_df[k] = ptmd_df[k].astype(v)
-        ptmd_df["TEST_ID"] = ptmd_dict.keys()
-        dtp_df = pd.concat(new_dtps)
-        return DataModule(prr_df=prr_df, dtp_df=dtp_df, ptmd_df=ptmd_df)
+        return DataMerge.merge(args, key, mapping)
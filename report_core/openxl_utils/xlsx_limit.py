@@ -0,0 +1,80 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+@File    : xlsx_limit.py
+@Author  : Link
+@Time    : 2023/2/17 20:30
+@Mark    : Limit差异表, XlsxWriter constant_memory 按行顺序写入
+    数据来自 LimitDiff.calculation, 这里只负责画格子, 和上一个LOT不同的格子标红
+    格式和 OpenXl 中的一样, 所有格子共用几个Format
+"""
+import numpy as np
+import xlsxwriter
+
+from common.app_variable import LimitDiffModule
+from common.cal_interface.limit_diff import LimitDiff
+
+
+class XlsxLimit:
+    ROW_HEAD = ["ID", "LOT_ID", "SBLOT_ID", "WAFER_ID", "TEST_COD", "FLOW_ID", "PART_TYP", "JOB_NAM"]
+
+    @staticmethod
+    def write(diff: LimitDiffModule, save_path: str):
+        """
+        前三列固定, 每个LOT两列(LO/HI), 表头是LOT的信息
+        """
+        df_limit = diff.tests
+        lot_count = len(diff.lots)
+        # LO/HI 交错排列
+        values = np.stack([diff.lo_limit, diff.hi_limit], axis=2)
+        mask = np.stack([diff.lo_change, diff.hi_change], axis=2)
+
+        wb = xlsxwriter.Workbook(save_path, {"constant_memory": True, "nan_inf_to_errors": True})
+        sheet = wb.add_worksheet("Limit")
+        title_format = wb.add_format({"font_name": "微软雅黑", "font_size": 10, "bold": True, "bg_color": "#00B050"})
+        lot_format = wb.add_format({
+            "font_name": "微软雅黑", "font_size": 10, "bold": True, "bg_color": "#00B050",
+            "align": "center", "valign": "vcenter",
+        })
+        special_format = wb.add_format({"font_name": "微软雅黑", "font_size": 9, "font_color": "#0070C0", "border": 1})
+        head_format = wb.add_format({
+            "font_name": "微软雅黑", "font_size": 9, "font_color": "#0070C0", "border": 1,
+            "bg_color": "#FFFF00", "align": "center", "valign": "vcenter",
+        })
+        text_format = wb.add_format({
+            "font_name": "等线", "font_size": 9, "border": 1, "align": "center", "valign": "vcenter",
+        })
+        red_format = wb.add_format({
+            "font_name": "等线", "font_size": 9, "border": 1, "align": "center", "valign": "vcenter",
+            "bg_color": "#FF0000",
+        })
+        first_lot_column = len(LimitDiff.COLUMN_HEAD)
+
+        # LOT信息, 每个LOT合并两列
+        lots = diff.lots.reindex(columns=XlsxLimit.ROW_HEAD)
+        lots = lots.astype(object).where(lots.notna(), "")
+        for row, each in enumerate(XlsxLimit.ROW_HEAD):
+            sheet.write(row, 1, each, title_format)
+            for index, value in enumerate(lots[each].tolist()):
+                column = first_lot_column + index * 2
+                sheet.merge_range(row, column, row, column + 1, value, lot_format)
+
+        title_row = len(XlsxLimit.ROW_HEAD)
+        head_row = title_row + 1
+        sheet.write_row(title_row, 0, LimitDiff.COLUMN_HEAD, head_format)
+        sheet.write_row(title_row, first_lot_column, LimitDiff.LIMIT_HEAD * lot_count, head_format)
+
+        values = values.reshape(len(df_limit), -1).tolist()
+        mask = mask.reshape(len(df_limit), -1).tolist()
+        for i, head in enumerate(df_limit.itertuples(index=False, name=None)):
+            row = head_row + i
+            sheet.write_row(row, 0, head, special_format)
+            for column, (value, changed) in enumerate(zip(values[i], mask[i]), start=first_lot_column):
+                if value != value:  # NAN, 这个LOT没有这个测试项
+                    continue
+                sheet.write_number(row, column, value, red_format if changed else text_format)
+
+        sheet.freeze_panes(head_row, first_lot_column)
+        wb.close()
+        return save_path
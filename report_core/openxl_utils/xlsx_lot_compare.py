@@ -0,0 +1,55 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+@File    : xlsx_lot_compare.py
+@Author  : Link
+@Time    : 2023/2/18 16:30
+@Mark    : LOT对比表, 数据来自 LotCompare.calculation, XlsxWriter constant_memory 按行写入
+    每个指标一个sheet, 表头每行是一个分组列, 一列一个LOT
+"""
+import numpy as np
+import xlsxwriter
+
+from common.app_variable import LotCompareModule
+
+
+class XlsxLotCompare:
+    SHEETS = (("AVG", "avg"), ("STD", "std"), ("CPK", "cpk"), ("REJECT_RATE", "reject_rate"), ("QTY", "qty"))
+
+    @staticmethod
+    def write(compare: LotCompareModule, save_path: str):
+        wb = xlsxwriter.Workbook(save_path, {"constant_memory": True, "nan_inf_to_errors": True})
+        head_format = wb.add_format({"font_name": "微软雅黑", "font_size": 10, "bold": True, "bg_color": "#00B050"})
+        text_format = wb.add_format({"font_name": "等线", "font_size": 9})
+        percent_format = wb.add_format({"font_name": "等线", "font_size": 9, "num_format": "0.00%"})
+        lots = compare.lots.astype(object).where(compare.lots.notna(), "")
+
+        sheet = wb.add_worksheet("LOT")
+        sheet.write_row(0, 0, list(lots.columns), head_format)
+        for row, values in enumerate(lots.itertuples(index=False, name=None), start=1):
+            # 最后一列是YIELD
+            sheet.write_row(row, 0, values[:-1], text_format)
+            if values[-1] != "":
+                sheet.write_number(row, len(values) - 1, values[-1], percent_format)
+        sheet.freeze_panes(1, 0)
+
+        texts = compare.tests["TEXT"].tolist()
+        for sheet_name, attr in XlsxLotCompare.SHEETS:
+            sheet = wb.add_worksheet(sheet_name)
+            value_format = percent_format if sheet_name == "REJECT_RATE" else text_format
+            for row, key in enumerate(compare.keys):
+                sheet.write(row, 0, key, head_format)
+                sheet.write_row(row, 1, lots[key].tolist(), head_format)
+            head_row = len(compare.keys)
+            matrix = getattr(compare, attr).astype(np.float64).tolist()
+            for i, text in enumerate(texts):
+                row = head_row + i
+                sheet.write_string(row, 0, str(text), text_format)
+                for column, value in enumerate(matrix[i], start=1):
+                    if value != value:  # NAN
+                        continue
+                    sheet.write_number(row, column, value, value_format)
+            sheet.freeze_panes(head_row, 1)
+        wb.close()
+        return save_path
@@ -0,0 +1,197 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+@File    : stdf_analysis.py
+@Author  : Link
+@Time    : 2023/2/24 21:30
+@Mark    : 命令行批量分析, 不打开界面, 给定时任务用
+    python -m stdf_analysis D:\\STDF\\LOT1 a.stdf -o D:\\REPORT -j 4 --part-flag FIRST
+    1. 目录下的STDF用进程池解析到 CACHE_PATH, 已经有HDF5和目录记录的直接用
+    2. SummaryCore/Li 和界面中一样的流程: concat -> top fail -> capability
+    3. 输出 summary/capability 表(CSV/PARQUET), limit/compare 报表(xlsx), limit-csv/limit-json, --stdf 时另存STDF
+    返回值见 ExitCode
+"""
+import argparse
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Sequence, Tuple
+
+from common.app_variable import GlobalVariable, PartFlags, ReadFail
+from common.cal_interface.data_merge import DataMerge
+
+
+class ExitCode:
+    OK = 0
+    PARTIAL = 1  # 有文件解析失败, 其他文件的结果已经输出
+    USAGE = 2  # 参数错误, 和argparse一样
+    NO_DATA = 3  # 没有STDF或全部解析失败
+    ERROR = 4  # 计算或输出报表时异常
+
+
+class BatchAnalysis:
+    """
+    子进程(spawn)会重新import本模块, 解析和计算用到的模块在用到时才import
+    """
+    FORMATS = ("CSV", "PARQUET")
+    REPORTS = ("limit", "compare", "limit-csv", "limit-json")
+    DEFAULT_REPORTS = ("limit", "compare")
+
+    @staticmethod
+    def arg_parser() -> argparse.ArgumentParser:
+        parser = argparse.ArgumentParser(prog="stdf_analysis", description="STDF批量解析/制程能力/报表")
+        parser.add_argument("paths", nargs="+", help="STDF文件或文件夹(包含子文件夹)")
+        parser.add_argument("-o", "--out", default=GlobalVariable.LIMIT_PATH, help="输出文件夹")
+        parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1, help="解析的进程数")
+        parser.add_argument("--cache", default=GlobalVariable.CACHE_PATH, help="HDF5缓存文件夹")
+        parser.add_argument("--db", default=GlobalVariable.SQLITE_PATH, help="SummaryCatalog的db")
+        parser.add_argument("--part-flag", default="ALL", choices=PartFlags.PART_FLAGS, type=str.upper)
+        parser.add_argument("--no-fail", action="store_true", help="不读取FAIL的数据")
+        parser.add_argument("--format", default="CSV", choices=BatchAnalysis.FORMATS, type=str.upper,
+                            help="summary/capability 表的格式")
+        parser.add_argument("--report", nargs="*", default=list(BatchAnalysis.DEFAULT_REPORTS),
+                            choices=BatchAnalysis.REPORTS,
+                            help="输出的报表, limit/compare是xlsx, limit-csv/limit-json是Limit差异的表; 只写--report时不输出")
+        parser.add_argument("--merge-key", default=None, choices=DataMerge.KEYS, type=str.upper,
+                            help="多个程序Merge时测试项的对应方式")
+        parser.add_argument("--mapping", default=None, help="测试项对应表(csv/xlsx), 有时merge-key是MAPPING")
+        parser.add_argument("--stdf", action="store_true", help="Merge/筛选后的数据另存为 data.stdf")
+        return parser
+
+    @staticmethod
+    def collect_files(paths: Sequence[str]) -> List[str]:
+        """ 文件夹展开成STDF文件, 去重, 保持顺序 """
+        path_list = []
+        for path in paths:
+            if os.path.isdir(path):
+                for root, dirs, files in os.walk(path):
+                    for file in sorted(files):
+                        if os.path.splitext(file)[-1] in GlobalVariable.STD_SUFFIXES:
+                            path_list.append(os.path.join(root, file))
+            elif os.path.isfile(path):
+                path_list.append(path)
+            else:
+                print("path not found: ", path)
+        return list(dict.fromkeys(os.path.abspath(each) for each in path_list))
+
+    @staticmethod
+    def call(func, *args):
+        """ 解析失败的文件跳过, 当作None """
+        try:
+            return func(*args)
+        except Exception as err:
+            print("stdf ingest exception: ", err)
+            return None
+
+    @staticmethod
+    def collect(results, summary: List[dict], failed: List[str]):
+        for path, data_dict in results:
+            if data_dict is None:
+                failed.append(path)
+            else:
+                summary.append(data_dict)
+
+    @staticmethod
+    def ingest(paths: List[str], part_flag: int, read_fail: int, workers: int = 1, cache_path: str = None,
+               db_path: str = None) -> Tuple[List[dict], List[str]]:
+        """
+        :return: (summary, 解析失败的文件), summary按START_T排序, ID是文件的顺序
+        """
+        from parser_core.stdf_ingest import StdfIngest
+        summary, failed = [], []
+        workers = max(min(len(paths), workers), 1)
+        args = [(path, index, part_flag, read_fail, cache_path, db_path) for index, path in enumerate(paths)]
+        if workers == 1:
+            results = ((each[0], BatchAnalysis.call(StdfIngest.ingest, *each)) for each in args)
+            BatchAnalysis.collect(results, summary, failed)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(StdfIngest.ingest, *each): each[0] for each in args}
+                results = ((futures[future], BatchAnalysis.call(future.result)) for future in as_completed(futures))
+                BatchAnalysis.collect(results, summary, failed)
+        summary.sort(key=lambda each: (each["START_T"], each["ID"]))
+        return summary, failed
+
+    @staticmethod
+    def analysis(summary: List[dict], out: str, export_format: str = "CSV", reports: Sequence[str] = DEFAULT_REPORTS,
+                 merge_key: str = None, mapping: str = None, save_stdf: bool = False) -> List[str]:
+        """
+        和界面中载入数据空间一样的流程
+        :return: 写出的文件
+        """
+        import pandas as pd
+        from common.cal_interface.limit_diff import LimitDiff
+        from common.cal_interface.lot_compare import LotCompare
+        from common.export_interface.data_export import DataExport
+        from common.li import Li, SummaryCore
+        from report_core.openxl_utils.xlsx_limit import XlsxLimit
+        from report_core.openxl_utils.xlsx_lot_compare import XlsxLotCompare
+
+        if not os.path.exists(out):
+            os.makedirs(out)
+        summary_core = SummaryCore()
+        summary_core.set_data(summary)
+        select_summary, id_module_dict = summary_core.load_select_data(list(summary_core.summary_df.ID))
+        li = Li()
+        if mapping is not None:
+            li.set_merge(DataMerge.MAPPING, DataMerge.load_mapping(mapping))
+        elif merge_key is not None:
+            li.set_merge(merge_key)
+        li.set_data(select_summary, id_module_dict)
+        li.concat()
+        li.calculation_top_fail()
+        li.calculation_capability()
+
+        outputs = [
+            DataExport.write(li.select_summary, os.path.join(out, "summary.csv"), export_format),
+            DataExport.write(pd.DataFrame(li.capability_key_list), os.path.join(out, "capability.csv"), export_format),
+        ]
+        if {"limit", "limit-csv", "limit-json"} & set(reports):
+            diff = LimitDiff.calculation(li.select_summary, li.df_module.ptmd_df)
+            if "limit" in reports:
+                outputs.append(os.path.join(out, "limit.xlsx"))
+                XlsxLimit.write(diff, outputs[-1])
+            for report, name in (("limit-csv", "limit.csv"), ("limit-json", "limit.json")):
+                if report in reports:
+                    outputs.append(LimitDiff.save(diff, os.path.join(out, name)))
+        if "compare" in reports:
+            outputs.append(os.path.join(out, "compare.xlsx"))
+            XlsxLotCompare.write(LotCompare.calculation(li.select_summary, li.df_module), outputs[-1])
+        if save_stdf:
+            outputs.append(os.path.join(out, "data.stdf"))
+            li.save_stdf(outputs[-1])
+        return outputs
+
+    @staticmethod
+    def run(argv: Sequence[str] = None) -> int:
+        args = BatchAnalysis.arg_parser().parse_args(argv)
+        start = time.perf_counter()
+        paths = BatchAnalysis.collect_files(args.paths)
+        if not paths:
+            print("no stdf file found")
+            return ExitCode.NO_DATA
+        part_flag = PartFlags.PART_FLAGS.index(args.part_flag)
+        read_fail = ReadFail.N if args.no_fail else ReadFail.Y
+        summary, failed = BatchAnalysis.ingest(paths, part_flag, read_fail, args.workers, args.cache, args.db)
+        print("ingest: {}/{} files, {}s".format(len(summary), len(paths), round(time.perf_counter() - start, 2)))
+        for each in failed:
+            print("failed: ", each)
+        if not summary:
+            return ExitCode.NO_DATA
+        try:
+            outputs = BatchAnalysis.analysis(summary, args.out, args.format, args.report, args.merge_key,
+                                           args.mapping, args.stdf)
+        except Exception:
+            traceback.print_exc()
+            return ExitCode.ERROR
+        for each in outputs:
+            print("output: ", each)
+        print("finished: {}s".format(round(time.perf_counter() - start, 2)))
+        return ExitCode.PARTIAL if failed else ExitCode.OK
+
+
+if __name__ == '__main__':
+    sys.exit(BatchAnalysis.run())
@@ -15,10 +15,10 @@ from PySide2.QtCore import Qt, QThread, Signal, Slot
 
 from typing import List, Set, Union
 
-from common.app_variable import GlobalVariable, TestVariable, ReadFail
+from common.app_variable import GlobalVariable, TestVariable
 from common.li import SummaryCore
 from common.stdf_interface.stdf_parser import SemiStdfUtils
-from parser_core.stdf_parser_file_write_read import ParserData
+from parser_core.stdf_ingest import StdfIngest
 from ui_component.ui_analysis_stdf.ui_designer.ui_file_load import Ui_Form as FileLoadForm
 
 from parser_core.dll_parser import LinkStdf
@@ -58,38 +58,22 @@ class RunStdfAnalysis(QThread):
             #     continue
             start = time.perf_counter()
 
-            _, file_name = os.path.split(each["FILE_PATH"])
-            stdf_name = file_name[:file_name.rfind('.')]
-            save_path = os.path.join(GlobalVariable.CACHE_PATH, each["LOT_ID"])
-
-            if not os.path.exists(save_path):
-                os.mkdir(save_path)
-            save_name = os.path.join(save_path, stdf_name + '.h5')
+            save_name = StdfIngest.hdf5_path(each["FILE_PATH"], each["LOT_ID"])
             if not os.path.exists(save_name):
                 self.eventSignal.emit({"index": index, "status": 0, "message": "开始解析STDF中!"})
-                ParserData.delete_swap_file(save_path)
-                boolean = self.stdf.parser_stdf_to_csv(each["FILE_PATH"], save_path)
-                if not boolean:
+                if not StdfIngest.to_hdf5(each["FILE_PATH"], save_name, self.stdf):
                     self.eventSignal.emit({"index": index, "status": -1, "message": "STDF文件解析失败!"})
                     continue
-                df_module = ParserData.load_csv(save_path)
-                if ParserData.save_hdf5(df_module, save_name):
-                    ParserData.delete_swap_file(save_path)
             else:
                 self.eventSignal.emit({"index": index, "status": 0, "message": "缓存文件存在,调用缓存数据!"})
 
             """
             开始读取prr然后进行数据处理!
+            目录中有这个HDF5(指纹一致)时不再读STDF的头和PRR
             """
-            mdi_id = int(self.id + index)
-            prr = ParserData.load_prr_df(save_name, unit_id=mdi_id)
-            by_analysis_data_dict = {
-                **SemiStdfUtils.get_lot_info_by_semi_ate(each["FILE_PATH"], FILE_NAME=file_name, ID=mdi_id),
-                **ParserData.get_yield(prr, each["PART_FLAG"], each["READ_FAIL"]),
-                "PART_FLAG": each["PART_FLAG"],
-                "READ_FAIL": ReadFail.Y if each["READ_FAIL"] else ReadFail.N,
-                "HDF5_PATH": save_name,
-            }
+            by_analysis_data_dict = StdfIngest.summary(
+                each["FILE_PATH"], save_name, int(self.id + index), each["PART_FLAG"], each["READ_FAIL"]
+            )
             """ 阻止不同的程序一起解析 """
             # if self.cache_pro is None:
             #     self.cache_pro = by_analysis_data_dict['JOB_NAM']
@@ -10,20 +10,20 @@
 
 from typing import Union
 
-import numpy as np
-from PySide2.QtGui import QStandardItemModel, QStandardItem, Qt, QCloseEvent, QShowEvent
-from PySide2.QtWidgets import QWidget
+from PySide2.QtGui import QStandardItemModel, QStandardItem, Qt, QCloseEvent, QShowEvent, QFont
+from PySide2.QtWidgets import QWidget, QAction
 from PySide2.QtCore import Slot, QModelIndex
 
-from common.app_variable import FailFlag, Calculation, DatatType
-from common.li import Li
+from common.app_variable import DatatType
+from common.cal_interface.die_match import DieMatch
+from common.cal_interface.process_table import ProcessTable
 from ui_component.ui_app_variable import UiGlobalVariable
 from ui_component.ui_analysis_stdf.ui_designer.ui_processing import Ui_Form
 
-import pyqtgraph as pg
 import pandas as pd
 
 from ui_component.ui_common.my_text_browser import Print
+from ui_component.ui_module.table_module import DataFrameTableView
 
 
 class ProcessWidget(QWidget, Ui_Form):
@@ -36,6 +36,7 @@ class ProcessWidget(QWidget, Ui_Form):
     select_item_list = QStandardItemModel()
     jmp_df: pd.DataFrame = None
     calculation: dict = None
+    base_name: str = None  # Diff报告的基准分组
 
     def __init__(self, parent=None, icon=None):
         super(ProcessWidget, self).__init__(parent)
@@ -48,9 +49,13 @@ class ProcessWidget(QWidget, Ui_Form):
         self.listView_2.clicked.connect(self.top_row_change)
         self.listView.setModel(self.bot_item_list)
         self.listView.clicked.connect(self.bot_row_change)
-        self.cpk_info_table = pg.TableWidget(self)
+        self.listView.setContextMenuPolicy(Qt.ActionsContextMenu)
+        base_action = QAction("设为Diff基准", self.listView)
+        base_action.triggered.connect(lambda: self.set_base(self.listView.currentIndex().data()))
+        self.listView.addAction(base_action)
+        self.radioButton.setText("Diff差异报告(按坐标匹配同一颗DIE)\n第一次点击的分组为基准(粗体), 右键可以更换")
+        self.cpk_info_table = DataFrameTableView(self)
         self.verticalLayout.addWidget(self.cpk_info_table)
-        self.cpk_info_table.setEditable(True)
         self.splitter.setStretchFactor(0, 1)
         self.splitter.setStretchFactor(1, 15)
 
@@ -90,10 +95,23 @@ class ProcessWidget(QWidget, Ui_Form):
         bot_item_list_df = temp_df["GROUP"] + "@" + temp_df["DA_GROUP"]  # type:pd.DataFrame
         bot_item_list = bot_item_list_df.drop_duplicates(keep="first").tolist()
         self.bot_item_list.clear()
+        self.base_name = None
         for index, each in enumerate(bot_item_list):
             item = QStandardItem(each)
             self.bot_item_list.appendRow(item)
 
+    def set_base(self, name: Union[str, None]):
+        """ 设置Diff报告的基准分组, 列表中用粗体标出 """
+        if name is None:
+            return
+        self.base_name = name
+        for row in range(self.bot_item_list.rowCount()):
+            item = self.bot_item_list.item(row)
+            font = QFont(item.font())
+            font.setBold(item.text() == name)
+            item.setFont(font)
+        Print.info("Diff基准: {}".format(name))
+
     def set_data(self, jmp_df: pd.DataFrame, calculation: dict):
         """
         设置数据后才可以调用 gen_listView
@@ -126,111 +144,39 @@ class ProcessWidget(QWidget, Ui_Form):
             return
 
         if model_index.data() == "YIELD":
-            df_group = temp_df.groupby(["GROUP", "DA_GROUP"])
-            yield_data = []  # type:list
-            for key, each_df in df_group:
-                if not isinstance(key, tuple):
-                    item_name = str(key)
-                else:
-                    item_name = '@'.join([str(ea) for ea in key])
-                total = len(each_df)
-                fail_num = len(each_df[each_df.FAIL_FLAG != FailFlag.PASS])
-                pass_num = len(each_df) - fail_num
-                yield_data.append({
-                    "Item": item_name,
-                    "Total": total,
-                    "Pass": pass_num,
-                    "Fail": fail_num,
-                    "Yield": "{}%".format(round(pass_num / total * 100, 3)),
-                })
-            self.cpk_info_table.setData(yield_data)
+            self.cpk_info_table.setData(ProcessTable.yield_table(temp_df))
             return
 
         if model_index.data() == "DATA":
-            """
-            这个稍微复杂一些, 先将数据都获取到, 然后再整理起来
-            """
             if not self.calculation:
                 return Print.warning("未选取测试项目, 故只能查询良率数据@!!!")
             item_list = self.get_listView_3_choose_items()
             if item_list is None:
                 return
-            df_group = temp_df.groupby(["GROUP", "DA_GROUP"])
-            group_cpk_dict = dict()
-            for key, each_df in df_group:
-                if not isinstance(key, tuple):
-                    item_name = str(key)
-                else:
-                    item_name = '@'.join([str(ea) for ea in key])
-                _cpk_df = each_df[each_df.FAIL_FLAG == FailFlag.PASS][self.calculation.keys()]
-                _mean = _cpk_df.mean()
-                _std = _cpk_df.std()
-                temp_data_list = []
-                for index, item_key in enumerate(self.calculation.keys()):
-                    item: dict = self.calculation[item_key]
-                    temp_std = _std[item_key]
-                    temp_mean = _mean[item_key]
-                    if temp_std == 0:
-                        cpk = 0
-                    else:
-                        cpk = round(min(
-                            [(item["HI_LIMIT"] - temp_mean) / (3 * temp_std),
-                             (temp_mean - item["LO_LIMIT"]) / (3 * temp_std)])
-                            , UiGlobalVariable.GraphPlotFloatRound)
-                    temp_dict = {
-                        "TEST_ID": item["TEST_ID"],
-                        "DATAT_TYPE": item["DATAT_TYPE"],
-                        "TEXT": item_key,
-                        "UNITS": item["UNITS"],
-                        "LO_LIMIT": item["LO_LIMIT"],
-                        "HI_LIMIT": item["HI_LIMIT"],
-                        "LO_LIMIT_TYPE": item["LO_LIMIT_TYPE"],
-                        "HI_LIMIT_TYPE": item["HI_LIMIT_TYPE"],
-                        f"{item_name}_AVG": round(_mean[item_key], 5),
-                        f"{item_name}_STD": round(_std[item_key], 5),
-                        f"{item_name}_CPK": cpk,
-                    }
-                    temp_data_list.append(temp_dict)
-                group_cpk_dict[item_name] = temp_data_list
-
-            """
-            前台展示数据
-            """
-            data_table_list = []
-            for index, key in enumerate(group_cpk_dict.keys()):
-                temp_each_data = group_cpk_dict[key]
-                if index == 0:
-                    for i, row in enumerate(temp_each_data):
-                        d = {
-                            "TEST_ID": row["TEST_ID"],
-                            "DATAT_TYPE": row["DATAT_TYPE"],
-                            "TEXT": row["TEXT"],
-                            "UNITS": row["UNITS"],
-                            "LO_LIMIT": row["LO_LIMIT"],
-                            "HI_LIMIT": row["HI_LIMIT"],
-                            "LO_LIMIT_TYPE": row["LO_LIMIT_TYPE"],
-                            "HI_LIMIT_TYPE": row["HI_LIMIT_TYPE"],
-                        }
-                        for each in item_list:
-                            if each == "MEAN":
-                                d[f"{key}_AVG"] = row[f"{key}_AVG"]
-                            if each == "STD":
-                                d[f"{key}_STD"] = row[f"{key}_STD"]
-                            if each == "CPK":
-                                d[f"{key}_CPK"] = row[f"{key}_CPK"]
-                        data_table_list.append(d)
-                else:
-                    for i, row in enumerate(temp_each_data):
-                        for each in item_list:
-                            if each == "MEAN":
-                                data_table_list[i][f"{key}_AVG"] = row[f"{key}_AVG"]
-                            if each == "STD":
-                                data_table_list[i][f"{key}_STD"] = row[f"{key}_STD"]
-                            if each == "CPK":
-                                data_table_list[i][f"{key}_CPK"] = row[f"{key}_CPK"]
-            self.cpk_info_table.setData(data_table_list)
+            self.cpk_info_table.setData(ProcessTable.data_table(
+                temp_df, self.calculation, item_list, UiGlobalVariable.GraphPlotFloatRound
+            ))
             return
 
+    def group_df(self, name: str) -> pd.DataFrame:
+        group, da_group = name.split("@", 1)
+        return self.jmp_df[(self.jmp_df.GROUP == group) & (self.jmp_df.DA_GROUP == da_group)]
+
+    def diff_groups(self, model_index: QModelIndex) -> Union[tuple, None]:
+        """
+        还没有基准时, 点击的分组设为基准; 之后点击的分组和基准对比
+        :return: 基准, 对比; 不能对比时是None
+        """
+        other_name = model_index.data()
+        if self.base_name is None:
+            self.set_base(other_name)
+            Print.info("再点击要对比的分组@")
+            return None
+        if other_name == self.base_name:
+            Print.warning("对比的分组和基准是同一个, 请点击其他分组或右键更换基准@!!!")
+            return None
+        return self.base_name, other_name
+
     @Slot(QModelIndex)
     def bot_row_change(self, model_index: QModelIndex):
         """
@@ -240,81 +186,29 @@ class ProcessWidget(QWidget, Ui_Form):
         """
         if not self.calculation:
             return Print.warning("未选取测试项目, 故只能查询良率数据@!!!")
-        group, da_group = model_index.data().split("@")
-        df = self.jmp_df[(self.jmp_df.GROUP == group) & (self.jmp_df.DA_GROUP == da_group)]
         if self.radioButton_2.isChecked():
-            cpk_list = []
-            temp_df = df[df.FAIL_FLAG == FailFlag.PASS][self.calculation.keys()]
-            _mean, _min, _max, _std, _median = temp_df.mean(), temp_df.min(), temp_df.max(), temp_df.std(), temp_df.median()
-            for key, item in self.calculation.items():  # type:str, dict
-                temp_std, temp_mean = _std[key], _mean[key]
-                cpk = 0 if temp_std == 0 else round(
-                    min([(item["HI_LIMIT"] - temp_mean) / (3 * temp_std),
-                         (temp_mean - item["LO_LIMIT"]) / (3 * temp_std)])
-                    , 6)
-                temp_dict = {
-                    "TEST_ID": item["TEST_ID"],
-                    "DATAT_TYPE": item["DATAT_TYPE"],
-                    "TEST_NUM": item["TEST_NUM"],
-                    "TEST_TXT": item["TEST_TXT"],
-                    "UNITS": item["UNITS"],
-                    "LO_LIMIT": item["LO_LIMIT"],
-                    "HI_LIMIT": item["HI_LIMIT"],
-                    "AVG": round(_mean[key], 6),
-                    "STD": round(_std[key], 6),
-                    "CPK": cpk,
-                    "QTY": len(df),
-                    # "Fail": fail_qty,
-                    # "Fail/Total": "{}%".format(round(fail_qty / len(df) * 100, 3)),
-                    # "Reject": reject_qty,
-                    # "Reject/Total": "{}%".format(round(reject_qty / len(df) * 100, 3)),
-                    # "MIN": round(_min[key], 6),
-                    # "MAX": round(_max[key], 6),
-                    "LO_LIMIT_TYPE": item["LO_LIMIT_TYPE"],
-                    "HI_LIMIT_TYPE": item["HI_LIMIT_TYPE"],
-                    "TEXT": key,
-                }
-                cpk_list.append(temp_dict)
-            self.cpk_info_table.setData(cpk_list)
+            df = self.group_df(model_index.data())
+            self.cpk_info_table.setData(ProcessTable.value_table(df, self.calculation))
             return
         if self.radioButton.isChecked():
             """
-            DIFF, 只看均值以及PTR项目
+            DIFF, 两个分组按坐标匹配同一颗DIE, 只看PTR项目
             """
-            diff_compare_df = df
-            length = len(diff_compare_df)
-            start, stop = int(length * 0.05), int(length * 0.95)
-
-            diff_data_list = []
-            df_group = self.jmp_df.groupby(["GROUP", "DA_GROUP"])
-            for item_key, test_item in self.calculation.items():  # type:str, dict
-                if test_item["DATAT_TYPE"] == DatatType.FTR:
-                    continue
-                temp_dict = dict()
-                diff_data_list.append(temp_dict)
-                temp_dict["TEST_ID"] = test_item["TEST_ID"]
-                temp_dict["TEXT"] = test_item["TEXT"]
-                temp_dict["UNITS"] = test_item["UNITS"]
-                temp_dict["LO_LIMIT"] = test_item["LO_LIMIT"]
-                temp_dict["HI_LIMIT"] = test_item["LO_LIMIT"]
-                temp_dict["LO_LIMIT_TYPE"] = test_item["LO_LIMIT_TYPE"]
-                temp_dict["HI_LIMIT_TYPE"] = test_item["HI_LIMIT_TYPE"]
-
-                compare_data = np.mean(sorted(diff_compare_df[item_key].to_list())[start: stop])
-                for key, each_df in df_group:
-                    if not isinstance(key, tuple):
-                        item_name = str(key)
-                    else:
-                        item_name = '@'.join([str(ea) for ea in key])
-                    temp_data = each_df[item_key].to_list()
-                    temp_length = len(each_df)
-                    temp_start, temp_stop = int(temp_length * 0.05), int(temp_length * 0.95)
-                    temp_data = sorted(temp_data)[temp_start: temp_stop]
-                    temp_data = np.mean(temp_data)
-                    gap = compare_data - temp_data
-                    temp_dict[item_name] = gap
-
-            self.cpk_info_table.setData(diff_data_list)
+            groups = self.diff_groups(model_index)
+            if groups is None:
+                return
+            calculation = {
+                key: item for key, item in self.calculation.items() if item["DATAT_TYPE"] != DatatType.FTR
+            }
+            if not calculation:
+                return
+            keys = [each for each in DieMatch.DEFAULT_KEYS if each in self.jmp_df]
+            if not keys:
+                keys = ["PART_TXT"] if "PART_TXT" in self.jmp_df else ["PART_ID"]
+            base_name, other_name = groups
+            df = DieMatch.compare(self.group_df(base_name), self.group_df(other_name), calculation, keys)
+            self.cpk_info_table.setData(df)
+            Print.info("Diff报告: {} - {}".format(other_name, base_name))
             return
 
     def showEvent(self, event: QShowEvent) -> None:
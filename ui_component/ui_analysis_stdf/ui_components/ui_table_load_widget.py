@@ -9,16 +9,16 @@
 from typing import Union
 
 from PySide2.QtCore import Slot, Qt, QTimer, QThread, Signal
-from PySide2.QtGui import QColor, QFont
-from PySide2.QtWidgets import QWidget, QAbstractItemView, QTableWidget, QMessageBox
+from PySide2.QtWidgets import QWidget, QMessageBox
 
 from common.app_variable import GlobalVariable
+from common.cal_interface.capability_table import CapabilityTable
 from common.li import Li, SummaryCore
 from ui_component.ui_analysis_stdf.ui_designer.ui_table_load import Ui_Form as TableLoadForm
 from ui_component.ui_app_variable import UiGlobalVariable
 from ui_component.ui_common.my_text_browser import Print
-from ui_component.ui_common.ui_utils import QTableUtils, QWidgetUtils
-from ui_component.ui_module.table_module import PauseTableWidget
+from ui_component.ui_common.ui_utils import QWidgetUtils
+from ui_component.ui_module.table_module import CapabilityTableView
 
 import pyqtgraph as pg
 
@@ -82,6 +82,7 @@ class TableLoadWidget(QWidget, TableLoadForm):
     li: Li = None
     summary: SummaryCore = None
     th: QthCalculation = None
+    search_timer: QTimer = None
 
     def __init__(self, li: Li, summary: SummaryCore, parent=None):
         super(TableLoadWidget, self).__init__(parent)
@@ -89,9 +90,7 @@ class TableLoadWidget(QWidget, TableLoadForm):
         self.li = li
         self.summary = summary
         self.setWindowTitle("Data TEST NO&ITEM Analysis")
-        self.cpk_info_table = PauseTableWidget(self)  # type:QTableWidget
-        self.cpk_info_table.setSelectionMode(QAbstractItemView.ExtendedSelection)
-        self.cpk_info_table.setEditable(True)
+        self.cpk_info_table = CapabilityTableView(self)
         # self.cpk_info_table.setFont(QFont("", 8))
         # self.cpk_info_table.horizontalHeader().sectionResized.connect(self.get_head_resize)
         self.horizontalLayout.addWidget(self.cpk_info_table)
@@ -101,6 +100,7 @@ class TableLoadWidget(QWidget, TableLoadForm):
         self.horizontalLayout.addWidget(self.gw)
         self.init_plot()
         self.init_table_signal()
+        self.init_search()
         self.init_thread()
 
     def init_thread(self):
@@ -125,11 +125,24 @@ class TableLoadWidget(QWidget, TableLoadForm):
         """
         self.cpk_info_table.horizontalHeader().sortIndicatorChanged.connect(self.plot_scrollbar)
 
+    def init_search(self):
+        """
+        输入时停顿一下再筛选, 回车立即筛选
+        """
+        self.lineEdit.setPlaceholderText("筛选: 文本 / VDD*OS / re:正则 / CPK<1.33 FAIL_RATE>0.1%")
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(lambda: self.search_table(False))
+
     def cal_table(self):
         if self.li.capability_key_list is None:
             return
         self.cpk_info_table.setData(self.li.capability_key_list)
+        self.search_table(False)
         self.cpk_info_table.sortByColumn(GlobalVariable.TEST_ID_COLUMN, Qt.SortOrder.AscendingOrder)
+        # 排序没有变化时不会发出 sortIndicatorChanged
+        self.plot_scrollbar()
         QWidgetUtils.widget_change_color(widget=self, background_color="#3316C6")
 
     def plot_scrollbar(self):
@@ -139,39 +152,24 @@ class TableLoadWidget(QWidget, TableLoadForm):
         QTimer.singleShot(50, self.plot_points)
 
     def plot_points(self):
+        """
+        颜色和点都是按列整体比较出来的, 表格只画看得到的格子
+        """
         self.plot.clear()
-        length = self.cpk_info_table.rowCount()
-        self.plot.setYRange(0, length)
-        x, y, z, cpk_l, top_fail_l, reject_l = [], [], [], [], [], []
-        for index in range(length):
-            cpk_item = self.cpk_info_table.item(index, GlobalVariable.CPK_COLUMN)
-            cpk = float(cpk_item.text())
-            fail_item = self.cpk_info_table.item(index, GlobalVariable.TOP_FAIL_COLUMN)
-            top_fail = float(fail_item.text())
-            reject_item = self.cpk_info_table.item(index, GlobalVariable.REJECT_COLUMN)
-            reject = float(reject_item.text())
-            cpk_item.setBackground(QColor(255, 255, 255))
-            fail_item.setBackground(QColor(255, 255, 255))
-            reject_item.setBackground(QColor(255, 255, 255))
-            if UiGlobalVariable.GraphCpkLoClamp < cpk < UiGlobalVariable.GraphCpkHiClamp:
-                x.append(0)
-                cpk_l.append(length - index)
-                cpk_item.setBackground(QColor(250, 194, 5, 50))
-            if top_fail > UiGlobalVariable.GraphTopFailClamp:
-                y.append(1)
-                top_fail_l.append(length - index)
-                fail_item.setBackground(QColor(217, 83, 25, 150))
-            if reject > UiGlobalVariable.GraphRejectClamp:
-                z.append(2)
-                reject_l.append(length - index)
-                reject_item.setBackground(QColor(217, 83, 25, 30))
+        model = self.cpk_info_table.capability_model
+        order = self.cpk_info_table.filter_model.visible_order()
+        self.plot.setYRange(0, len(order))
+        model.set_clamp(UiGlobalVariable.GraphCpkLoClamp, UiGlobalVariable.GraphCpkHiClamp,
+                        UiGlobalVariable.GraphTopFailClamp, UiGlobalVariable.GraphRejectClamp)
+        cpk_l = model.mask_points(CapabilityTable.CPK, order)
+        top_fail_l = model.mask_points(CapabilityTable.TOP_FAIL, order)
+        reject_l = model.mask_points(CapabilityTable.REJECT, order)
 
         plot = pg.ScatterPlotItem(symbol='s', size=3, pen=None)
-        plot.addPoints(x, cpk_l, pen=(250, 194, 5))
-        plot.addPoints(y, top_fail_l, pen=(217, 83, 25))
-        plot.addPoints(z, reject_l, pen=(217, 83, 25))
+        plot.addPoints([0] * len(cpk_l), cpk_l, pen=(250, 194, 5))
+        plot.addPoints([1] * len(top_fail_l), top_fail_l, pen=(217, 83, 25))
+        plot.addPoints([2] * len(reject_l), reject_l, pen=(217, 83, 25))
         self.plot.addItem(plot)
-        self.cpk_info_table.resizeRowsToContents()
 
     @Slot(bool)
     def on_checkBox_clicked(self, e):
@@ -181,7 +179,7 @@ class TableLoadWidget(QWidget, TableLoadForm):
 
     @Slot()
     def on_pushButton_pressed(self):
-        new_limit = QTableUtils.get_all_new_limit(self.cpk_info_table)
+        new_limit = self.cpk_info_table.get_all_new_limit()
         if not new_limit:
             return
         if self.th.isRunning():
@@ -199,7 +197,7 @@ class TableLoadWidget(QWidget, TableLoadForm):
         只看选中项目PASS的数据
         :return:
         """
-        new_limit = QTableUtils.get_select_new_limit(self.cpk_info_table)
+        new_limit = self.cpk_info_table.get_select_new_limit()
         print(new_limit)
         if not new_limit:
             return
@@ -215,7 +213,7 @@ class TableLoadWidget(QWidget, TableLoadForm):
 
     @Slot()
     def on_pushButton_4_pressed(self):
-        test_ids = QTableUtils.get_table_widget_test_id(self.cpk_info_table)
+        test_ids = self.cpk_info_table.get_select_test_ids()
         if not test_ids:
             return
         print("只对选中项目的数据进行分析")
@@ -229,27 +227,29 @@ class TableLoadWidget(QWidget, TableLoadForm):
             self.th.set_only_pass(True)
         self.th.start()
 
-    def cpk_table_row_hide(self, hide: bool):
-        for i in range(self.cpk_info_table.rowCount()):
-            self.cpk_info_table.setRowHidden(i, hide)
-
-    @Slot()
-    def on_lineEdit_returnPressed(self):
+    def search_table(self, show_message: bool):
         """
-        若可以查询到, 先隐藏所有行
+        :param show_message: 回车时才弹出提示, 输入过程中不提示
         """
-        regex = self.lineEdit.text()
-        regex = "*{}*".format(regex)
-        items = self.cpk_info_table.findItems(regex, Qt.MatchWildcard)
-        if len(items) == 0:
-            self.li.QStatusMessage.emit("无法根据筛选条件查询到匹配行@!显示所有行.")
-            self.cpk_table_row_hide(False)
+        try:
+            count = self.cpk_info_table.search(self.lineEdit.text())
+        except ValueError as err:
+            if show_message:
+                self.li.QStatusMessage.emit(str(err))
             return
-        self.cpk_table_row_hide(True)
-        for each in items:
-            if each.column() not in {GlobalVariable.TEST_NUM_COLUMN, GlobalVariable.TEST_TXT_COLUMN}:
-                continue
-            self.cpk_info_table.setRowHidden(each.row(), False)
+        if count == 0 and show_message:
+            self.li.QStatusMessage.emit("无法根据筛选条件查询到匹配行@!显示所有行.")
+            self.cpk_info_table.search("")
+        self.plot_scrollbar()
+
+    @Slot(str)
+    def on_lineEdit_textChanged(self, _):
+        self.search_timer.start()
+
+    @Slot()
+    def on_lineEdit_returnPressed(self):
+        self.search_timer.stop()
+        self.search_table(True)
 
     def message_show(self, text: str) -> bool:
         res = QMessageBox.question(self, '待确认', text,
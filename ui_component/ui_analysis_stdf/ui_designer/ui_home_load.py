@@ -65,6 +65,19 @@ class Ui_MainWindow(object):
         icon8 = QIcon()
         icon8.addFile(u":/pyqt/source/images/lc_aligndown.png", QSize(), QIcon.Normal, QIcon.Off)
         self.action_qt_distribution_trans.setIcon(icon8)
+        self.action_qt_mapping = QAction(MainWindow)
+        self.action_qt_mapping.setObjectName(u"action_qt_mapping")
+        icon9 = QIcon()
+        icon9.addFile(u":/pyqt/source/images/lc_charmapcontrol.png", QSize(), QIcon.Normal, QIcon.Off)
+        self.action_qt_mapping.setIcon(icon9)
+        self.action_qt_bin_pareto = QAction(MainWindow)
+        self.action_qt_bin_pareto.setObjectName(u"action_qt_bin_pareto")
+        icon10 = QIcon()
+        icon10.addFile(u":/pyqt/source/images/lc_drawchart.png", QSize(), QIcon.Normal, QIcon.Off)
+        self.action_qt_bin_pareto.setIcon(icon10)
+        self.action_save_stdf = QAction(MainWindow)
+        self.action_save_stdf.setObjectName(u"action_save_stdf")
+        self.action_save_stdf.setIcon(icon1)
         self.centralwidget = QWidget(MainWindow)
         self.centralwidget.setObjectName(u"centralwidget")
         MainWindow.setCentralWidget(self.centralwidget)
@@ -77,6 +90,7 @@ class Ui_MainWindow(object):
 
         self.toolBar.addSeparator()
         self.toolBar.addAction(self.action_sava_data)
+        self.toolBar.addAction(self.action_save_stdf)
         self.toolBar.addSeparator()
         self.toolBar.addAction(self.action_dock_structure)
         self.toolBar.addSeparator()
@@ -89,6 +103,8 @@ class Ui_MainWindow(object):
         self.toolBar.addAction(self.action_qt_scatter)
         self.toolBar.addAction(self.action_qt_distribution_trans)
         self.toolBar.addAction(self.action_qt_visual_map)
+        self.toolBar.addAction(self.action_qt_mapping)
+        self.toolBar.addAction(self.action_qt_bin_pareto)
 
         self.retranslateUi(MainWindow)
 
@@ -129,6 +145,18 @@ class Ui_MainWindow(object):
         self.action_qt_distribution_trans.setText(QCoreApplication.translate("MainWindow", u"distribution_trans", None))
 #if QT_CONFIG(tooltip)
         self.action_qt_distribution_trans.setToolTip(QCoreApplication.translate("MainWindow", u"\u6a2a\u5411\u5206\u5e03\u56fe", None))
+#endif // QT_CONFIG(tooltip)
+        self.action_qt_mapping.setText(QCoreApplication.translate("MainWindow", u"bin_map", None))
+#if QT_CONFIG(tooltip)
+        self.action_qt_mapping.setToolTip(QCoreApplication.translate("MainWindow", u"Bin Map", None))
+#endif // QT_CONFIG(tooltip)
+        self.action_qt_bin_pareto.setText(QCoreApplication.translate("MainWindow", u"bin_pareto", None))
+#if QT_CONFIG(tooltip)
+        self.action_qt_bin_pareto.setToolTip(QCoreApplication.translate("MainWindow", u"FAIL BIN\u67cf\u62c9\u56fe", None))
+#endif // QT_CONFIG(tooltip)
+        self.action_save_stdf.setText(QCoreApplication.translate("MainWindow", u"save_stdf", None))
+#if QT_CONFIG(tooltip)
+        self.action_save_stdf.setToolTip(QCoreApplication.translate("MainWindow", u"\u6570\u636e\u7a7a\u95f4\u4e2d\u7684\u6570\u636e\u53e6\u5b58\u4e3aSTDF", None))
 #endif // QT_CONFIG(tooltip)
         self.toolBar.setWindowTitle(QCoreApplication.translate("MainWindow", u"toolBar", None))
     # retranslateUi
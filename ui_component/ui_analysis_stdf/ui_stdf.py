@@ -17,19 +17,19 @@ import numpy as np
 import pandas as pd
 from PySide2.QtCore import Slot, QTimer, Qt, Signal
 from PySide2.QtGui import QCloseEvent
-from PySide2.QtWidgets import QMainWindow, QApplication, QWidget, QMessageBox
+from PySide2.QtWidgets import QMainWindow, QApplication, QWidget, QMessageBox, QFileDialog
 
 from pyqtgraph.dockarea import *
 
 from chart_core.chart_pyqtgraph.core.mixin import ChartType
 from chart_core.chart_pyqtgraph.poll import ChartDockWindow
 from common.li import Li, SummaryCore
+from ui_component.ui_common.qt_li import QtLi
 from ui_component.ui_analysis_stdf.ui_components.ui_data_group import DataGroupWidget
 from ui_component.ui_analysis_stdf.ui_components.ui_processing import ProcessWidget
 from ui_component.ui_common.my_text_browser import Print
 from ui_component.ui_common.ui_console import ConsoleWidget
 from ui_component.ui_analysis_stdf.ui_designer.ui_home_load import Ui_MainWindow
-from ui_component.ui_common.ui_utils import QTableUtils
 from ui_component.ui_analysis_stdf.ui_components.ui_file_load_widget import FileLoadWidget  # 文件选取
 from ui_component.ui_analysis_stdf.ui_components.ui_tree_load_widget import TreeLoadWidget  # 载入的数据选取
 from ui_component.ui_analysis_stdf.ui_components.ui_table_load_widget import TableLoadWidget  # 测试项选取
@@ -160,9 +160,10 @@ class StdfLoadUi(QMainWindow, Ui_MainWindow):
 
     def init_signal(self):
         self.stdf_select_widget.finished.connect(self.tree_load_widget.set_tree)
-        self.li.QCalculation.connect(self.q_calculation)
-        self.li.QMessage.connect(self.message_show)
-        self.li.QStatusMessage.connect(self.mdi_space_message_emit)
+        li_signal = QtLi.of(self.li)
+        li_signal.QCalculation.connect(self.q_calculation)
+        li_signal.QMessage.connect(self.message_show)
+        li_signal.QStatusMessage.connect(self.mdi_space_message_emit)
 
     def q_calculation(self):
         self.table_load_widget.cal_table()
@@ -183,6 +184,17 @@ class StdfLoadUi(QMainWindow, Ui_MainWindow):
     def on_action_sava_data_triggered(self):
         """ 将数据保存在csv文件中 """
 
+    @Slot()
+    def on_action_save_stdf_triggered(self):
+        """ 数据空间中(筛选/更新Limit后)的数据另存为STDF """
+        if self.li.df_module is None:
+            return Print.warning("请先将数据载入到数据空间中@!!!")
+        path, _ = QFileDialog.getSaveFileName(self, "Save STDF", "data.stdf", filter="stdf(*.stdf *.std)")
+        if not path:
+            return
+        size = self.li.save_stdf(path)
+        Print.info("STDF保存完成: {}, {}MB".format(path, round(size / 1024 / 1024, 2)))
+
     @Slot()
     def on_action_console_triggered(self):
         if self.action_console.isChecked():
@@ -217,7 +229,7 @@ class StdfLoadUi(QMainWindow, Ui_MainWindow):
 
         :return:
         """
-        return QTableUtils.get_table_widget_test_id(self.table_load_widget.cpk_info_table)
+        return self.table_load_widget.cpk_info_table.get_select_test_ids()
 
     def get_text_column(self) -> Union[List[str], None]:
         """
@@ -267,8 +279,23 @@ class StdfLoadUi(QMainWindow, Ui_MainWindow):
 
     @Slot()
     def on_action_qt_mapping_triggered(self):
-        """ 使用PYQT来拉出Mapping图 """
-        pass
+        """ 使用PYQT来拉出Bin Mapping图 """
+        if self.li.to_chart_csv_data is None or self.li.to_chart_csv_data.df is None:
+            return Print.warning("无数据作用@!!!")
+        bin_head = "SOFT_BIN" if self.message_show("SOFT_BIN(Yes) OR HARD_BIN(No) ? @") else "HARD_BIN"
+        self.chart_ui.add_chart_dock([bin_head], ChartType.BinMap)
+        self.chart_ui.show()
+        self.chart_ui.raise_()
+
+    @Slot()
+    def on_action_qt_bin_pareto_triggered(self):
+        """ 使用PYQT来拉出FAIL BIN柏拉图 """
+        if self.li.to_chart_csv_data is None or self.li.to_chart_csv_data.df is None:
+            return Print.warning("无数据作用@!!!")
+        bin_head = "SOFT_BIN" if self.message_show("SOFT_BIN(Yes) OR HARD_BIN(No) ? @") else "HARD_BIN"
+        self.chart_ui.add_chart_dock([bin_head], ChartType.BinPareto)
+        self.chart_ui.show()
+        self.chart_ui.raise_()
 
     @Slot()
     def on_action_qt_visual_map_triggered(self):
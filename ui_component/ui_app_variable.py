@@ -48,6 +48,9 @@ class UiGlobalVariable:
     JmpMeanAddSubSigma = 3
     JmpPlotColumn = 1
     JmpPlotFloatRound = 9
+    JmpCsvFloatRound = 6
+    JmpExportFormat = "CSV"
+    JmpExportCacheSize = 4096
     # --------------------------------------------------------------- 参数
     JMP_PARAMS = [
         {
@@ -83,6 +86,16 @@ class UiGlobalVariable:
 
                 {'name': language.JmpSetting["JmpPlotFloatRound"], 'type': 'int',
                  'value': JmpPlotFloatRound},
+
+                {'name': language.JmpSetting["JmpCsvFloatRound"], 'type': 'int',
+                 'value': JmpCsvFloatRound, 'max': 12, 'min': 0},
+
+                {'name': language.JmpSetting["JmpExportFormat"], 'type': 'list',
+                 'value': JmpExportFormat,
+                 'limits': {"CSV": "CSV", "Parquet(JMP18+)": "PARQUET"}},
+
+                {'name': language.JmpSetting["JmpExportCacheSize"], 'type': 'int',
+                 'value': JmpExportCacheSize, 'min': 0},
             ]
         },
     ]
@@ -102,6 +115,8 @@ class UiGlobalVariable:
     GraphCpkHiClamp = 1
     GraphTopFailClamp = 0
     GraphRejectClamp = 0
+    GraphMapDuplicate = "LAST"
+    GraphDataCacheSize = 256
     # --------------------------------------------------------------- 参数
     GRAPH_PARAMS = [
         {
@@ -144,6 +159,13 @@ class UiGlobalVariable:
 
                 {'name': language.GraphSetting["GraphPlotFloatRound"], 'type': 'int',
                  'value': GraphPlotFloatRound},
+
+                {'name': language.GraphSetting["GraphMapDuplicate"], 'type': 'list',
+                 'value': GraphMapDuplicate,
+                 'limits': {"LAST": "LAST", "FIRST": "FIRST", "MEAN": "MEAN", "WORST": "WORST"}},
+
+                {'name': language.GraphSetting["GraphDataCacheSize"], 'type': 'int',
+                 'value': GraphDataCacheSize, 'min': 16},
             ]
         },
     ]
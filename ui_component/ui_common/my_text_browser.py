@@ -7,11 +7,17 @@
 @Time    : 2022/10/22 20:55
 @Mark    : 
 """
-from PySide2.QtCore import Qt
+import html
+import sys
+from typing import List, Tuple
+
+from PySide2.QtCore import Qt, QObject, QTimer
 from PySide2.QtWidgets import QTextBrowser
 
 import datetime as dt
 
+from common.log_buffer import LogBuffer
+
 
 class Print:
     INFO = "00"
@@ -74,6 +80,7 @@ class UiMessage:
 
 class MQTextBrowser(QTextBrowser):
     skip_output = {'\n'}
+    CODES = {Print.INFO, Print.ERROR, Print.WARNING, Print.DEBUG}
 
     def __init__(self, parent=None):
         super(MQTextBrowser, self).__init__(parent)
@@ -96,3 +103,50 @@ class MQTextBrowser(QTextBrowser):
     def m_append(self, mes: UiMessage):
         string = "<font color=\"{}\">{}</font>".format(mes.color, mes.string)
         self.append(string)
+
+    @staticmethod
+    def line_message(line: str) -> UiMessage:
+        """ Print 输出的 "00:===..." 按code上色, 其他的原样 """
+        code, _, string = line.partition(':')
+        if code in MQTextBrowser.CODES:
+            return UiMessage(code=code, string=string)
+        return UiMessage(string=line)
+
+    def append_lines(self, lines: List[Tuple[bool, str]]):
+        """
+        LogSink 一次写入多行, 只append一次
+        :param lines: [(是否stderr, 一行)]
+        """
+        messages = [UiMessage.error(line) if error else self.line_message(line) for error, line in lines]
+        self.append("<br>".join(
+            "<font color=\"{}\">{}</font>".format(mes.color, html.escape(mes.string)) for mes in messages
+        ))
+
+
+class LogSink(QObject):
+    """
+    代替 sys.stdout/sys.stderr, print 只是放进 LogBuffer, 不再每次都 processEvents
+    GUI线程中定时取出写到 MQTextBrowser, 一次最多 MAX_WRITES 次write, 剩下的下次再写
+    """
+    INTERVAL = 100  # ms
+    MAX_WRITES = 5000
+
+    def __init__(self, text_browser: MQTextBrowser, parent=None):
+        super(LogSink, self).__init__(parent)
+        self.text_browser = text_browser
+        self.buffer = LogBuffer()
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.flush)
+
+    def install(self):
+        sys.stdout, sys.stderr = self.buffer.stdout, self.buffer.stderr
+        self.timer.start(self.INTERVAL)
+
+    def uninstall(self):
+        self.timer.stop()
+        sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+
+    def flush(self):
+        lines = self.buffer.drain(self.MAX_WRITES)
+        if lines:
+            self.text_browser.append_lines(lines)
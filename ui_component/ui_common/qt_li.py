@@ -0,0 +1,38 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+@File    : qt_li.py
+@Author  : Link
+@Time    : 2023/2/25 14:20
+@Mark    : Li 不再是QObject, 界面中用这里的Signal
+    Li 的 LiEvent 在emit的线程中直接调用, 转成Qt的Signal后跨线程的槽由Qt排队到GUI线程
+"""
+from PySide2.QtCore import QObject, Signal
+
+from common.li import Li
+
+
+class QtLi(QObject):
+    """
+    和 Li 中的事件同名, connect 的写法不变:
+        QtLi.of(self.li).QCalculation.connect(self.q_calculation)
+    """
+    QCalculation = Signal()
+    QMessage = Signal(str)
+    QStatusMessage = Signal(str)
+
+    QChartSelect = Signal()
+    QChartRefresh = Signal()
+
+    def __init__(self, li: Li, parent=None):
+        super(QtLi, self).__init__(parent)
+        self.li = li
+        for name in Li.EVENTS:
+            getattr(li, name).connect(getattr(self, name).emit)
+
+    @staticmethod
+    def of(li: Li) -> "QtLi":
+        if li.qt_signal is None:
+            li.qt_signal = QtLi(li)
+        return li.qt_signal
@@ -11,7 +11,9 @@ from typing import Dict
 from PySide2.QtWidgets import QWidget, QListWidgetItem, QCheckBox
 from PySide2.QtCore import Slot, Qt, Signal
 
+from common.cal_interface.data_merge import DataMerge
 from ui_component.ui_common.ui_utils import MdiLoad
+from ui_component.ui_main.mdi_data_merge import MergeKeyWidget
 from ui_component.ui_main.ui_designer.ui_mdi_data_contact import Ui_Form
 
 import pandas as pd
@@ -20,7 +22,7 @@ import pandas as pd
 class ContactWidget(QWidget, Ui_Form):
     id_cache = None
     mdi_cache = None
-    dataSignal = Signal(pd.DataFrame)  # 送出SummaryCore
+    dataSignal = Signal(pd.DataFrame, str, object)  # 送出SummaryCore, Merge的KEY和对应表
     messageSignal = Signal(str)  # 追加文本信息
 
     def __init__(self, parent=None, icon=None):
@@ -28,6 +30,10 @@ class ContactWidget(QWidget, Ui_Form):
         self.setupUi(self)
         self.setWindowIcon(icon)
         self.setWindowFlags(self.windowFlags() | Qt.WindowStaysOnTopHint)
+        self.merge_key_widget = MergeKeyWidget(self)
+        self.merge_key_widget.messageSignal.connect(self.messageSignal)
+        self.verticalLayout.insertWidget(self.verticalLayout.indexOf(self.pushButton), self.merge_key_widget)
+        self.pushButton.setText("Merge并载入")
 
     def insert(self, mdi_cache: Dict[int, MdiLoad]):
         self.listWidget.clear()
@@ -68,5 +74,8 @@ class ContactWidget(QWidget, Ui_Form):
                 return self.messageSignal.emit("有mdi中的数据并未做载入动作")
             new_summary_list.append(mdi.summary.summary_df)
 
-        self.dataSignal.emit(pd.concat(new_summary_list))
+        key, mapping = self.merge_key_widget.key(), self.merge_key_widget.mapping
+        if key == DataMerge.MAPPING and mapping is None:
+            return self.messageSignal.emit("请先载入测试项对应表")
+        self.dataSignal.emit(pd.concat(new_summary_list), key, mapping)
         self.messageSignal.emit("Concat数据传送完成")
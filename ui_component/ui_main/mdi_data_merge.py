@@ -7,4 +7,56 @@
 @Time    : 2022/12/11 13:19
 @Mark    : Merge是一个非常复杂的事情
            Merge中, 需要对TEST_NO进行一下处理
+           测试项的对应方式在这里选, 计算在 DataMerge 中
 """
+from typing import Union
+
+import pandas as pd
+from PySide2.QtCore import Signal, Slot
+from PySide2.QtWidgets import QWidget, QHBoxLayout, QLabel, QComboBox, QPushButton, QFileDialog
+
+from common.cal_interface.data_merge import DataMerge
+
+
+class MergeKeyWidget(QWidget):
+    """
+    ContactWidget 中选择测试项的对应方式, MAPPING 需要先载入对应表
+    """
+    KEY_NAMES = {
+        DataMerge.TEXT: "TEST_NUM:TEST_TXT",
+        DataMerge.TEST_NUM: "TEST_NUM",
+        DataMerge.TEXT_93K: "TEST_NUM:TEST_TXT (去掉@之后)",
+        DataMerge.MAPPING: "对应表 (TEXT, KEY)",
+    }
+    messageSignal = Signal(str)
+
+    mapping = None  # type:Union[pd.DataFrame, None]
+
+    def __init__(self, parent=None):
+        super(MergeKeyWidget, self).__init__(parent)
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(QLabel("测试项对应", self))
+        self.comboBox = QComboBox(self)
+        for key in DataMerge.KEYS:
+            self.comboBox.addItem(self.KEY_NAMES[key], key)
+        layout.addWidget(self.comboBox, 1)
+        self.pushButton = QPushButton("载入对应表", self)
+        self.pushButton.clicked.connect(self.load_mapping)
+        layout.addWidget(self.pushButton)
+
+    def key(self) -> str:
+        return self.comboBox.currentData()
+
+    @Slot()
+    def load_mapping(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Open Mapping File", filter="mapping(*.csv;*.xlsx)")
+        if not path:
+            return
+        try:
+            self.mapping = DataMerge.load_mapping(path)
+        except Exception as err:
+            self.mapping = None
+            return self.messageSignal.emit("对应表载入失败: {}".format(err))
+        self.comboBox.setCurrentIndex(DataMerge.KEYS.index(DataMerge.MAPPING))
+        self.messageSignal.emit("对应表载入完成, {}个测试项".format(len(self.mapping)))
@@ -10,34 +10,94 @@
 import pandas as pd
 import psutil
 import datetime as dt
-from typing import List, Dict, Union
+from typing import List, Dict, Union, Callable
 import gc
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from threading import Lock
 
-from PySide2.QtCore import QTimer, Slot, Qt, QObject
+from PySide2.QtCore import QTimer, Slot, Qt, QObject, QThread, Signal
 from PySide2.QtGui import QIcon, QPixmap
 from PySide2.QtWidgets import QMainWindow, QApplication, QWidget, QVBoxLayout, QMdiArea, QMessageBox, \
     QInputDialog, QAction
 
 from pyqtgraph.dockarea import *
 
-from chart_core.chart_jmp.jmp_box import JmpBox
-from chart_core.chart_jmp.jmp_factory import JmpFactory
-from chart_core.chart_jmp.jmp_file import JmpFile
-from chart_core.chart_jmp.jmp_plot import JmpPlot
-from chart_core.chart_jmp.jmp_script_factory import JmpScript
-from chart_core.chart_jmp_factory.class_jmp_factory import NewJmpFactory
 from chart_core.chart_pyqtgraph.ui_components.chart_sample_line import PyqtCanvas
 from common.app_variable import GlobalVariable
+from common.cal_interface.data_merge import DataMerge
+from common.lazy_import import LazyImport
 from ui_component.ui_common.my_text_browser import UiMessage, MQTextBrowser
 from ui_component.ui_common.ui_utils import MdiLoad
-from ui_component.ui_main.mdi_data_concat import ContactWidget
 from ui_component.ui_main.ui_designer.ui_main import Ui_MainWindow
-from ui_component.ui_main.ui_jmp_select import JmpSelect
+from ui_component.ui_main.ui_performance import PerformanceWidget
 from ui_component.ui_main.ui_setting import SettingWidget
-from ui_component.ui_main.mapping_select import MappingSelect
-from ui_component.ui_analysis_stdf.ui_stdf import StdfLoadUi
 from ui_component.ui_app_variable import UiGlobalVariable
 
+" 第一次用到时才import, 见 LazyImport; 启动时间见 app_test/startup_test.py "
+JmpBox = LazyImport("chart_core.chart_jmp.jmp_box", "JmpBox")
+JmpFactory = LazyImport("chart_core.chart_jmp.jmp_factory", "JmpFactory")
+JmpFile = LazyImport("chart_core.chart_jmp.jmp_file", "JmpFile")
+JmpPlot = LazyImport("chart_core.chart_jmp.jmp_plot", "JmpPlot")
+JmpScript = LazyImport("chart_core.chart_jmp.jmp_script_factory", "JmpScript")
+NewJmpFactory = LazyImport("chart_core.chart_jmp_factory.class_jmp_factory", "NewJmpFactory")
+DataExport = LazyImport("common.export_interface.data_export", "DataExport")
+ContactWidget = LazyImport("ui_component.ui_main.mdi_data_concat", "ContactWidget")
+JmpSelect = LazyImport("ui_component.ui_main.ui_jmp_select", "JmpSelect")
+MappingSelect = LazyImport("ui_component.ui_main.mapping_select", "MappingSelect")
+StdfLoadUi = LazyImport("ui_component.ui_analysis_stdf.ui_stdf", "StdfLoadUi")
+
+
+class QthDataExport(QThread):
+    """
+    后台导出JMP的数据文件, 多个文件时每个文件一个线程并行写入
+    任务: (df, file_path, callback), 每个文件写完后通过fileSignal回到GUI线程执行callback(file_path)
+    """
+    progressSignal = Signal(int)
+    fileSignal = Signal(object)
+    messageSignal = Signal(str)
+
+    def __init__(self, parent=None):
+        super(QthDataExport, self).__init__(parent)
+        self.tasks = []
+        self.progress = {}
+        self.lock = Lock()
+
+    def set_tasks(self, tasks: list):
+        self.tasks = tasks
+        self.progress = {index: 0 for index in range(len(tasks))}
+
+    def task_progress(self, index: int, value: int):
+        with self.lock:
+            self.progress[index] = value
+            total = sum(self.progress.values()) // max(len(self.progress), 1)
+        self.progressSignal.emit(total)
+
+    def write(self, index: int, df: pd.DataFrame, file_path: str):
+        file_path, _ = DataExport.cached_write(
+            df, os.path.dirname(file_path), UiGlobalVariable.JmpExportFormat,
+            precision=UiGlobalVariable.JmpCsvFloatRound,
+            max_bytes=UiGlobalVariable.JmpExportCacheSize * 1024 * 1024,
+            progress=lambda value: self.task_progress(index, value)
+        )
+        return file_path
+
+    def run(self) -> None:
+        workers = max(min(len(self.tasks), os.cpu_count() or 1), 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self.write, index, df, file_path): callback
+                for index, (df, file_path, callback) in enumerate(self.tasks)
+            }
+            for future in as_completed(futures):
+                try:
+                    file_path = future.result()
+                except Exception as err:
+                    self.messageSignal.emit("CSV数据产生失败!!! {}".format(repr(err)))
+                    continue
+                self.fileSignal.emit((futures[future], file_path))
+        self.tasks = []
+
 
 class Main_Ui(QMainWindow, Ui_MainWindow):
     mdi_count = 0
@@ -98,15 +158,23 @@ class Main_Ui(QMainWindow, Ui_MainWindow):
         self.area.addDock(dock_monitor, "bottom", dock_text_browser)
         self.area.moveDock(dock_text_browser, 'above', dock_monitor)
 
-        self.mapping_select_dialog = MappingSelect(None, self.icon)
-        self.mapping_select_dialog.bin_signal.connect(self.jmp_mapping_init_with_run)
+        " 各个函数的耗时, 见 common/trace.py "
+        self.performance_widget = PerformanceWidget(self)
+        self.performance_widget.messageSignal.connect(self.mdi_space_message_emit)
+        dock_performance = Dock("Performance", size=(100, 300))
+        dock_performance.addWidget(self.performance_widget)
+        self.area.addDock(dock_performance, "above", dock_monitor)
+        self.area.moveDock(dock_text_browser, 'above', dock_performance)
 
-        self.jmp_select_dialog = JmpSelect(None, self.icon)
-        self.jmp_select_dialog.itemSignal.connect(self.jmp_models_init_with_run)
+        " 对话框第一次打开时再生成, 见 mapping_select_dialog 等 "
+        self.dialogs = {}
 
-        self.mdi_contact_dialog = ContactWidget(None, self.icon)
-        self.mdi_contact_dialog.messageSignal.connect(self.mdi_space_message_emit)
-        self.mdi_contact_dialog.dataSignal.connect(self.mdi_space_data_contact)
+        self.data_export_th = QthDataExport(self)
+        self.data_export_th.progressSignal.connect(
+            lambda x: self.mdi_space_message_emit("数据导出中: {}%".format(x))
+        )
+        self.data_export_th.messageSignal.connect(self.mdi_space_message_emit)
+        self.data_export_th.fileSignal.connect(self.data_export_file_finish)
 
         self.recode_timer = QTimer(self)
         self.recode_timer.timeout.connect(self.recode_system_status)
@@ -120,6 +188,28 @@ class Main_Ui(QMainWindow, Ui_MainWindow):
                 action: QAction = getattr(self, each.name)
                 action.setVisible(False)
 
+    @property
+    def mapping_select_dialog(self):
+        if "mapping" not in self.dialogs:
+            dialog = self.dialogs["mapping"] = MappingSelect(None, self.icon)
+            dialog.bin_signal.connect(self.jmp_mapping_init_with_run)
+        return self.dialogs["mapping"]
+
+    @property
+    def jmp_select_dialog(self):
+        if "jmp" not in self.dialogs:
+            dialog = self.dialogs["jmp"] = JmpSelect(None, self.icon)
+            dialog.itemSignal.connect(self.jmp_models_init_with_run)
+        return self.dialogs["jmp"]
+
+    @property
+    def mdi_contact_dialog(self):
+        if "contact" not in self.dialogs:
+            dialog = self.dialogs["contact"] = ContactWidget(None, self.icon)
+            dialog.messageSignal.connect(self.mdi_space_message_emit)
+            dialog.dataSignal.connect(self.mdi_space_data_contact)
+        return self.dialogs["contact"]
+
     def m_append(self, mes: UiMessage):
         self.text_browser.m_append(mes)
 
@@ -251,21 +341,33 @@ class Main_Ui(QMainWindow, Ui_MainWindow):
             return
         jmp_df, temp_calculation = data
         if self.setting.comboBox.currentText() == UiGlobalVariable.PLOT_BACKEND[0]:
+            if self.data_export_th.isRunning():
+                return self.mdi_space_message_emit('数据导出中, 请稍后再试!!!')
+            if jmp_df is None or len(jmp_df) == 0:
+                return self.mdi_space_message_emit('未查询 空数据无法保存!!! ')
             if UiGlobalVariable.JmpPlotSeparation:
-                for key, df in jmp_df.groupby("GROUP"):
-                    save_csv_path = "{}/temp_{}.csv".format(GlobalVariable.JMP_CACHE_PATH, key)
-                    self.jmp_distribution_show(df, temp_calculation, title=key, save_csv=save_csv_path)
+                # 每个GROUP一个文件, 并行导出, 哪个先写完就先跑哪个JSL
+                groups = [(key, key, df) for key, df in jmp_df.groupby("GROUP")]
             else:
-                save_csv_path = "{}/temp_{}.csv".format(GlobalVariable.JMP_CACHE_PATH, 'all_data')
-                self.jmp_distribution_show(jmp_df, temp_calculation, save_csv=save_csv_path)
-
-    def jmp_distribution_show(self, jmp_df, temp_calculation, title: str = "dis_all",
-                              save_csv: str = "D:/1_STDF/JMP_CACHE/temp_jmp_data.csv"):
-        csv_file_path = self.save_df_to_csv(jmp_df, save_csv)
-        if csv_file_path is None:
-            return self.mdi_space_message_emit('CSV数据产生失败!!!@')
+                groups = [("dis_all", "all_data", jmp_df)]
+            tasks = []
+            for title, csv_name, df in groups:
+                tasks.append((
+                    df, "{}/temp_{}.csv".format(GlobalVariable.JMP_CACHE_PATH, csv_name),
+                    lambda path, t=title: self.jmp_distribution_show(path, temp_calculation, title=t)
+                ))
+            self.data_export_th.set_tasks(tasks)
+            self.data_export_th.start()
+
+    @Slot(object)
+    def data_export_file_finish(self, data: tuple):
+        callback, file_path = data
+        self.mdi_space_message_emit(f'数据保存成功,路径在:>>>{file_path},开始执行JMP脚本')
+        callback(file_path)
+
+    def jmp_distribution_show(self, csv_file_path: str, temp_calculation, title: str = "dis_all"):
         jmp_script = JmpScript.factory(
-            JmpFile.load_csv_file(csv_file_path),
+            JmpFile.load_file(csv_file_path),
             NewJmpFactory.jmp_distribution(
                 capability=temp_calculation, title=title
             )
@@ -285,18 +387,16 @@ class Main_Ui(QMainWindow, Ui_MainWindow):
             return
         jmp_df, temp_calculation = data
         if self.setting.comboBox.currentText() == UiGlobalVariable.PLOT_BACKEND[0]:
-            distribution_csv_path = self.save_df_to_csv(
-                jmp_df, "{}/temp_{}.csv".format(GlobalVariable.JMP_CACHE_PATH, script_name)
-            )
-            if distribution_csv_path is None:
-                return self.message_show('CSV数据产生失败!!! ')
-            jmp_script = JmpScript.factory(
-                JmpFile.load_csv_file(distribution_csv_path),
-                NewJmpFactory.jmp_distribution_trans_bar(capability=temp_calculation)
-            )
-            JmpFile.save_with_run_script(
-                jmp_script, scrip_name="{}/temp_{}.jsl".format(GlobalVariable.JMP_CACHE_PATH, script_name)
-            )
+            def run(distribution_csv_path: str):
+                jmp_script = JmpScript.factory(
+                    JmpFile.load_file(distribution_csv_path),
+                    NewJmpFactory.jmp_distribution_trans_bar(capability=temp_calculation)
+                )
+                JmpFile.save_with_run_script(
+                    jmp_script, scrip_name="{}/temp_{}.jsl".format(GlobalVariable.JMP_CACHE_PATH, script_name)
+                )
+
+            self.export_with_run(jmp_df, "{}/temp_{}.csv".format(GlobalVariable.JMP_CACHE_PATH, script_name), run)
 
     @Slot()
     def on_action_comparing_triggered(self, script_name='fit_plot_data'):
@@ -309,17 +409,16 @@ class Main_Ui(QMainWindow, Ui_MainWindow):
             return
         jmp_df, temp_calculation = data
         if self.setting.comboBox.currentText() == UiGlobalVariable.PLOT_BACKEND[0]:
-            fit_csv_path = self.save_df_to_csv(jmp_df,
-                                               "{}/temp_{}.csv".format(GlobalVariable.JMP_CACHE_PATH, script_name))
-            if fit_csv_path is None:
-                return self.message_show(f'CSV数据产生失败!!! ')
-            jmp_script = JmpScript.factory(
-                JmpFile.load_csv_file(fit_csv_path),
-                JmpFactory.comparing(temp_calculation)
-            )
-            JmpFile.save_with_run_script(
-                jmp_script, scrip_name='{}/temp_{}.jsl'.format(GlobalVariable.JMP_CACHE_PATH, script_name)
-            )
+            def run(fit_csv_path: str):
+                jmp_script = JmpScript.factory(
+                    JmpFile.load_file(fit_csv_path),
+                    JmpFactory.comparing(temp_calculation)
+                )
+                JmpFile.save_with_run_script(
+                    jmp_script, scrip_name='{}/temp_{}.jsl'.format(GlobalVariable.JMP_CACHE_PATH, script_name)
+                )
+
+            self.export_with_run(jmp_df, "{}/temp_{}.csv".format(GlobalVariable.JMP_CACHE_PATH, script_name), run)
 
     @Slot()
     def on_action_linear_triggered(self, script_name='jmp_point_data'):
@@ -341,24 +440,23 @@ class Main_Ui(QMainWindow, Ui_MainWindow):
         if remark not in mdi.li.capability_key_dict:
             test_id_list.append(remark)
         jmp_df, temp_calculation = mdi.li.get_unstack_data_to_csv_or_jmp_or_altair(test_id_list)
-        fit_csv_path = self.save_df_to_csv(
-            jmp_df, "{}/temp_{}.csv".format(GlobalVariable.JMP_CACHE_PATH, script_name)
-        )
-        if fit_csv_path is None:
-            return self.message_show(f'CSV数据产生失败!!! ')
-        jmp_script = JmpScript.factory(
-            JmpFile.load_csv_file(fit_csv_path),
-            JmpBox.new_window(JmpBox.new_outline_box(
-                *JmpBox.new_group_item(
-                    *[JmpPlot.line_fit(self.li.get_text_by_test_id(remark), arg, group=True)
-                      for arg in temp_calculation.keys()],
-                    col=UiGlobalVariable.JmpPlotColumn
-                )
-            ))
-        )
-        JmpFile.save_with_run_script(
-            jmp_script, scrip_name='{}/temp_{}.jsl'.format(GlobalVariable.JMP_CACHE_PATH, script_name)
-        )
+
+        def run(fit_csv_path: str):
+            jmp_script = JmpScript.factory(
+                JmpFile.load_file(fit_csv_path),
+                JmpBox.new_window(JmpBox.new_outline_box(
+                    *JmpBox.new_group_item(
+                        *[JmpPlot.line_fit(self.li.get_text_by_test_id(remark), arg, group=True)
+                          for arg in temp_calculation.keys()],
+                        col=UiGlobalVariable.JmpPlotColumn
+                    )
+                ))
+            )
+            JmpFile.save_with_run_script(
+                jmp_script, scrip_name='{}/temp_{}.jsl'.format(GlobalVariable.JMP_CACHE_PATH, script_name)
+            )
+
+        self.export_with_run(jmp_df, "{}/temp_{}.csv".format(GlobalVariable.JMP_CACHE_PATH, script_name), run)
 
     @Slot()
     def on_action_scatter_triggered(self, script_name='distribution_scatter'):
@@ -371,18 +469,16 @@ class Main_Ui(QMainWindow, Ui_MainWindow):
             return
         jmp_df, temp_calculation = data
         if self.setting.comboBox.currentText() == UiGlobalVariable.PLOT_BACKEND[0]:
-            distribution_csv_path = self.save_df_to_csv(
-                jmp_df, "{}/temp_{}.csv".format(GlobalVariable.JMP_CACHE_PATH, script_name)
-            )
-            if distribution_csv_path is None:
-                return self.message_show('CSV数据产生失败!!! ')
-            jmp_script = JmpScript.factory(
-                JmpFile.load_csv_file(distribution_csv_path),
-                JmpFactory.scatter(temp_calculation)
-            )
-            JmpFile.save_with_run_script(jmp_script,
-                                         scrip_name="{}/temp_{}.jsl".format(
-                                             GlobalVariable.JMP_CACHE_PATH, script_name))
+            def run(distribution_csv_path: str):
+                jmp_script = JmpScript.factory(
+                    JmpFile.load_file(distribution_csv_path),
+                    JmpFactory.scatter(temp_calculation)
+                )
+                JmpFile.save_with_run_script(jmp_script,
+                                             scrip_name="{}/temp_{}.jsl".format(
+                                                 GlobalVariable.JMP_CACHE_PATH, script_name))
+
+            self.export_with_run(jmp_df, "{}/temp_{}.csv".format(GlobalVariable.JMP_CACHE_PATH, script_name), run)
 
     @Slot()
     def on_action_box_plot_triggered(self, script_name='distribution_box'):
@@ -392,24 +488,19 @@ class Main_Ui(QMainWindow, Ui_MainWindow):
             return
         jmp_df, temp_calculation = data
         if self.setting.comboBox.currentText() == UiGlobalVariable.PLOT_BACKEND[0]:
-            distribution_csv_path = self.save_df_to_csv(
-                jmp_df, "{}/temp_{}.csv".format(GlobalVariable.JMP_CACHE_PATH, script_name)
-            )
-            if distribution_csv_path is None:
-                return self.message_show('CSV数据产生失败!!! ')
-            if self.message_show("箱图 OR 点图 ? @"):
-                jmp_script = JmpScript.factory(
-                    JmpFile.load_csv_file(distribution_csv_path),
-                    JmpFactory.scatter_line(temp_calculation),
-                )
-            else:
+            # 导出前先选好图形, 文件写完后直接运行
+            scatter_func = JmpFactory.scatter_line if self.message_show("箱图 OR 点图 ? @") else JmpFactory.scatter_box
+
+            def run(distribution_csv_path: str):
                 jmp_script = JmpScript.factory(
-                    JmpFile.load_csv_file(distribution_csv_path),
-                    JmpFactory.scatter_box(temp_calculation),
+                    JmpFile.load_file(distribution_csv_path),
+                    scatter_func(temp_calculation),
                 )
-            JmpFile.save_with_run_script(jmp_script,
-                                         scrip_name="{}/temp_{}.jsl".format(
-                                             GlobalVariable.JMP_CACHE_PATH, script_name))
+                JmpFile.save_with_run_script(jmp_script,
+                                             scrip_name="{}/temp_{}.jsl".format(
+                                                 GlobalVariable.JMP_CACHE_PATH, script_name))
+
+            self.export_with_run(jmp_df, "{}/temp_{}.csv".format(GlobalVariable.JMP_CACHE_PATH, script_name), run)
 
     @Slot()
     def on_action_mapping_triggered(self):
@@ -434,17 +525,20 @@ class Main_Ui(QMainWindow, Ui_MainWindow):
             return
         if self.setting.comboBox.currentText() == UiGlobalVariable.PLOT_BACKEND[0]:
             mapping_csv_str = "{}_{}".format("bin_temp", bin_head)
-            mapping_csv_path = self.save_df_to_csv(
-                jmp_df, "{}/temp_{}.csv".format(GlobalVariable.JMP_CACHE_PATH, mapping_csv_str)
-            )
-            jmp_script = JmpScript.factory(
-                JmpFile.load_csv_file(mapping_csv_path),
-                JmpFactory.bin_mapping(temp_calculation, jmp_df=jmp_df, bin_head=bin_head),
-            )
-            JmpFile.save_with_run_script(
-                jmp_script, scrip_name='{}/temp_{}.jsl'.format(GlobalVariable.JMP_CACHE_PATH, mapping_csv_str)
-            )
-            self.mapping_select_dialog.hide()
+
+            def run(mapping_csv_path: str):
+                jmp_script = JmpScript.factory(
+                    JmpFile.load_file(mapping_csv_path),
+                    JmpFactory.bin_mapping(temp_calculation, jmp_df=jmp_df, bin_head=bin_head),
+                )
+                JmpFile.save_with_run_script(
+                    jmp_script, scrip_name='{}/temp_{}.jsl'.format(GlobalVariable.JMP_CACHE_PATH, mapping_csv_str)
+                )
+
+            if self.export_with_run(
+                    jmp_df, "{}/temp_{}.csv".format(GlobalVariable.JMP_CACHE_PATH, mapping_csv_str), run
+            ):
+                self.mapping_select_dialog.hide()
 
     @Slot()
     def on_action_visual_map_triggered(self, script_name='visual_data'):
@@ -457,24 +551,21 @@ class Main_Ui(QMainWindow, Ui_MainWindow):
             return
         jmp_df, temp_calculation = data
         if self.setting.comboBox.currentText() == UiGlobalVariable.PLOT_BACKEND[0]:
-            visual_csv_path = self.save_df_to_csv(
-                jmp_df, "{}/temp_{}.csv".format(GlobalVariable.JMP_CACHE_PATH, script_name)
-            )
-            if visual_csv_path is None:
-                return self.message_show(f'CSV数据产生失败!!! ')
             if self.message_show("热图 OR 散点图 \n@散点图对电脑性能要求更高, 热图生成的Chart会不规则"):
-                jmp_script = JmpScript.factory(
-                    JmpFile.load_csv_file(visual_csv_path),
-                    JmpFactory.heatmap_visual_map(temp_calculation, jmp_df=jmp_df),
-                )
+                visual_func = JmpFactory.heatmap_visual_map
             else:
+                visual_func = JmpFactory.points_visual_map
+
+            def run(visual_csv_path: str):
                 jmp_script = JmpScript.factory(
-                    JmpFile.load_csv_file(visual_csv_path),
-                    JmpFactory.points_visual_map(temp_calculation, jmp_df=jmp_df),
+                    JmpFile.load_file(visual_csv_path),
+                    visual_func(temp_calculation, jmp_df=jmp_df),
+                )
+                JmpFile.save_with_run_script(
+                    jmp_script, scrip_name='{}/temp_{}.jsl'.format(GlobalVariable.JMP_CACHE_PATH, script_name)
                 )
-            JmpFile.save_with_run_script(
-                jmp_script, scrip_name='{}/temp_{}.jsl'.format(GlobalVariable.JMP_CACHE_PATH, script_name)
-            )
+
+            self.export_with_run(jmp_df, "{}/temp_{}.csv".format(GlobalVariable.JMP_CACHE_PATH, script_name), run)
 
     @Slot()
     def on_action_multiple_chart_triggered(self):
@@ -491,27 +582,25 @@ class Main_Ui(QMainWindow, Ui_MainWindow):
             return
         jmp_df, temp_calculation = data
         if self.setting.comboBox.currentText() == UiGlobalVariable.PLOT_BACKEND[0]:
-            multi_csv_path = self.save_df_to_csv(
-                jmp_df, "{}/temp_{}.csv".format(GlobalVariable.JMP_CACHE_PATH, "mult_csv")
-            )
-            if multi_csv_path is None:
-                return self.message_show('CSV数据产生失败!!! ')
-            jmp_fac_string = [JmpFile.load_csv_file(multi_csv_path)]
-            bin_head = ""
-            for each in item_select:
-                if each == 6:
-                    bin_head = "SOFT_BIN"
-                if each == 7:
-                    bin_head = "HARD_BIN"
-                fac_func = getattr(JmpFactory, JmpFactory.item_dict[each])
-                fac_jsl_script = fac_func(temp_calculation,
-                                          jmp_df=jmp_df,
-                                          bin_head=bin_head)
-                jmp_fac_string.append(fac_jsl_script)
-            jmp_script = JmpScript.factory(*jmp_fac_string)
-            JmpFile.save_with_run_script(
-                jmp_script, scrip_name='{}/temp_{}.jsl'.format(GlobalVariable.JMP_CACHE_PATH, "multi_csv")
-            )
+            def run(multi_csv_path: str):
+                jmp_fac_string = [JmpFile.load_file(multi_csv_path)]
+                bin_head = ""
+                for each in item_select:
+                    if each == 6:
+                        bin_head = "SOFT_BIN"
+                    if each == 7:
+                        bin_head = "HARD_BIN"
+                    fac_func = getattr(JmpFactory, JmpFactory.item_dict[each])
+                    fac_jsl_script = fac_func(temp_calculation,
+                                              jmp_df=jmp_df,
+                                              bin_head=bin_head)
+                    jmp_fac_string.append(fac_jsl_script)
+                jmp_script = JmpScript.factory(*jmp_fac_string)
+                JmpFile.save_with_run_script(
+                    jmp_script, scrip_name='{}/temp_{}.jsl'.format(GlobalVariable.JMP_CACHE_PATH, "multi_csv")
+                )
+
+            self.export_with_run(jmp_df, "{}/temp_{}.csv".format(GlobalVariable.JMP_CACHE_PATH, "mult_csv"), run)
 
     @Slot()
     def on_action_contact_triggered(self):
@@ -530,9 +619,9 @@ class Main_Ui(QMainWindow, Ui_MainWindow):
         self.mdi_contact_dialog.insert(self.mdi_cache)
         self.mdi_contact_dialog.show()
 
-    @Slot(pd.DataFrame)
-    def mdi_space_data_contact(self, summary: pd.DataFrame):
-        """ 根据弹出的选择界面, 用来将多个mdi的数据contact在一起 """
+    @Slot(pd.DataFrame, str, object)
+    def mdi_space_data_contact(self, summary: pd.DataFrame, key: str = DataMerge.TEXT, mapping: pd.DataFrame = None):
+        """ 根据弹出的选择界面, 用来将多个mdi的数据contact在一起, key是测试项的对应方式 """
         self.mdi_count += 1
         merge_mdi = StdfLoadUi(self, space_nm=self.mdi_count, select=False)
         merge_mdi.dock_file_load.hide()
@@ -541,6 +630,7 @@ class Main_Ui(QMainWindow, Ui_MainWindow):
         )
         """ 设置数据 """
         merge_mdi.summary.set_data(summary)
+        merge_mdi.li.set_merge(key, mapping)
         merge_mdi.tree_load_widget.set_tree()
         self.load_widget_mdi.addSubWindow(merge_mdi)
         merge_mdi.show()
@@ -574,16 +664,21 @@ class Main_Ui(QMainWindow, Ui_MainWindow):
         else:
             return False
 
-    def save_df_to_csv(self, data_object: pd.DataFrame, file_path):
-        if data_object is None:
-            return self.mdi_space_message_emit('未查询 空数据无法保存!!! ')
-        if any(data_object):
-            data_object.to_csv(file_path, encoding='utf_8_sig', index=False)
-            self.mdi_space_message_emit(f'数据保存成功,路径在:>>>{file_path},开始执行JMP脚本')
-            return file_path
-        else:
+    def export_with_run(self, data_object: pd.DataFrame, file_path: str, callback: Callable[[str], None]) -> bool:
+        """
+        在 data_export_th 中导出数据文件, 写完后回到GUI线程执行 callback(file_path)
+        数据没变化时直接用缓存目录中的文件, file_path 只用来确定缓存目录
+        :return: 是否开始导出
+        """
+        if self.data_export_th.isRunning():
+            self.mdi_space_message_emit('数据导出中, 请稍后再试!!!')
+            return False
+        if data_object is None or len(data_object) == 0 or len(data_object.columns) == 0:
             self.mdi_space_message_emit('未查询 空数据无法保存!!! ')
-            return None
+            return False
+        self.data_export_th.set_tasks([(data_object, file_path, callback)])
+        self.data_export_th.start()
+        return True
 
 
 class Application(QApplication):
@@ -0,0 +1,76 @@
+#!/usr/local/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+@File    : ui_performance.py
+@Author  : Link
+@Time    : 2023/2/26 21:40
+@Mark    : Performance dock, 显示 Trace 记录的耗时, 按函数汇总
+    勾选"记录"后才记录; 导出的json用 chrome://tracing 或 Perfetto 打开看嵌套的时间线
+"""
+from PySide2.QtCore import Slot, Signal, QTimer
+from PySide2.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QCheckBox, QPushButton, QTableWidget, \
+    QTableWidgetItem, QHeaderView, QFileDialog
+
+from common.trace import Trace
+
+
+class PerformanceWidget(QWidget):
+    HEAD = ("NAME", "COUNT", "TOTAL(ms)", "MEAN(ms)", "MAX(ms)", "ROWS")
+    INTERVAL = 1000  # ms, 有新的记录时才刷新表格
+    messageSignal = Signal(str)
+
+    def __init__(self, parent=None):
+        super(PerformanceWidget, self).__init__(parent)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        tool_layout = QHBoxLayout()
+        self.checkBox = QCheckBox("记录", self)
+        self.checkBox.setChecked(Trace.enabled)
+        self.checkBox.toggled.connect(Trace.enable)
+        tool_layout.addWidget(self.checkBox)
+        tool_layout.addStretch(1)
+        for text, slot in (("清空", self.clear), ("导出Chrome Trace", self.export)):
+            button = QPushButton(text, self)
+            button.clicked.connect(slot)
+            tool_layout.addWidget(button)
+        layout.addLayout(tool_layout)
+        self.tableWidget = QTableWidget(self)
+        self.tableWidget.setColumnCount(len(self.HEAD))
+        self.tableWidget.setHorizontalHeaderLabels(self.HEAD)
+        self.tableWidget.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.tableWidget.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.tableWidget)
+
+        self.last = None  # 上次刷新时最后一个span
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(self.INTERVAL)
+
+    @Slot()
+    def refresh(self):
+        last = Trace.buffer[-1] if Trace.buffer else None
+        if last is self.last:
+            return
+        self.last = last
+        df = Trace.summary()
+        self.tableWidget.setRowCount(len(df))
+        for row, values in enumerate(df.itertuples(index=False, name=None)):
+            for column, value in enumerate(values):
+                if isinstance(value, float):
+                    value = round(value, 3)
+                self.tableWidget.setItem(row, column, QTableWidgetItem(str(value)))
+
+    @Slot()
+    def clear(self):
+        Trace.clear()
+        self.last = None
+        self.tableWidget.setRowCount(0)
+
+    @Slot()
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save Chrome Trace", "trace.json", filter="trace(*.json)")
+        if not path:
+            return
+        Trace.to_chrome(path)
+        self.messageSignal.emit("Trace导出完成: {}, {}个span".format(path, len(Trace.buffer)))
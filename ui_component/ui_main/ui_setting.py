@@ -10,6 +10,7 @@ from PySide2.QtCore import Qt, Slot, Signal
 from PySide2.QtWidgets import QWidget
 from pyqtgraph.parametertree import Parameter, ParameterTree
 
+from common.cal_interface.capability import CapabilityUtils
 from ui_component.ui_common.my_text_browser import Print
 from ui_component.ui_main.ui_designer.ui_setting import Ui_Form
 from ui_component.ui_app_variable import UiGlobalVariable
@@ -42,6 +43,8 @@ class SettingWidget(QWidget, Ui_Form):
         for param, change, data in changes:
             key = language.kwargs[param.name()]
             setattr(UiGlobalVariable, key, data)
+            if key == "GraphPlotFloatRound":
+                CapabilityUtils.FLOAT_ROUND = data
 
     @Slot(str)
     def on_comboBox_currentIndexChanged(self, index):
@@ -7,15 +7,20 @@
 @Time    : 2022/5/1 21:39
 @Mark    : 
 """
-from typing import Union, List, Set, Dict
+from typing import Union, List, Set, Dict, Tuple
 
+import numpy as np
+import pandas as pd
 from PySide2 import QtCore, QtWidgets, QtGui
-from PySide2.QtCore import Qt
-from PySide2.QtGui import QFont
-from PySide2.QtWidgets import QTableWidgetItem, QTableWidget, QComboBox, QStyledItemDelegate
+from PySide2.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+from PySide2.QtGui import QFont, QColor
+from PySide2.QtWidgets import QTableWidgetItem, QTableWidget, QComboBox, QStyledItemDelegate, QTableView, \
+    QAbstractItemView
 from pyqtgraph import TableWidget
 
 from common.app_variable import GlobalVariable
+from common.cal_interface.capability_table import CapabilityTable
+from common.cal_interface.table_search import TableSearch
 from common.func import timestamp_to_str
 
 translate = QtCore.QCoreApplication.translate
@@ -79,6 +84,292 @@ class PauseTableWidget(TableWidget):
             super().keyPressEvent(ev)
 
 
+class DataFrameTableModel(QAbstractTableModel):
+    """
+    DataFrame 的只读表, 不为每个格子创建 QTableWidgetItem
+    只有可见的格子会被 data() 读取, 排序只改 order
+    """
+
+    def __init__(self, parent=None):
+        super(DataFrameTableModel, self).__init__(parent)
+        self.df = pd.DataFrame()
+        self.columns = []  # type:List[np.ndarray]
+        self.order = np.arange(0)
+
+    def set_frame(self, df: pd.DataFrame):
+        self.beginResetModel()
+        self.df = df.reset_index(drop=True)
+        self.columns = [self.df.iloc[:, i].to_numpy(dtype=object) for i in range(self.df.shape[1])]
+        self.order = np.arange(len(self.df))
+        self.endResetModel()
+
+    def source_rows(self, rows: List[int]) -> np.ndarray:
+        """ 显示的行 -> 数据行 """
+        return self.order[np.asarray(rows, dtype=np.int64)]
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.order)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            value = self.columns[index.column()][self.order[index.row()]]
+            return "" if value is None else str(value)
+        return None
+
+    def headerData(self, section: int, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return str(self.df.columns[section])
+        return str(section)
+
+    def sort(self, column: int, order=Qt.AscendingOrder):
+        if column < 0 or column >= self.columnCount():
+            return
+        self.layoutAboutToBeChanged.emit()
+        self.order = CapabilityTable.sort_order(self.df.iloc[:, column], order == Qt.AscendingOrder)
+        self.layoutChanged.emit()
+
+
+class CapabilityTableModel(DataFrameTableModel):
+    """
+    制程能力表, Limit可以修改, CPK/TopFail/Reject 按阈值标颜色
+    """
+    COLORS = {
+        CapabilityTable.CPK: QColor(250, 194, 5, 50),
+        CapabilityTable.TOP_FAIL: QColor(217, 83, 25, 150),
+        CapabilityTable.REJECT: QColor(217, 83, 25, 30),
+    }
+    EDIT_COLUMNS = ("LO_LIMIT", "HI_LIMIT", "LO_LIMIT_TYPE", "HI_LIMIT_TYPE")
+
+    def __init__(self, parent=None):
+        super(CapabilityTableModel, self).__init__(parent)
+        self.masks = {}  # type:Dict[int, np.ndarray]
+        self.search_index = TableSearch.build(self.df)
+
+    def set_frame(self, df: pd.DataFrame):
+        self.masks = {}
+        self.search_index = TableSearch.build(df.reset_index(drop=True))
+        super(CapabilityTableModel, self).set_frame(df)
+
+    def set_clamp(self, cpk_lo: float, cpk_hi: float, top_fail: float, reject: float):
+        masks = CapabilityTable.clamp_mask(self.df, cpk_lo, cpk_hi, top_fail, reject)
+        self.masks = {
+            self.df.columns.get_loc(key): mask for key, mask in masks.items() if key in self.df
+        }
+        if self.rowCount():
+            self.dataChanged.emit(self.index(0, 0), self.index(self.rowCount() - 1, self.columnCount() - 1),
+                                  [Qt.BackgroundRole])
+
+    def mask_points(self, key: str, order: np.ndarray) -> np.ndarray:
+        """
+        :param order: 显示的数据行, 筛选后可能比order少
+        """
+        if key not in self.df:
+            return np.array([], dtype=np.int64)
+        return CapabilityTable.mask_points(self.masks[self.df.columns.get_loc(key)], order)
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if index.isValid() and role == Qt.BackgroundRole:
+            mask = self.masks.get(index.column())
+            if mask is not None and mask[self.order[index.row()]]:
+                return self.COLORS[self.df.columns[index.column()]]
+            return None
+        return super(CapabilityTableModel, self).data(index, role)
+
+    def setData(self, index: QModelIndex, value, role=Qt.EditRole) -> bool:
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        name = self.df.columns[index.column()]
+        if name not in self.EDIT_COLUMNS:
+            return False
+        if name in ("LO_LIMIT", "HI_LIMIT"):
+            try:
+                value = float(value)
+            except ValueError:
+                return False
+        row = self.order[index.row()]
+        self.df.iat[row, index.column()] = value
+        self.columns[index.column()][row] = value
+        if name in self.search_index.numbers:
+            self.search_index.numbers[name][row] = value
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        return True
+
+    def flags(self, index: QModelIndex):
+        flags = super(CapabilityTableModel, self).flags(index)
+        if index.isValid() and self.df.columns[index.column()] in self.EDIT_COLUMNS:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def limit_dict(self, rows: Union[np.ndarray, None] = None) -> Dict[int, Tuple[float, float, str, str]]:
+        """
+        :param rows: 数据行, None是全部
+        """
+        return CapabilityTable.limit_dict(self.df, rows)
+
+
+class CapabilityFilterProxyModel(QSortFilterProxyModel):
+    """
+    筛选用 TableSearch 算出的mask, 排序交给 CapabilityTableModel 的argsort
+    """
+
+    def __init__(self, parent=None):
+        super(CapabilityFilterProxyModel, self).__init__(parent)
+        self.mask = None  # type:Union[np.ndarray, None]
+
+    def set_mask(self, mask: Union[np.ndarray, None]):
+        """
+        :param mask: bool[数据行], None是不筛选
+        """
+        self.mask = mask
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row: int, source_parent: QModelIndex) -> bool:
+        if self.mask is None:
+            return True
+        return bool(self.mask[self.sourceModel().order[source_row]])
+
+    def sort(self, column: int, order=Qt.AscendingOrder):
+        self.sourceModel().sort(column, order)
+
+    def visible_order(self) -> np.ndarray:
+        """ 显示的数据行 """
+        order = self.sourceModel().order
+        if self.mask is None:
+            return order
+        return order[self.mask[order]]
+
+
+class DataFrameTableView(QTableView):
+    """
+    替代 pyqtgraph TableWidget, setData 可以是 DataFrame 或 List[dict]
+    """
+    q_font = QFont("", 8)
+
+    def __init__(self, *args, **kwds):
+        super(DataFrameTableView, self).__init__(*args, **kwds)
+        self.init_model()
+        self.setSortingEnabled(True)
+        # 默认不排序, 按数据的顺序显示
+        self.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.setAlternatingRowColors(True)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.q_font.setBold(True)
+        self.horizontalHeader().setFont(self.q_font)
+        self.setFont(self.q_font)
+        # 行高固定, 列宽只看前面一部分行, 不遍历所有格子
+        self.verticalHeader().setDefaultSectionSize(self.fontMetrics().height() + 4)
+        self.horizontalHeader().setResizeContentsPrecision(200)
+
+    def init_model(self):
+        self.frame_model = DataFrameTableModel(self)
+        self.setModel(self.frame_model)
+
+    def setData(self, data: Union[pd.DataFrame, List[dict]]):
+        self.frame_model.set_frame(data if isinstance(data, pd.DataFrame) else pd.DataFrame(data))
+        # 重新载入后保持表头上的排序
+        header = self.horizontalHeader()
+        self.frame_model.sort(header.sortIndicatorSection(), header.sortIndicatorOrder())
+        self.resizeColumnsToContents()
+
+    def copy(self):
+        """ 和 pyqtgraph TableWidget 一样, 第一行是表头 """
+        indexes = self.selectionModel().selectedIndexes()
+        if not indexes:
+            return
+        rows = sorted(set(each.row() for each in indexes))
+        columns = sorted(set(each.column() for each in indexes))
+        model = self.model()
+        lines = ["\t".join(model.headerData(column, Qt.Horizontal) for column in columns)]
+        for row in rows:
+            lines.append("\t".join(model.data(model.index(row, column)) for column in columns))
+        QtWidgets.QApplication.clipboard().setText("\n".join(lines) + "\n")
+
+    def keyPressEvent(self, ev):
+        if ev.matches(QtGui.QKeySequence.StandardKey.Copy):
+            ev.accept()
+            self.copy()
+        else:
+            super().keyPressEvent(ev)
+
+
+class CapabilityTableView(DataFrameTableView):
+    """
+    替代 PauseTableWidget 显示 capability_key_list, 接口按 TableLoadWidget 的用法
+    """
+
+    def init_model(self):
+        self.capability_model = CapabilityTableModel(self)
+        self.frame_model = self.capability_model
+        self.filter_model = CapabilityFilterProxyModel(self)
+        self.filter_model.setSourceModel(self.capability_model)
+        self.setModel(self.filter_model)
+
+    def setData(self, capability_key_list: List[dict]):
+        self.filter_model.set_mask(None)
+        super(CapabilityTableView, self).setData(CapabilityTable.to_frame(capability_key_list))
+
+    def select_rows(self) -> np.ndarray:
+        """ 选中的数据行, 按显示的顺序 """
+        rows = sorted(set(each.row() for each in self.selectionModel().selectedIndexes()))
+        rows = [self.filter_model.mapToSource(self.filter_model.index(row, 0)).row() for row in rows]
+        return self.capability_model.source_rows(rows)
+
+    def search(self, text: str) -> int:
+        """
+        :param text: TableSearch.query 的条件, 空是显示所有行
+        :return: 显示的行数
+        """
+        if not text.strip():
+            self.filter_model.set_mask(None)
+        else:
+            self.filter_model.set_mask(TableSearch.query(self.capability_model.search_index, text))
+        return self.filter_model.rowCount()
+
+    def get_select_test_ids(self) -> Union[List[int], None]:
+        rows = self.select_rows()
+        if not len(rows):
+            return None
+        test_id = self.capability_model.df["TEST_ID"].to_numpy()
+        return [int(each) for each in test_id[rows]]
+
+    def get_all_new_limit(self) -> Dict[int, Tuple[float, float, str, str]]:
+        return self.capability_model.limit_dict()
+
+    def get_select_new_limit(self) -> Union[None, Dict[int, Tuple[float, float, str, str]]]:
+        rows = self.select_rows()
+        if not len(rows):
+            print("未选取测试项目无法进行临时数据生成!")
+            return
+        return self.capability_model.limit_dict(rows)
+
+    def paste(self):
+        text = QtWidgets.QApplication.clipboard().text()  # type:str
+        text_rows = text.split('\n')[1:-1]
+        index = self.currentIndex()
+        if not text_rows or not index.isValid():
+            return
+        model = self.model()
+        for i, text_row in enumerate(text_rows):
+            for j, value in enumerate(text_row.split('\t')):
+                item_index = model.index(index.row() + i, index.column() + j)
+                if item_index.isValid():
+                    model.setData(item_index, value)
+
+    def keyPressEvent(self, ev):
+        if ev.matches(QtGui.QKeySequence.StandardKey.Paste):
+            ev.accept()
+            self.paste()
+        else:
+            super().keyPressEvent(ev)
+
+
 class SearchTableWidget(TableWidget):
     """
     用在需要选取在哪行的table上, 从数据库中获取id, id都是小写
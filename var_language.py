@@ -9,7 +9,6 @@
 
     datas=[
         ('parser_core\\dll_parser\\stdf_ctype.dll', '.'),
-        ('chart_core\\chart_pyqtgraph\\core\\visual\\visual.cp37-win_amd64.pyd', '.'),
         ('colors\\CET-C6.csv', '.'),
         ('colors\\CET-D8.csv', '.'),
     ],
@@ -31,6 +30,9 @@ class LanguageZh:
         "JmpMeanAddSubSigma": "JMPMeanSigma±区间",
         "JmpPlotColumn": "JMP绘图分列数",
         "JmpPlotFloatRound": "JMP绘图小数精确位",
+        "JmpCsvFloatRound": "JMP数据CSV小数位",
+        "JmpExportFormat": "JMP数据导出格式",
+        "JmpExportCacheSize": "JMP数据缓存上限(MB)",
     }
     GraphSetting = {
         "GraphSetting": "PyqtGraph绘图相关设定",
@@ -49,6 +51,8 @@ class LanguageZh:
         "GraphCpkHiClamp": "CPK最大值卡控",
         "GraphTopFailClamp": "TopFail颗数最小值卡控",
         "GraphRejectClamp": "失效颗数最小值卡控",
+        "GraphMapDuplicate": "Map重复坐标取值",
+        "GraphDataCacheSize": "绘图数据缓存数量",
     }
 
     Altair = {